@@ -1,4 +1,5 @@
-from vectordb_bench.backend.dataset import Dataset
+from vectordb_bench.backend.dataset import Dataset, to_float32_matrix
+import numpy as np
 import logging
 import pytest
 from pydantic import ValidationError
@@ -24,6 +25,113 @@ class TestDataSet:
         with pytest.raises(ValidationError):
             Dataset.COHERE.get(9999)
 
+    def test_iter_shard(self, tmp_path, monkeypatch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from vectordb_bench import config
+
+        monkeypatch.setattr(config, "DATASET_LOCAL_DIR", tmp_path)
+        cohere = Dataset.COHERE.manager(100_000)
+        cohere.data_dir.mkdir(parents=True)
+        table = pa.table({"id": range(100), "emb": [[float(i)] * 4 for i in range(100)]})
+        pq.write_table(table, cohere.data_dir / "train.parquet", row_group_size=10)
+        cohere.train_files = ["train.parquet"]
+
+        assert len(cohere.row_groups()) == 10
+        shards = [[i for df in cohere.iter_shard(s, 3) for i in df["id"]] for s in range(3)]
+        assert sorted(sum(shards, [])) == list(range(100))
+        assert shards[0][:10] == list(range(10)) and shards[0][10:20] == list(range(30, 40))
+
+        ids, embeddings = next(cohere.iter_numpy(1, 3))
+        assert ids.tolist()[:10] == list(range(10, 20))
+        assert embeddings.dtype == np.float32 and embeddings.flags.c_contiguous
+        assert embeddings[0].tolist() == [10.0] * 4
+
+        # resume after the first 25 rows of a shard: shard 0 is row groups 0, 3, 6, 9
+        assert [i for df in cohere.iter_shard(0, 3, skip=25) for i in df["id"]] == shards[0][25:]
+        assert [i for ids, _ in cohere.iter_numpy(0, 3, skip=40) for i in ids] == []
+        assert cohere.row_group_sizes(0, 3) == [("train.parquet", i, 10) for i in [0, 3, 6, 9]]
+
+    def test_cache(self, tmp_path, monkeypatch):
+        import os
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from vectordb_bench import config
+        from vectordb_bench.backend.dataset import DatasetCache
+
+        monkeypatch.setattr(config, "DATASET_LOCAL_DIR", tmp_path)
+        monkeypatch.setattr(config, "NUM_PER_BATCH", 7)
+        cohere = Dataset.COHERE.manager(100_000)
+        cohere.data_dir.mkdir(parents=True)
+        emb = np.random.default_rng(0).random((100, 4), dtype=np.float32)
+        pq.write_table(pa.table({"id": range(100), "emb": emb.tolist()}), cohere.data_dir / "train.parquet", row_group_size=10)
+        pq.write_table(pa.table({"id": range(3), "neighbors_id": [[i, i + 1] for i in range(3)]}), cohere.data_dir / "neighbors.parquet")
+        cohere.train_files = ["train.parquet"]
+        expected = [[i for ids, _ in cohere.iter_numpy(shard, 3, skip) for i in ids] for shard in range(3) for skip in (0, 15, 40)]
+        uncached = cohere._read_file("neighbors.parquet")
+
+        cache = DatasetCache(tmp_path / "cache")
+        assert cache.update(cohere.data_dir / "train.parquet") and cache.update(cohere.data_dir / "neighbors.parquet")
+        cohere.cache = DatasetCache(tmp_path / "cache")
+        assert [[i for ids, _ in cohere.iter_numpy(shard, 3, skip) for i in ids] for shard in range(3) for skip in (0, 15, 40)] == expected
+        assert np.array_equal(np.concatenate([e for _, e in cohere.iter_numpy()]), emb)
+        gt = cohere._read_file("neighbors.parquet")
+        assert gt["neighbors_id"][2].tolist() == [2, 3] and gt["neighbors_id"][0].dtype == np.int32
+        # the same DataFrame type with and without the cache
+        assert isinstance(uncached, pd.DataFrame) and isinstance(gt, pd.DataFrame)
+        assert uncached["neighbors_id"].to_list()[2].tolist() == gt["neighbors_id"].to_list()[2].tolist()
+
+        os.utime(cohere.data_dir / "train.parquet", ns=(0, 0))
+        mapped = cache.arrays("train.parquet")["emb"]
+        assert isinstance(mapped, np.memmap) and cache.update(cohere.data_dir / "train.parquet")
+        assert cache.manifest["train.parquet"]["mtime_ns"] == 0
+
+    def test_synthetic(self, tmp_path, monkeypatch):
+        import pyarrow.parquet as pq
+        from vectordb_bench import config
+        from vectordb_bench.backend import synthetic, utils
+        from vectordb_bench.backend.dataset import DatasetManager, Synthetic
+
+        monkeypatch.setattr(config, "DATASET_LOCAL_DIR", tmp_path)
+        data = Synthetic(size=25_000, dim=8, num_clusters=5, intrinsic_dim=4, test_size=5, rows_per_file=25_000)
+        assert data.label == "25K_8D" and data.file_count == 1
+        dataset = DatasetManager(data=data)
+        assert dataset.prepare()
+        assert dataset.train_files == ["train.parquet"]
+        assert len(dataset.test_data) == 5 and len(dataset.gt_data) == 5
+        ids, emb = map(np.concatenate, zip(*dataset.iter_numpy(), strict=True))
+        assert ids.tolist() == list(range(25_000)) and emb.shape == (25_000, 8)
+        assert np.allclose(np.linalg.norm(emb, axis=1), 1, atol=1e-5)
+
+        # the rows don't depend on the files and row groups they're written into
+        chunked = data.copy(update={"rows_per_file": 10_000})
+        files = utils.compose_train_files(chunked.file_count, False)
+        synthetic.generate(chunked, tmp_path / "chunked", files + ["test.parquet"], row_group_size=4_000)
+        assert [pq.ParquetFile(tmp_path / "chunked" / f).metadata.num_row_groups for f in files] == [3, 3, 2]
+        tables = [pq.read_table(tmp_path / "chunked" / f) for f in files]
+        assert np.array_equal(np.concatenate([to_float32_matrix(t["emb"]) for t in tables]), emb)
+        test = pq.read_table(tmp_path / "chunked" / "test.parquet")
+        assert np.array_equal(to_float32_matrix(test["emb"]), np.stack(dataset.test_data["emb"]))
+
+        other = synthetic.SyntheticGenerator(data.copy(update={"seed": data.seed + 1})).rows(0, 0, 10)
+        assert not np.array_equal(other, emb[:10])
+        with pytest.raises(ValidationError):
+            Synthetic(size=0)
+
+    def test_to_float32_matrix(self):
+        import pyarrow as pa
+
+        vectors = np.arange(12, dtype=np.float64).reshape(4, 3)
+        lists = pa.array(vectors.tolist())
+        fixed = pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel().astype(np.float32)), 3)
+        for column in [lists, fixed, pa.chunked_array([lists[:1], lists[1:]])]:
+            assert np.array_equal(to_float32_matrix(column), vectors.astype(np.float32))
+        assert np.array_equal(to_float32_matrix(fixed[1:3]), vectors[1:3])
+
+        with pytest.raises(ValueError):
+            to_float32_matrix(pa.array([[1.0, 2.0], [3.0]]))
+
     def test_iter_cohere(self):
         cohere_10m = Dataset.COHERE.manager(10_000_000)
         cohere_10m.prepare()
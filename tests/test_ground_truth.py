@@ -0,0 +1,72 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vectordb_bench import config
+from vectordb_bench.backend.clients.api import MetricType
+from vectordb_bench.backend.ground_truth import prefix_knn
+
+log = logging.getLogger(__name__)
+
+
+class TestPrefixKnn:
+    @pytest.mark.parametrize("metric_type", [MetricType.L2, MetricType.IP, MetricType.COSINE])
+    @pytest.mark.parametrize("block_size", [20_000_000, 60])
+    def test_prefix_knn(self, metric_type, block_size, monkeypatch):
+        # 60 distances per block are blocks of 10 rows for the 6 searches
+        monkeypatch.setattr(config, "GROUND_TRUTH_BLOCK_SIZE", block_size)
+        rng = np.random.default_rng(0)
+        train = rng.random((1000, 8), dtype=np.float32)
+        ids = np.arange(1000) * 3
+        queries = rng.random((5, 8), dtype=np.float32)
+        query_idx = np.array([0, 1, 2, 3, 4, 0])
+        prefix = np.array([1000, 500, 3, 10, 999, 700])
+        batches = [(ids[i : i + 64], train[i : i + 64]) for i in range(0, 1000, 64)]
+
+        got = prefix_knn(batches, queries, query_idx, prefix, 5, metric_type)
+        for row, q, p in zip(got, query_idx, prefix, strict=True):
+            x, query = train[:p], queries[q]
+            if metric_type == MetricType.L2:
+                dist = ((x - query) ** 2).sum(axis=1)
+            elif metric_type == MetricType.IP:
+                dist = -(x @ query)
+            else:
+                dist = -(x / np.linalg.norm(x, axis=1)[:, np.newaxis]) @ (query / np.linalg.norm(query))
+            expected = ids[np.argsort(dist, kind="stable")[:5]]
+            # padded with -1 if the prefix is shorter than k
+            assert row.tolist() == expected.tolist() + [-1] * (5 - len(expected))
+
+
+class TestBuildGroundTruth:
+    def test_build(self, tmp_path, monkeypatch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from vectordb_bench import config
+        from vectordb_bench.backend.dataset import Dataset
+        from vectordb_bench.backend.ground_truth import build_ground_truth
+        from vectordb_bench.backend.utils import compose_gt_file
+
+        monkeypatch.setattr(config, "DATASET_LOCAL_DIR", tmp_path)
+        monkeypatch.setattr(config, "GROUND_TRUTH_BLOCK_SIZE", 300)
+        rng = np.random.default_rng(0)
+        train, queries = rng.random((200, 4), dtype=np.float32), rng.random((6, 4), dtype=np.float32)
+        openai = Dataset.OPENAI.manager(50_000)
+        openai.data_dir.mkdir(parents=True)
+        pq.write_table(pa.table({"id": range(200), "emb": train.tolist()}), openai.data_dir / "train.parquet", row_group_size=50)
+        openai.train_files = ["train.parquet"]
+        openai.test_data = pd.DataFrame({"id": range(6), "emb": list(queries)})
+
+        file_name = compose_gt_file(0.95)
+        assert file_name == "neighbors_filter_0.95.parquet"
+        build_ground_truth(openai, file_name, k=20, min_id=190, num_workers=1)
+        gt = pq.read_table(openai.data_dir / file_name).to_pandas()
+        assert gt["id"].tolist() == list(range(6)) and all(len(n) == 10 for n in gt["neighbors_id"])
+
+        build_ground_truth(openai, "neighbors.parquet", k=20, num_workers=1)
+        gt = pq.read_table(openai.data_dir / "neighbors.parquet").to_pandas()
+        normalized = train / np.linalg.norm(train, axis=1)[:, np.newaxis]
+        for query, neighbors in zip(queries, gt["neighbors_id"], strict=True):
+            expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))), kind="stable")[:20]
+            assert neighbors.tolist() == expected.tolist()
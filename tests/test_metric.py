@@ -0,0 +1,153 @@
+import pickle
+import logging
+
+import numpy as np
+import pytest
+
+from vectordb_bench.metric import (
+    LatencyHistogram,
+    SearchTimeline,
+    calc_ndcg,
+    calc_recall,
+    calc_search_metrics,
+    get_ideal_dcg,
+    rescore_result_ids,
+)
+
+log = logging.getLogger(__name__)
+
+
+class TestLatencyHistogram:
+    def test_percentiles(self):
+        latencies = np.random.default_rng(0).lognormal(mean=-5, sigma=1, size=100_000)
+        hist = LatencyHistogram()
+        for latency in latencies:
+            hist.record(latency)
+
+        ps = [50, 90, 99, 99.9]
+        got = hist.percentiles(ps)
+        expected = np.percentile(latencies, ps)
+        log.info(f"histogram: {got}, numpy: {expected}")
+
+        assert hist.count == len(latencies)
+        assert hist.max == latencies.max()
+        assert hist.mean == pytest.approx(latencies.mean())
+        for g, e in zip(got, expected, strict=True):
+            assert g == pytest.approx(e, rel=hist.precision)
+
+    def test_merge(self):
+        a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i in range(1, 1001):
+            (a if i % 2 else b).record(i / 1000)
+            both.record(i / 1000)
+
+        a.merge(b)
+        assert a.count == both.count
+        assert a.min == both.min and a.max == both.max
+        assert np.array_equal(a.counts, both.counts)
+
+        with pytest.raises(ValueError):
+            a.merge(LatencyHistogram(precision=0.1))
+
+    def test_pickle(self):
+        hist = LatencyHistogram()
+        for v in [0.001, 0.002, 0.5, 10]:
+            hist.record(v)
+
+        restored = pickle.loads(pickle.dumps(hist))
+        assert np.array_equal(restored.counts, hist.counts)
+        assert restored.percentiles([50, 99]) == hist.percentiles([50, 99])
+
+    def test_empty(self):
+        assert LatencyHistogram().percentiles([50, 99]) == [0.0, 0.0]
+        assert LatencyHistogram().mean == 0.0
+
+
+class TestSearchTimeline:
+    def test_record_and_merge(self):
+        a, b = SearchTimeline(0.5), SearchTimeline(0.5)
+        for t in [0.1, 0.2, 0.6]:
+            a.record(t, 0.01)
+        b.record(1.2, 0.02)
+        b.record_error(0.3)
+
+        a.merge(pickle.loads(pickle.dumps(b)))
+        assert a.counts == [2, 1, 1]
+        assert a.errors == [1, 0, 0]
+        assert a.latencies[2].max == 0.02
+
+        series = a.to_dict(duration=1.25)
+        assert series["time"] == [0.5, 1.0, 1.25]
+        assert series["qps"] == [4.0, 2.0, 4.0]
+        assert series["latency_p99"][0] == pytest.approx(0.01, rel=a.latencies[0].precision)
+
+        with pytest.raises(ValueError):
+            a.merge(SearchTimeline(0.75))
+
+    def test_rows(self):
+        timeline = SearchTimeline(10.0, precision=0.05)
+        timeline.record(3.0, 0.2, count=5000)
+        timeline.record(12.0, 0.4, count=5000)
+        assert timeline.to_dict(duration=20)["qps"] == [500.0, 500.0]
+        assert timeline.latencies[1].precision == 0.05
+
+    def test_max_buckets(self):
+        timeline = SearchTimeline(1.0, max_buckets=4)
+        for t in range(10):
+            timeline.record(t + 0.5, 0.01, count=10)
+        timeline.record_error(9.5)
+        # 10 seconds in 4 buckets of 4 seconds at most
+        assert timeline.interval == 4.0
+        assert timeline.counts == [40, 40, 20] and timeline.errors == [0, 0, 1]
+        assert timeline.latencies[0].count == 4
+
+        # the finer timeline of another process compacted to the coarser one
+        other = SearchTimeline(1.0, max_buckets=4)
+        other.record(1.5, 0.02, count=10)
+        timeline.merge(other)
+        assert timeline.counts == [50, 40, 20] and other.interval == 1.0
+        assert SearchTimeline(1.0, max_buckets=4).merge(timeline).interval == 4.0
+
+    def test_empty(self):
+        assert SearchTimeline().to_dict(duration=3)["qps"] == []
+
+
+class TestSearchMetrics:
+    def test_match_per_query(self):
+        rng = np.random.default_rng(0)
+        k, nq = 10, 200
+        gt = [rng.permutation(1000)[:100] for _ in range(nq)]
+        results = []
+        for row in gt:
+            # some true neighbors in shuffled order, some misses, some short rows
+            hits = rng.choice(row[:20], size=rng.integers(0, k + 1), replace=False)
+            misses = rng.integers(1000, 2000, size=k - len(hits))
+            results.append(rng.permutation(np.concatenate([hits, misses]))[:rng.integers(k - 2, k + 1)].tolist())
+
+        recalls, ndcgs, mrrs = calc_search_metrics(results, gt, k)
+        ideal_dcg = get_ideal_dcg(k)
+        for i in range(nq):
+            assert recalls[i] == pytest.approx(calc_recall(k, gt[i][:k].tolist(), results[i]))
+            assert ndcgs[i] == pytest.approx(calc_ndcg(gt[i][:k].tolist(), results[i], ideal_dcg))
+            expected_mrr = 1 / (results[i].index(gt[i][0]) + 1) if gt[i][0] in results[i] else 0
+            assert mrrs[i] == pytest.approx(expected_mrr)
+
+    def test_duplicates_and_padding(self):
+        gt = np.array([[1, 2, 3, 4], [5, 6, 7, 8]])
+        recalls, ndcgs, mrrs = calc_search_metrics([[2, 2, 1], []], gt, 4)
+        assert recalls.tolist() == [0.5, 0.0]
+        assert mrrs.tolist() == [pytest.approx(1 / 3), 0.0]
+        assert ndcgs[1] == 0.0
+
+    def test_rescore(self, tmp_path):
+        gt = np.tile(np.arange(5, 105), (3, 1))
+        result_ids = np.tile(np.arange(100), (3, 1))
+        file = tmp_path / "result_ids.npz"
+        np.savez_compressed(file, result_ids=result_ids, ground_truth=gt)
+
+        scores = rescore_result_ids(str(file), [10, 100])
+        assert scores[10] == (0.5, pytest.approx(0.6489, abs=1e-4), pytest.approx(0.1667, abs=1e-4))
+        assert scores[100][0] == 0.95
+
+        with pytest.raises(ValueError):
+            rescore_result_ids(str(file), [200])
@@ -0,0 +1,334 @@
+import asyncio
+import pickle
+import time
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+
+from vectordb_bench import config
+from vectordb_bench.backend.clients.api import MetricType, VectorDB
+from vectordb_bench.backend.runner import AsyncSearchRunner, BatchSearchRunner, ChurnRunner, CapacityRunner
+from vectordb_bench.backend.runner.mp_runner import MultiProcessingSearchRunner, SteadyStateDetector
+from vectordb_bench.backend.runner.serial_runner import SerialInsertRunner, SerialSearchRunner, _Rechunker
+from vectordb_bench.backend.runner.query_set import SharedQuerySet
+from vectordb_bench.backend.runner.load_checkpoint import LoadCheckpoint
+
+log = logging.getLogger(__name__)
+
+
+class EchoDB(VectorDB):
+    """returns the first k ids for every query"""
+    def __init__(self, *args, **kwargs):
+        pass
+
+    @contextmanager
+    def init(self):
+        yield
+
+    def insert_embeddings(self, embeddings, metadata, **kwargs):
+        return len(metadata), None
+
+    def search_embedding(self, query, k=100, filters=None):
+        return list(range(k))
+
+    def optimize(self):
+        pass
+
+    def ready_to_load(self):
+        pass
+
+
+class TestSharedQuerySet:
+    def test_share_queries(self):
+        data = np.random.random((100, 16))
+        queries = SharedQuerySet(data)
+        try:
+            assert len(queries) == 100
+            assert queries.array.dtype == np.float32
+            assert queries[3] == data[3].astype(np.float32).tolist()
+
+            # attach the same block like a search process does
+            attached = pickle.loads(pickle.dumps(queries))
+            assert len(pickle.dumps(queries)) < 1000
+            assert np.array_equal(attached.array, queries.array)
+
+            queries.array[0, 0] = -1.0
+            assert attached[0][0] == -1.0
+            attached.close()
+        finally:
+            queries.close()
+
+    def test_close_with_view(self):
+        queries = SharedQuerySet(np.random.random((10, 4)))
+        name = queries._shm.name
+        view = queries.array
+        queries.close()
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+        assert view.shape == (10, 4)
+        queries.close()
+
+
+class ConnectedDB(EchoDB):
+    """EchoDB recording the connections of its copies, with the async search if is_async"""
+    def __init__(self, is_async: bool):
+        self.is_async = is_async
+        self.connected = []
+
+    @contextmanager
+    def init(self):
+        self.connected.append("sync")
+        yield
+
+    @asynccontextmanager
+    async def init_async(self):
+        self.connected.append("async")
+        yield
+
+    def support_async_search(self) -> bool:
+        return self.is_async
+
+    async def search_embedding_async(self, query, k=100, filters=None):
+        await asyncio.sleep(0.001)
+        return list(range(k))
+
+
+class SlowDB(EchoDB):
+    def search_embedding(self, query, k=100, filters=None):
+        time.sleep(0.05)
+        return list(range(k))
+
+
+class TestMultiProcessingSearchRunner:
+    def test_search_by_rate_dropped(self):
+        test_data = np.zeros((10, 4)).tolist()
+        runner = MultiProcessingSearchRunner(SlowDB(), test_data, k=10, duration=0.3, arrival="constant")
+        # 30 queries scheduled in 0.3s, the DB answers at most 6
+        count, dur, latencies, dropped = runner.search_by_rate(test_data, 100)
+        assert count <= 7 and latencies.count == count
+        assert 29 <= count + dropped <= 31
+        assert latencies.percentile(99) > 0.1
+
+
+class TestAsyncSearchRunner:
+    @pytest.mark.parametrize("is_async", [True, False])
+    def test_search(self, is_async):
+        db = ConnectedDB(is_async)
+        test_data = np.zeros((10, 4)).tolist()
+        runner = AsyncSearchRunner(db, test_data, k=10, concurrencies=[3], duration=0.3, num_event_loops=1, warmup=0)
+        with runner._worker_init():
+            assert db.connected == ["async" if is_async else "sync"] * 3
+
+            count, dur, latencies, timeline = runner.search(test_data, 3)
+            assert count > 0 and dur >= 0.3
+            assert latencies.count == count and sum(timeline.counts) == count
+            assert latencies.percentile(99) > 0
+
+            # 2 connections at 50 qps each for 0.3s
+            count, dur, latencies, dropped = runner.search_by_rate(test_data, 2, 50)
+            assert 20 <= count <= 31 and latencies.count == count
+            assert 29 <= count + dropped <= 31
+
+    def test_split_concurrency(self):
+        runner = AsyncSearchRunner(None, np.zeros((10, 4)), concurrencies=[1, 7, 100], num_event_loops=4)
+        assert runner._split(1) == [1]
+        assert runner._split(7) == [2, 2, 2, 1]
+        assert sum(runner._split(100)) == 100
+        assert runner._pool_size() == 4
+
+
+class TestBatchSearchRunner:
+    def test_search(self):
+        gt = pd.DataFrame({"id": range(10), "neighbors_id": [list(range(20))] * 10})
+        runner = BatchSearchRunner(EchoDB(), np.zeros((10, 4)), gt, k=10, batch_sizes=[1, 16], duration=0.1)
+        assert EchoDB().search_embeddings_batch([[0.0] * 4] * 3, k=2) == [[0, 1]] * 3
+
+        batch_sizes, qps, p50, p99, recalls = runner.search()
+        assert batch_sizes == [1, 16]
+        assert all(q > 0 for q in qps)
+        assert recalls == [1.0, 1.0]
+
+
+class TestSteadyStateDetector:
+    def test_steady(self):
+        detector = SteadyStateDetector(warmup=2, window=3, max_cv=0.05, max_duration=60)
+        # ramping up, then steady around 1000 qps
+        counts = [100, 400, 900, 1900, 2900, 3910, 4900]
+        done = [detector.update(count, 3 + i) for i, count in enumerate(counts)]
+        assert done == [False, False, False, False, False, True, True]
+
+    def test_max_duration(self):
+        detector = SteadyStateDetector(warmup=0, window=3, max_cv=0.01, max_duration=4)
+        done = [detector.update(count, t) for t, count in enumerate([100, 300, 350, 900], start=1)]
+        assert done == [False, False, False, True]
+
+
+class TestSerialInsertRunner:
+    def test_rechunk(self):
+        for embeddings in [np.arange(20.0).reshape(10, 2), np.arange(20.0).reshape(10, 2).tolist()]:
+            batches = _Rechunker(iter([(embeddings[:4], list(range(4))), (embeddings[4:], list(range(4, 10)))]))
+            sizes = []
+            while (batch := batches.take(3)) is not None:
+                assert len(batch[0]) == len(batch[1])
+                sizes.append(batch[1])
+            assert sizes == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+
+    def test_tune_batch_size(self, monkeypatch):
+        monkeypatch.setattr(config, "LOAD_BATCH_SIZE_TUNE_ROWS", 10)
+        runner = SerialInsertRunner(EchoDB(), None, False, batch_size=100, batch_size_candidates=[2, 5])
+        batches = _Rechunker(iter([(np.zeros((30, 2)), list(range(30)))]))
+        assert runner._tune_batch_size(batches) == 20
+        assert len(batches.take(100)[1]) == 10
+        assert runner.batch_size in [2, 5]
+        assert runner.latencies.count > 0
+
+    def test_save_checkpoint(self, tmp_path, monkeypatch):
+        checkpoint = LoadCheckpoint(tmp_path / "case")
+        runner = SerialInsertRunner(EchoDB(), None, False, batch_size=5, batch_size_candidates=[8], checkpoint=checkpoint)
+        runner._row_group_sizes = [("a.parquet", 0, 100)]
+        saves = []
+        monkeypatch.setattr(checkpoint, "save", lambda *args: saves.append(args))
+        assert runner._insert_batch(np.zeros((5, 2)), list(range(5))) == 5
+        # once per batch after the insert, pending the max size of the next batch
+        assert saves == [(0, 1, 5, [("a.parquet", 0, 100)], 4, 8)]
+
+
+class TestSerialSearchRunner:
+    def test_search(self):
+        # both polars and pandas ground truth DataFrames
+        neighbors = [[0, 1, 2, 3], [3, 2, 1, 0]]
+        for gt in [pl.DataFrame({"id": [0, 1], "neighbors_id": neighbors}), pd.DataFrame({"id": [0, 1], "neighbors_id": neighbors})]:
+            runner = SerialSearchRunner(EchoDB(), np.zeros((2, 4)), gt, k=2)
+            recall, ndcg, mrr, p99 = runner.search((runner.test_data, gt))
+            assert recall == 0.5 and mrr == 0.5
+
+
+class TestLoadCheckpoint:
+    def test_save_and_resume(self, tmp_path):
+        checkpoint = LoadCheckpoint(tmp_path / "case")
+        assert not checkpoint.exists() and checkpoint.count(0, 2) == 0
+
+        sizes = [("a.parquet", 0, 10), ("a.parquet", 2, 10), ("b.parquet", 1, 10)]
+        checkpoint.save(1, 2, 25, sizes, 124)
+        assert checkpoint.exists() and checkpoint.count(1, 2) == 25
+        assert checkpoint.read(1, 2) == {"count": 25, "file": "b.parquet", "row_group": 1, "offset": 5, "last_id": 124, "pending": 0}
+        checkpoint.save(1, 2, 25, sizes, 124, pending=7)
+        assert checkpoint.read(1, 2)["pending"] == 7 and checkpoint.count(1, 2) == 25
+
+        checkpoint.check(2)
+        with pytest.raises(ValueError):
+            checkpoint.check(3)
+        checkpoint.clear()
+        assert not checkpoint.exists()
+
+
+class ChurnDB(EchoDB):
+    """keeps the ids of the deletes and upserts"""
+    def __init__(self, *args, **kwargs):
+        self.deleted, self.upserted = [], []
+
+    def delete_embeddings(self, metadata, **kwargs):
+        self.deleted.extend(metadata)
+        return len(metadata), None
+
+    def upsert_embeddings(self, embeddings, metadata, **kwargs):
+        assert len(embeddings) == len(metadata)
+        self.upserted.extend(metadata)
+        return len(metadata), None
+
+
+class TestChurnRunner:
+    def test_churn(self):
+        train = np.random.default_rng(0).random((1000, 4), dtype=np.float32)
+
+        class Data:
+            metric_type = MetricType.L2
+
+        class Dataset:
+            data = Data()
+
+            def iter_numpy(self):
+                for i in range(0, 1000, 300):
+                    # a slow reader, not timed into the durations
+                    time.sleep(0.02)
+                    yield np.arange(i, min(i + 300, 1000)), train[i : i + 300]
+
+        db = ChurnDB()
+        assert not EchoDB().support_delete() and db.support_delete()
+        runner = ChurnRunner(db, Dataset(), False, delete_ratio=0.2, reinsert_ratio=0.5, batch_size=64)
+        deleted, delete_dur, upserted, upsert_dur = runner.run()
+        assert deleted == len(db.deleted) and 100 < deleted < 300
+        assert delete_dur < 0.08 and upsert_dur < 0.08
+        assert upserted == len(db.upserted) and set(db.upserted) < set(db.deleted)
+
+        gt = runner.ground_truth(train[:5], k=10)
+        removed = set(db.deleted) - set(db.upserted)
+        for i, neighbors in enumerate(gt["neighbors_id"]):
+            kept = np.array(sorted(set(range(1000)) - removed))
+            expected = kept[np.argsort(((train[kept] - train[i]) ** 2).sum(axis=1), kind="stable")[:10]]
+            assert neighbors.tolist() == expected.tolist()
+
+
+class FullDB(EchoDB):
+    """accepts limit rows, rejects the batch of the first one over it"""
+    def __init__(self, limit: int):
+        self.limit, self.ids = limit, []
+
+    def insert_embeddings(self, embeddings, metadata, **kwargs):
+        if len(self.ids) + len(metadata) > self.limit:
+            return 0, RuntimeError("full")
+        self.ids.extend(metadata)
+        return len(metadata), None
+
+
+class FlakyDB(FullDB):
+    """FullDB failing the first `failures` inserts"""
+    def __init__(self, limit: int, failures: int):
+        super().__init__(limit)
+        self.failures = failures
+
+    def insert_embeddings(self, embeddings, metadata, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            return 0, ConnectionError("transient")
+        return super().insert_embeddings(embeddings, metadata, **kwargs)
+
+
+class TestCapacityRunner:
+    def test_batches(self):
+        runner = CapacityRunner(EchoDB(), None, False, num_writers=3, batch_size=4)
+        ids = np.arange(10)
+        batches = runner._batches(1, np.zeros((10, 2)), ids)
+        metadata = [next(batches)[1] for _ in range(6)]
+        assert metadata[:3] == [[10, 11, 12, 13], [14, 15, 16, 17], [18, 19]]
+        assert metadata[3] == [40, 41, 42, 43]
+
+    def test_insert_until_full(self):
+        db = FullDB(limit=1234)
+        runner = CapacityRunner(db, None, False, batch_size=1000)
+        assert runner._insert_until_full(np.zeros((1000, 2)), list(range(1000))) == (1000, None)
+        count, error = runner._insert_until_full(np.zeros((1000, 2)), list(range(1000, 2000)))
+        assert count == 234 and isinstance(error, RuntimeError)
+        assert db.ids == list(range(1234))
+
+    def test_insert_with_retry(self):
+        db = FlakyDB(limit=1234, failures=2)
+        runner = CapacityRunner(db, None, False, batch_size=1000, max_retry=2, retry_interval=0)
+        count, error, dur = runner._insert_with_retry(np.zeros((1, 2)), [0], time.perf_counter())
+        assert (count, error) == (1, None) and dur >= 0
+        assert runner.retry_count == 2 and db.ids == [0]
+
+        db.failures = 3
+        count, error, _ = runner._insert_with_retry(np.zeros((1, 2)), [1], time.perf_counter())
+        assert count == 0 and isinstance(error, ConnectionError)
+        assert runner.retry_count == 4 and sum(runner.timeline.errors) == 5
+
+        # the limit is not transient, stops after the retries
+        count, error, _ = runner._insert_with_retry(np.zeros((1500, 2)), list(range(1, 1501)), time.perf_counter())
+        assert count == 1233 and isinstance(error, RuntimeError)
+        assert runner.retry_count == 6 and db.ids == list(range(1234))
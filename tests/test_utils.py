@@ -1,5 +1,6 @@
 import pytest
 import logging
+import threading
 
 from vectordb_bench.backend import utils
 from vectordb_bench.metric import calc_recall
@@ -64,3 +65,30 @@ class TestGetFiles:
             for t in trains:
                 assert "shuffle" not in t
                 assert "train" in t
+
+    @pytest.mark.parametrize("size", [0, 1, 3])
+    def test_prefetch(self, size):
+        assert list(utils.prefetch(range(10), lambda x: x * 2, size)) == list(range(0, 20, 2))
+
+    def test_prefetch_error(self):
+        def prepare(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        got = []
+        with pytest.raises(ValueError):
+            for x in utils.prefetch(range(10), prepare, 2):
+                got.append(x)
+        assert got == [0, 1, 2]
+
+    def test_prefetch_stop_early(self):
+        source = iter(range(1000))
+        items = utils.prefetch(source, lambda x: x, 1)
+        for x in items:
+            if x == 2:
+                break
+        items.close()
+        # the producer stopped a few items ahead, not at the end of the source
+        assert next(source, None) is not None
+        assert not any(t.name == "prefetch" and t.is_alive() for t in threading.enumerate())
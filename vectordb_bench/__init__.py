@@ -17,7 +17,58 @@ class config:
 
     DEFAULT_DATASET_URL = env.str("DEFAULT_DATASET_URL", AWS_S3_URL)
     DATASET_LOCAL_DIR = env.path("DATASET_LOCAL_DIR", "/tmp/vectordb_bench/dataset")
+    # dataset downloads: ranged reads of DATASET_DOWNLOAD_PART_SIZE bytes of all the files by parallel threads,
+    # a failed download resumes from the parts already written
+    DATASET_DOWNLOAD_WORKERS = env.int("DATASET_DOWNLOAD_WORKERS", 8)
+    DATASET_DOWNLOAD_PART_SIZE = env.int("DATASET_DOWNLOAD_PART_SIZE", 64 * 1024 * 1024)
+    # S3-compatible endpoint serving the datasets instead of AWS S3, like a local minio, empty for AWS
+    DATASET_S3_ENDPOINT = env.str("DATASET_S3_ENDPOINT", "")
+    DATASET_S3_ANON = env.bool("DATASET_S3_ANON", True)
+    # dir of the pre-staged datasets of the LocalFS source, and how its files get into DATASET_LOCAL_DIR,
+    # "symlink", "hardlink" or "copy"; and the url of the http(s) mirror of the HTTP source
+    DATASET_LOCAL_SOURCE_DIR = env.str("DATASET_LOCAL_SOURCE_DIR", "")
+    DATASET_LOCAL_SOURCE_MODE = env.str("DATASET_LOCAL_SOURCE_MODE", "symlink")
+    DATASET_HTTP_MIRROR_URL = env.str("DATASET_HTTP_MIRROR_URL", "")
+    # convert the dataset files once into memory-mapped .npy arrays in DATASET_CACHE_DIR, reconverted when
+    # the size or mtime of a file changes, it takes as much disk as the dataset
+    DATASET_CACHE = env.bool("DATASET_CACHE", False)
+    DATASET_CACHE_DIR = env.path("DATASET_CACHE_DIR", "/tmp/vectordb_bench/dataset_cache")
+    # with GROUND_TRUTH_BUILD, ground truth files missing from a dataset, like the ones of new filter rates, are computed
+    # by brute force with GROUND_TRUTH_WORKERS processes, with at most GROUND_TRUTH_BLOCK_SIZE distances of a block in
+    # memory per process, instead of downloaded; the ones of the synthetic datasets are always computed
+    GROUND_TRUTH_BUILD = env.bool("GROUND_TRUTH_BUILD", False)
+    GROUND_TRUTH_K = env.int("GROUND_TRUTH_K", 100)
+    GROUND_TRUTH_WORKERS = env.int("GROUND_TRUTH_WORKERS", 4)
+    GROUND_TRUTH_BLOCK_SIZE = env.int("GROUND_TRUTH_BLOCK_SIZE", 20_000_000)
+    # synthetic datasets: a mixture of SYNTHETIC_NUM_CLUSTERS gaussians in a random SYNTHETIC_INTRINSIC_DIM dimensional
+    # subspace, norms of lognormal sigma SYNTHETIC_NORM_SIGMA, 0 for unit norms, all drawn from SYNTHETIC_SEED,
+    # generated SYNTHETIC_ROW_GROUP_SIZE rows at a time into files of SYNTHETIC_ROWS_PER_FILE rows
+    SYNTHETIC_SIZE = env.int("SYNTHETIC_SIZE", 1_000_000)
+    SYNTHETIC_DIM = env.int("SYNTHETIC_DIM", 128)
+    SYNTHETIC_METRIC_TYPE = env.str("SYNTHETIC_METRIC_TYPE", "L2")
+    SYNTHETIC_NUM_CLUSTERS = env.int("SYNTHETIC_NUM_CLUSTERS", 100)
+    SYNTHETIC_INTRINSIC_DIM = env.int("SYNTHETIC_INTRINSIC_DIM", 32)
+    SYNTHETIC_NORM_SIGMA = env.float("SYNTHETIC_NORM_SIGMA", 0.0)
+    SYNTHETIC_SEED = env.int("SYNTHETIC_SEED", 42)
+    SYNTHETIC_TEST_SIZE = env.int("SYNTHETIC_TEST_SIZE", 1000)
+    SYNTHETIC_ROWS_PER_FILE = env.int("SYNTHETIC_ROWS_PER_FILE", 10_000_000)
+    SYNTHETIC_ROW_GROUP_SIZE = env.int("SYNTHETIC_ROW_GROUP_SIZE", 50_000)
     NUM_PER_BATCH = env.int("NUM_PER_BATCH", 5000)
+    # writer processes of the performance cases, each inserts its own shard of the train row groups
+    NUM_INSERT_WORKERS = env.int("NUM_INSERT_WORKERS", 1)
+    # batches of train data decoded ahead of the inserts by every writer, 0 to disable
+    LOAD_PREFETCH_BATCHES = env.int("LOAD_PREFETCH_BATCHES", 2)
+    # bucket seconds of the rows/s and insert latency timeline
+    LOAD_TIMELINE_INTERVAL = env.float("LOAD_TIMELINE_INTERVAL", 10.0)
+    # insert batch sizes tried by every writer on its first rows before the rest of the load, empty to skip
+    LOAD_BATCH_SIZE_CANDIDATES = env.list("LOAD_BATCH_SIZE_CANDIDATES", [], subcast=int)
+    LOAD_BATCH_SIZE_TUNE_ROWS = env.int("LOAD_BATCH_SIZE_TUNE_ROWS", 20_000)
+    # rows committed by every writer of the performance cases, saved after every batch, to resume a failed load
+    # of the same db and case with --resume-load, off by default not to write a file per batch
+    LOAD_CHECKPOINT = env.bool("LOAD_CHECKPOINT", False)
+    LOAD_CHECKPOINT_DIR = env.path("LOAD_CHECKPOINT_DIR", "/tmp/vectordb_bench/load_checkpoint")
+    # seconds between the polls of the index build progress during optimize, if the db reports it
+    OPTIMIZE_PROGRESS_INTERVAL = env.float("OPTIMIZE_PROGRESS_INTERVAL", 10.0)
 
     DROP_OLD = env.bool("DROP_OLD", True)
     USE_SHUFFLED_DATA = env.bool("USE_SHUFFLED_DATA", True)
@@ -25,10 +76,64 @@ class config:
     NUM_CONCURRENCY = env.list("NUM_CONCURRENCY",  [1, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100], subcast=int )
 
     CONCURRENCY_DURATION = 30
+    SEARCH_REUSE_WORKER_POOL = env.bool("SEARCH_REUSE_WORKER_POOL", True)
+    SEARCH_SHARED_MEMORY = env.bool("SEARCH_SHARED_MEMORY", True)
+    # concurrent search: seconds of warm-up per concurrency excluded from the results
+    SEARCH_WARMUP_DURATION = env.int("SEARCH_WARMUP_DURATION", 0)
+    # end a concurrency once the qps of the last window is steady, or at the max duration
+    SEARCH_STEADY_STATE = env.bool("SEARCH_STEADY_STATE", False)
+    SEARCH_STEADY_WINDOW = env.int("SEARCH_STEADY_WINDOW", 10)
+    SEARCH_STEADY_CV = env.float("SEARCH_STEADY_CV", 0.05)
+    SEARCH_MAX_DURATION = env.int("SEARCH_MAX_DURATION", 90)
+    # concurrent search: bucket seconds of the qps/latency timeline, and failed queries tolerated per process
+    SEARCH_TIMELINE_INTERVAL = env.float("SEARCH_TIMELINE_INTERVAL", 1.0)
+    SEARCH_MAX_ERRORS = env.int("SEARCH_MAX_ERRORS", 0)
+    # processes running an event loop each for the concurrent search, 0 to use one process per client
+    ASYNC_SEARCH_EVENT_LOOPS = env.int("ASYNC_SEARCH_EVENT_LOOPS", 0)
+
+    # batched search stage: queries per request, and duration of each batch size
+    BATCH_SEARCH_SIZES = env.list("BATCH_SEARCH_SIZES", [1, 16, 64, 256, 1024], subcast=int)
+    BATCH_SEARCH_DURATION = env.int("BATCH_SEARCH_DURATION", 30)
+
+    # open-loop search: target QPS list, empty to skip; arrivals are "constant" or "poisson"
+    SEARCH_RATE_LIST = env.list("SEARCH_RATE_LIST", [], subcast=float)
+    SEARCH_RATE_ARRIVAL = env.str("SEARCH_RATE_ARRIVAL", "constant")
+
+    # streaming cases: rows/s of the writer after the initial load of the first STREAMING_INITIAL_RATIO of the
+    # train data, and the ratios of the train data inserted at which the search is measured, while inserting
+    STREAMING_INSERT_RATE = env.float("STREAMING_INSERT_RATE", 500.0)
+    STREAMING_INITIAL_RATIO = env.float("STREAMING_INITIAL_RATIO", 0.5)
+    STREAMING_SEARCH_STAGES = env.list("STREAMING_SEARCH_STAGES", [0.6, 0.7, 0.8, 0.9], subcast=float)
+    STREAMING_SEARCH_CONCURRENCY = env.int("STREAMING_SEARCH_CONCURRENCY", 10)
+    STREAMING_SEARCH_DURATION = env.int("STREAMING_SEARCH_DURATION", 30)
+
+    # churn cases: ratio of the train data deleted after the load, and ratio of the deleted rows upserted back,
+    # both picked at random with CHURN_SEED
+    CHURN_DELETE_RATIO = env.float("CHURN_DELETE_RATIO", 0.1)
+    CHURN_REINSERT_RATIO = env.float("CHURN_REINSERT_RATIO", 0.5)
+    CHURN_SEED = env.int("CHURN_SEED", 42)
+
+    # capacity cases: load the repeated train data with parallel writers until the first stop condition instead of
+    # one writer repeating it until an error, the memory threshold is the ratio reported by the db's memory_usage,
+    # the latency threshold the mean seconds of the last CAPACITY_LATENCY_WINDOW batches of a writer, 0 to disable
+    CAPACITY_ADAPTIVE = env.bool("CAPACITY_ADAPTIVE", False)
+    CAPACITY_NUM_WRITERS = env.int("CAPACITY_NUM_WRITERS", 4)
+    CAPACITY_MEMORY_THRESHOLD = env.float("CAPACITY_MEMORY_THRESHOLD", 0.9)
+    CAPACITY_LATENCY_THRESHOLD = env.float("CAPACITY_LATENCY_THRESHOLD", 0.0)
+    CAPACITY_LATENCY_WINDOW = env.int("CAPACITY_LATENCY_WINDOW", 10)
+    CAPACITY_MONITOR_INTERVAL = env.float("CAPACITY_MONITOR_INTERVAL", 10.0)
+    # retries of a failed insert every CAPACITY_RETRY_INTERVAL seconds before the error stops the load
+    CAPACITY_MAX_RETRY = env.int("CAPACITY_MAX_RETRY", 3)
+    CAPACITY_RETRY_INTERVAL = env.float("CAPACITY_RETRY_INTERVAL", 5.0)
 
     RESULTS_LOCAL_DIR = env.path(
         "RESULTS_LOCAL_DIR", pathlib.Path(__file__).parent.joinpath("results")
     )
+    # raw result ids of the serial search, saved for the rescore command at other k, or with --save-result-ids
+    SAVE_SEARCH_RESULT_IDS = env.bool("SAVE_SEARCH_RESULT_IDS", False)
+    SEARCH_RESULT_IDS_DIR = env.path(
+        "SEARCH_RESULT_IDS_DIR", RESULTS_LOCAL_DIR.joinpath("search_result_ids")
+    )
     CONFIG_LOCAL_DIR = env.path(
         "CONFIG_LOCAL_DIR", pathlib.Path(__file__).parent.joinpath("config-files")
     )
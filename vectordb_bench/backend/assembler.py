@@ -40,6 +40,8 @@ class Assembler:
         runners = [cls.assemble(run_id, task, source) for task in tasks]
         load_runners = [r for r in runners if r.ca.label == CaseLabel.Load]
         perf_runners = [r for r in runners if r.ca.label == CaseLabel.Performance]
+        streaming_runners = [r for r in runners if r.ca.label == CaseLabel.Streaming]
+        churn_runners = [r for r in runners if r.ca.label == CaseLabel.Churn]
 
         # group by db
         db2runner = {}
@@ -61,6 +63,8 @@ class Assembler:
         all_runners.extend(load_runners)
         for v in db2runner.values():
             all_runners.extend(v)
+        all_runners.extend(streaming_runners)
+        all_runners.extend(churn_runners)
 
         return TaskRunner(
             run_id=run_id,
@@ -50,6 +50,14 @@ class CaseType(Enum):
     Custom = 100
     PerformanceCustomDataset = 101
 
+    Streaming768D1M = 200
+    Streaming1536D500K = 201
+
+    Churn768D1M = 210
+    Churn1536D500K = 211
+
+    PerformanceSynthetic = 220
+
     def case_cls(self, custom_configs: dict | None = None) -> Type["Case"]:
         if custom_configs is None:
             return type2case.get(self)()
@@ -72,6 +80,8 @@ class CaseType(Enum):
 class CaseLabel(Enum):
     Load = auto()
     Performance = auto()
+    Streaming = auto()
+    Churn = auto()
 
 
 class Case(BaseModel):
@@ -79,7 +89,7 @@ class Case(BaseModel):
 
     Fields:
         case_id(CaseType): default 9 case type plus one custom cases.
-        label(CaseLabel): performance or load.
+        label(CaseLabel): performance, load, streaming or churn.
         dataset(DataSet): dataset for this case runner.
         filter_rate(float | None): one of 99% | 1% | None
         filters(dict | None): filters for search
@@ -122,6 +132,20 @@ class PerformanceCase(Case, BaseModel):
     optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_DEFAULT
 
 
+class StreamingCase(Case, BaseModel):
+    label: CaseLabel = CaseLabel.Streaming
+    filter_rate: float | None = None
+    load_timeout: float | int = config.LOAD_TIMEOUT_DEFAULT
+    optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_DEFAULT
+
+
+class ChurnCase(Case, BaseModel):
+    label: CaseLabel = CaseLabel.Churn
+    filter_rate: float | None = None
+    load_timeout: float | int = config.LOAD_TIMEOUT_DEFAULT
+    optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_DEFAULT
+
+
 class CapacityDim960(CapacityCase):
     case_id: CaseType = CaseType.CapacityDim960
     dataset: DatasetManager = Dataset.GIST.manager(100_000)
@@ -292,6 +316,61 @@ Results will show index building time, recall, and maximum QPS."""
     optimize_timeout: float | int | None = 15 * 60
 
 
+class Streaming768D1M(StreamingCase):
+    case_id: CaseType = CaseType.Streaming768D1M
+    dataset: DatasetManager = Dataset.COHERE.manager(1_000_000)
+    name: str = "Streaming Search Performance Test (1M Dataset, 768 Dim)"
+    description: str = """This case tests the search performance of a vector database while it keeps inserting (<b>Cohere 1M vectors</b>, 768 dimensions) at a fixed rate.
+The first part of the dataset is loaded and optimized, then the rest is inserted while searching.
+Results will show the QPS, latency and recall at several points of the insertion, recall against the data inserted before each query."""
+    load_timeout: float | int = config.LOAD_TIMEOUT_768D_1M
+    optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_768D_1M
+
+
+class Streaming1536D500K(StreamingCase):
+    case_id: CaseType = CaseType.Streaming1536D500K
+    dataset: DatasetManager = Dataset.OPENAI.manager(500_000)
+    name: str = "Streaming Search Performance Test (500K Dataset, 1536 Dim)"
+    description: str = """This case tests the search performance of a vector database while it keeps inserting (<b>OpenAI 500K vectors</b>, 1536 dimensions) at a fixed rate.
+The first part of the dataset is loaded and optimized, then the rest is inserted while searching.
+Results will show the QPS, latency and recall at several points of the insertion, recall against the data inserted before each query."""
+    load_timeout: float | int = config.LOAD_TIMEOUT_1536D_500K
+    optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_1536D_500K
+
+
+class Churn768D1M(ChurnCase):
+    case_id: CaseType = CaseType.Churn768D1M
+    dataset: DatasetManager = Dataset.COHERE.manager(1_000_000)
+    name: str = "Churn Search Performance Test (1M Dataset, 768 Dim)"
+    description: str = """This case tests the search performance of a vector database after deletes and updates (<b>Cohere 1M vectors</b>, 768 dimensions).
+The dataset is loaded and optimized, then a part of it is deleted, and some of the deleted vectors are upserted back.
+Results will show the delete and upsert time, recall against the remaining data, and QPS at varying parallel levels."""
+    load_timeout: float | int = config.LOAD_TIMEOUT_768D_1M
+    optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_768D_1M
+
+
+class Churn1536D500K(ChurnCase):
+    case_id: CaseType = CaseType.Churn1536D500K
+    dataset: DatasetManager = Dataset.OPENAI.manager(500_000)
+    name: str = "Churn Search Performance Test (500K Dataset, 1536 Dim)"
+    description: str = """This case tests the search performance of a vector database after deletes and updates (<b>OpenAI 500K vectors</b>, 1536 dimensions).
+The dataset is loaded and optimized, then a part of it is deleted, and some of the deleted vectors are upserted back.
+Results will show the delete and upsert time, recall against the remaining data, and QPS at varying parallel levels."""
+    load_timeout: float | int = config.LOAD_TIMEOUT_1536D_500K
+    optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_1536D_500K
+
+
+class PerformanceSynthetic(PerformanceCase):
+    case_id: CaseType = CaseType.PerformanceSynthetic
+    filter_rate: float | int | None = None
+    dataset: DatasetManager = Dataset.SYNTHETIC.manager(config.SYNTHETIC_SIZE)
+    name: str = "Search Performance Test (Synthetic Dataset)"
+    description: str = """This case tests the search performance of a vector database with a synthetic dataset generated locally from a seed, of the size and dimensions of config.SYNTHETIC_SIZE and config.SYNTHETIC_DIM, at varying parallel levels.
+Results will show index building time, recall, and maximum QPS."""
+    load_timeout: float | int = config.LOAD_TIMEOUT_DEFAULT
+    optimize_timeout: float | int | None = config.OPTIMIZE_TIMEOUT_DEFAULT
+
+
 def metric_type_map(s: str) -> MetricType:
     if s.lower() == "cosine":
         return MetricType.COSINE
@@ -357,4 +436,9 @@ type2case = {
     CaseType.Performance1536D5M99P: Performance1536D5M99P,
     CaseType.Performance1536D50K: Performance1536D50K,
     CaseType.PerformanceCustomDataset: PerformanceCustomDataset,
+    CaseType.Streaming768D1M: Streaming768D1M,
+    CaseType.Streaming1536D500K: Streaming1536D500K,
+    CaseType.Churn768D1M: Churn768D1M,
+    CaseType.Churn1536D500K: Churn1536D500K,
+    CaseType.PerformanceSynthetic: PerformanceSynthetic,
 }
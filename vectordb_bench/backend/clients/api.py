@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Any, Type
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
 from pydantic import BaseModel, validator, SecretStr
 
@@ -151,6 +151,67 @@ class VectorDB(ABC):
         """Wheather this database need to normalize dataset to support COSINE"""
         return False
 
+    def search_embeddings_batch(
+        self,
+        queries: list[list[float]],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[list[int]]:
+        """Get k most similar embeddings for every query in one request, in the order of queries.
+
+        Databases supporting multi-query requests should override it, the default
+        one calls search_embedding for every query.
+
+        Args:
+            queries(list[list[float]]): query embeddings.
+            k(int): Number of most similar embeddings to return for each query. Defaults to 100.
+            filters(dict, optional): filtering expression applied to every query.
+
+        Returns:
+            list[list[int]]: k most similar embeddings IDs of each query.
+        """
+        return [self.search_embedding(query, k, filters) for query in queries]
+
+    def support_ndarray_insert(self) -> bool:
+        """Wheather insert_embeddings accepts the embeddings as a float32 np.ndarray of shape (n, dim).
+
+        The loader converts the embeddings to list[list[float]] for the others.
+        """
+        return False
+
+    def support_async_search(self) -> bool:
+        """Wheather this database implements init_async and search_embedding_async.
+
+        AsyncSearchRunner runs search_embedding in threads for the others.
+        """
+        return type(self).search_embedding_async is not VectorDB.search_embedding_async
+
+    @asynccontextmanager
+    async def init_async(self) -> None:
+        """create and destory the async connections to database, only for AsyncSearchRunner.
+
+        The object is shallow copied for every coroutine, so the async client created here
+        belongs to one coroutine, it's ok to keep it in an attribute of self.
+
+        Examples:
+            >>> async with self.init_async():
+            >>>     await self.search_embedding_async()
+        """
+        raise NotImplementedError
+        yield
+
+    async def search_embedding_async(
+        self,
+        query: list[float],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[int]:
+        """Async version of search_embedding with the same args and returns, optional to implement.
+
+        Called only inside init_async(), by AsyncSearchRunner.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def insert_embeddings(
         self,
@@ -162,7 +223,8 @@ class VectorDB(ABC):
         each insert_embeddings is 5000.
 
         Args:
-            embeddings(list[list[float]]): list of embedding to add to the vector database.
+            embeddings(list[list[float]]): list of embedding to add to the vector database,
+                a float32 np.ndarray of shape (n, dim) if support_ndarray_insert().
             metadatas(list[int]): metadata associated with the embeddings, for filtering.
             **kwargs(Any): vector database specific parameters.
 
@@ -190,6 +252,60 @@ class VectorDB(ABC):
         """
         raise NotImplementedError
 
+    def support_delete(self) -> bool:
+        """Wheather this database implements delete_embeddings and upsert_embeddings"""
+        return type(self).delete_embeddings is not VectorDB.delete_embeddings and \
+            type(self).upsert_embeddings is not VectorDB.upsert_embeddings
+
+    def delete_embeddings(
+        self,
+        metadata: list[int],
+        **kwargs,
+    ) -> (int, Exception):
+        """Delete the embeddings of the ids in metadata, optional to implement. Should call self.init() first.
+
+        Args:
+            metadata(list[int]): ids of the embeddings to delete, as given to insert_embeddings.
+            **kwargs(Any): vector database specific parameters.
+
+        Returns:
+            int: deleted data count
+        """
+        raise NotImplementedError
+
+    def upsert_embeddings(
+        self,
+        embeddings: list[list[float]],
+        metadata: list[int],
+        **kwargs,
+    ) -> (int, Exception):
+        """Insert the embeddings, replacing the existing ones of the same ids, optional to implement
+        along with delete_embeddings. Same args and returns as insert_embeddings.
+        """
+        raise NotImplementedError
+
+    def support_optimize_progress(self) -> bool:
+        """Wheather this database implements optimize_progress"""
+        return type(self).optimize_progress is not VectorDB.optimize_progress
+
+    def optimize_progress(self) -> float | None:
+        """Progress of the index build of a running optimize(), in [0, 1], None if unknown at the moment.
+
+        Polled with its own connection in another process than optimize(), should call self.init() first.
+        """
+        raise NotImplementedError
+
+    def support_memory_usage(self) -> bool:
+        """Wheather this database implements memory_usage"""
+        return type(self).memory_usage is not VectorDB.memory_usage
+
+    def memory_usage(self) -> float | None:
+        """Used ratio of the memory available to the database, in [0, 1], None if unknown at the moment.
+
+        Polled by the adaptive capacity case while loading, with its own connection, should call self.init() first.
+        """
+        raise NotImplementedError
+
     # TODO: remove
     @abstractmethod
     def optimize(self):
@@ -198,7 +314,8 @@ class VectorDB(ABC):
         Should be blocked until the vectorDB is ready to be tested on
         heavy performance cases.
 
-        Time(insert the dataset) + Time(optimize) will be recorded as "load_duration" metric
+        Time(insert the dataset) + Time(optimize) will be recorded as "load_duration" metric,
+        Time(optimize) alone as "optimize_duration".
         Optimize's execution time is limited, the limited time is based on cases.
         """
         raise NotImplementedError
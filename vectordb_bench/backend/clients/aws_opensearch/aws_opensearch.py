@@ -1,10 +1,10 @@
 import logging
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 import time
 from typing import Iterable, Type
 from ..api import VectorDB, DBCaseConfig, DBConfig, IndexType
 from .config import AWSOpenSearchConfig, AWSOpenSearchIndexConfig, AWSOS_Engine
-from opensearchpy import OpenSearch
+from opensearchpy import OpenSearch, AsyncOpenSearch
 from opensearchpy.helpers import bulk
 
 log = logging.getLogger(__name__)
@@ -91,6 +91,17 @@ class AWSOpenSearch(VectorDB):
         self.client = None
         del self.client
 
+    @asynccontextmanager
+    async def init_async(self) -> None:
+        """connect to opensearch with the aiohttp client"""
+        self.async_client = AsyncOpenSearch(**self.db_config)
+
+        try:
+            yield
+        finally:
+            await self.async_client.close()
+            self.async_client = None
+
     def insert_embeddings(
         self,
         embeddings: Iterable[list[float]],
@@ -133,13 +144,8 @@ class AWSOpenSearch(VectorDB):
         """
         assert self.client is not None, "should self.init() first"
 
-        body = {
-            "size": k,
-            "query": {"knn": {self.vector_col_name: {"vector": query, "k": k}}},
-            **({"filter": {"range": {self.id_col_name: {"gt": filters["id"]}}}} if filters else {})
-        }
         try:
-            resp = self.client.search(index=self.index_name, body=body,size=k,_source=False,docvalue_fields=[self.id_col_name],stored_fields="_none_",filter_path=[f"hits.hits.fields.{self.id_col_name}"],)
+            resp = self.client.search(**self._search_kwargs(query, k, filters))
             log.info(f'Search took: {resp["took"]}')
             log.info(f'Search shards: {resp["_shards"]}')
             log.info(f'Search hits total: {resp["hits"]["total"]}')
@@ -152,6 +158,72 @@ class AWSOpenSearch(VectorDB):
             log.warning(f"Failed to search: {self.index_name} error: {str(e)}")
             raise e from None
 
+    async def search_embedding_async(
+        self,
+        query: list[float],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[int]:
+        assert self.async_client is not None, "should self.init_async() first"
+        try:
+            resp = await self.async_client.search(**self._search_kwargs(query, k, filters))
+            return [h["fields"][self.id_col_name][0] for h in resp["hits"]["hits"]]
+        except Exception as e:
+            log.warning(f"Failed to search: {self.index_name} error: {str(e)}")
+            raise e from None
+
+    def search_embeddings_batch(
+        self,
+        queries: list[list[float]],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[list[int]]:
+        """Search all the queries in one _msearch request"""
+        assert self.client is not None, "should self.init() first"
+
+        body = []
+        for query in queries:
+            body.append({})
+            body.append({
+                **self._search_body(query, k, filters),
+                "_source": False,
+                "docvalue_fields": [self.id_col_name],
+                "stored_fields": "_none_",
+            })
+        try:
+            resp = self.client.msearch(
+                index=self.index_name,
+                body=body,
+                filter_path=["responses.error", f"responses.hits.hits.fields.{self.id_col_name}"],
+            )
+            results = []
+            for r in resp["responses"]:
+                if "error" in r:
+                    raise RuntimeError(f"msearch error: {r['error']}")
+                results.append([h["fields"][self.id_col_name][0] for h in r["hits"]["hits"]])
+            return results
+        except Exception as e:
+            log.warning(f"Failed to search: {self.index_name} error: {str(e)}")
+            raise e from None
+
+    def _search_body(self, query: list[float], k: int, filters: dict | None) -> dict:
+        return {
+            "size": k,
+            "query": {"knn": {self.vector_col_name: {"vector": query, "k": k}}},
+            **({"filter": {"range": {self.id_col_name: {"gt": filters["id"]}}}} if filters else {})
+        }
+
+    def _search_kwargs(self, query: list[float], k: int, filters: dict | None) -> dict:
+        return {
+            "index": self.index_name,
+            "body": self._search_body(query, k, filters),
+            "size": k,
+            "_source": False,
+            "docvalue_fields": [self.id_col_name],
+            "stored_fields": "_none_",
+            "filter_path": [f"hits.hits.fields.{self.id_col_name}"],
+        }
+
     def optimize(self):
         """optimize will be called between insertion and search in performance cases."""
         # Call refresh first to ensure that all segments are created
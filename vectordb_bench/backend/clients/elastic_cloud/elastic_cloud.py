@@ -1,9 +1,10 @@
 import logging
 import time
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 from typing import Iterable
 from ..api import VectorDB
 from .config import ElasticCloudIndexConfig
+from elasticsearch import AsyncElasticsearch
 from elasticsearch.helpers import bulk
 
 
@@ -53,6 +54,17 @@ class ElasticCloud(VectorDB):
         self.client = None
         del(self.client)
 
+    @asynccontextmanager
+    async def init_async(self) -> None:
+        """connect to elastic with the aiohttp client"""
+        self.async_client = AsyncElasticsearch(**self.db_config, request_timeout=180)
+
+        try:
+            yield
+        finally:
+            await self.async_client.close()
+            self.async_client = None
+
     def _create_indice(self, client) -> None:
         mappings = {
             "_source": {"excludes": [self.vector_col_name]},
@@ -97,6 +109,54 @@ class ElasticCloud(VectorDB):
             log.warning(f"Failed to insert data: {self.indice} error: {str(e)}")
             return (0, e)
 
+    def delete_embeddings(
+        self,
+        metadata: list[int],
+        **kwargs,
+    ) -> (int, Exception):
+        """Delete the documents of the ids, the documents get their _id from elastic, so by a terms query."""
+        assert self.client is not None, "should self.init() first"
+
+        try:
+            res = self.client.delete_by_query(
+                index=self.indice,
+                query={"terms": {self.id_col_name: list(metadata)}},
+                refresh=True,
+                slices="auto",
+            )
+            return (res["deleted"], None)
+        except Exception as e:
+            log.warning(f"Failed to delete data: {self.indice} error: {str(e)}")
+            return (0, e)
+
+    def upsert_embeddings(
+        self,
+        embeddings: Iterable[list[float]],
+        metadata: list[int],
+        **kwargs,
+    ) -> (int, Exception):
+        """Delete the documents of the ids, then insert the embeddings, visible to the searches on return."""
+        _, error = self.delete_embeddings(metadata)
+        if error is not None:
+            return (0, error)
+
+        insert_data = [
+            {
+                "_index": self.indice,
+                "_source": {
+                    self.id_col_name: metadata[i],
+                    self.vector_col_name: embeddings[i],
+                },
+            }
+            for i in range(len(embeddings))
+        ]
+        try:
+            bulk_insert_res = bulk(self.client, insert_data, refresh="wait_for")
+            return (bulk_insert_res[0], None)
+        except Exception as e:
+            log.warning(f"Failed to upsert data: {self.indice} error: {str(e)}")
+            return (0, e)
+
     def search_embedding(
         self,
         query: list[float],
@@ -117,24 +177,10 @@ class ElasticCloud(VectorDB):
         # is_existed_res = self.client.indices.exists(index=self.indice)
         # assert is_existed_res.raw == True, "should self.init() first"
 
-        knn = {
-            "field": self.vector_col_name,
-            "k": k,
-            "num_candidates": self.case_config.num_candidates,
-            "filter": [{"range": {self.id_col_name: {"gt": filters["id"]}}}]
-            if filters
-            else [],
-            "query_vector": query,
-        }
-        size = k
         try:
             res = self.client.search(
                 index=self.indice,
-                knn=knn,
-                size=size,
-                _source=False,
-                docvalue_fields=[self.id_col_name],
-                stored_fields="_none_",
+                **self._search_body(query, k, filters),
                 filter_path=[f"hits.hits.fields.{self.id_col_name}"],
             )
             res = [h["fields"][self.id_col_name][0] for h in res["hits"]["hits"]]
@@ -144,6 +190,71 @@ class ElasticCloud(VectorDB):
             log.warning(f"Failed to search: {self.indice} error: {str(e)}")
             raise e from None
 
+    async def search_embedding_async(
+        self,
+        query: list[float],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[int]:
+        assert self.async_client is not None, "should self.init_async() first"
+        try:
+            res = await self.async_client.search(
+                index=self.indice,
+                **self._search_body(query, k, filters),
+                filter_path=[f"hits.hits.fields.{self.id_col_name}"],
+            )
+            return [h["fields"][self.id_col_name][0] for h in res["hits"]["hits"]]
+        except Exception as e:
+            log.warning(f"Failed to search: {self.indice} error: {str(e)}")
+            raise e from None
+
+    def search_embeddings_batch(
+        self,
+        queries: list[list[float]],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[list[int]]:
+        """Search all the queries in one _msearch request"""
+        assert self.client is not None, "should self.init() first"
+
+        searches = []
+        for query in queries:
+            searches.append({})
+            searches.append(self._search_body(query, k, filters))
+        try:
+            res = self.client.msearch(
+                index=self.indice,
+                searches=searches,
+                filter_path=["responses.error", f"responses.hits.hits.fields.{self.id_col_name}"],
+            )
+            results = []
+            for r in res["responses"]:
+                if "error" in r:
+                    raise RuntimeError(f"msearch error: {r['error']}")
+                results.append([h["fields"][self.id_col_name][0] for h in r["hits"]["hits"]])
+            return results
+        except Exception as e:
+            log.warning(f"Failed to search: {self.indice} error: {str(e)}")
+            raise e from None
+
+    def _search_body(self, query: list[float], k: int, filters: dict | None) -> dict:
+        knn = {
+            "field": self.vector_col_name,
+            "k": k,
+            "num_candidates": self.case_config.num_candidates,
+            "filter": [{"range": {self.id_col_name: {"gt": filters["id"]}}}]
+            if filters
+            else [],
+            "query_vector": query,
+        }
+        return {
+            "knn": knn,
+            "size": k,
+            "_source": False,
+            "docvalue_fields": [self.id_col_name],
+            "stored_fields": "_none_",
+        }
+
     def optimize(self):
         """optimize will be called between insertion and search in performance cases."""
         assert self.client is not None, "should self.init() first"
@@ -157,6 +268,14 @@ class ElasticCloud(VectorDB):
             if task_status['completed']:
                 return
 
+    def memory_usage(self) -> float | None:
+        """JVM heap used by the fullest node, the circuit breakers reject the bulk requests as it fills"""
+        assert self.client is not None, "should self.init() first"
+        nodes = self.client.nodes.stats(metric="jvm")["nodes"].values()
+        if not nodes:
+            return None
+        return max(node["jvm"]["mem"]["heap_used_percent"] for node in nodes) / 100
+
     def ready_to_load(self):
         """ready_to_load will be called before load in load cases."""
         pass
@@ -5,6 +5,7 @@ import time
 from contextlib import contextmanager
 from typing import Iterable
 
+import numpy as np
 from pymilvus import Collection, utility, CollectionSchema, DataType, FieldSchema, MilvusException, connections
 
 from .config import MilvusIndexConfig
@@ -125,9 +126,19 @@ class Milvus(VectorDB):
         assert self.col, "Please call self.init() before"
         self._optimize()
 
+    def optimize_progress(self) -> float | None:
+        progress = utility.index_building_progress(self.collection_name, index_name=self._index_name)
+        total = progress.get("total_rows", 0)
+        if total == 0:
+            return None
+        return progress.get("indexed_rows", 0) / total
+
+    def support_ndarray_insert(self) -> bool:
+        return True
+
     def insert_embeddings(
             self,
-            embeddings: Iterable[list[float]],
+            embeddings: Iterable[list[float]] | np.ndarray,
             metadata: list[int],
             **kwargs,
     ) -> (int, Exception):
@@ -136,6 +147,9 @@ class Milvus(VectorDB):
 
         insert_count = 0
         try:
+            if isinstance(embeddings, np.ndarray):
+                # pymilvus converts the vectors float by float otherwise
+                embeddings = embeddings.tolist()
             insert_data = [metadata, metadata, embeddings]
             res = self.col.insert(insert_data)
             insert_count = len(res.primary_keys)
@@ -144,6 +158,38 @@ class Milvus(VectorDB):
             return insert_count, e
         return insert_count, None
 
+    def delete_embeddings(
+            self,
+            metadata: list[int],
+            **kwargs,
+    ) -> (int, Exception):
+        assert self.col is not None
+
+        try:
+            res = self.col.delete(expr=f"{self._primary_field} in {list(metadata)}")
+        except MilvusException as e:
+            log.info(f"Failed to delete data: {e}")
+            return 0, e
+        return res.delete_count, None
+
+    def upsert_embeddings(
+            self,
+            embeddings: Iterable[list[float]] | np.ndarray,
+            metadata: list[int],
+            **kwargs,
+    ) -> (int, Exception):
+        assert self.col is not None
+        assert len(embeddings) == len(metadata)
+
+        try:
+            if isinstance(embeddings, np.ndarray):
+                embeddings = embeddings.tolist()
+            res = self.col.upsert([metadata, metadata, embeddings])
+        except MilvusException as e:
+            log.info(f"Failed to upsert data: {e}")
+            return 0, e
+        return res.upsert_count, None
+
     def search_embedding(
             self,
             query: list[float],
@@ -162,3 +208,20 @@ class Milvus(VectorDB):
 
         ret = [result.id for result in res[0]]
         return ret
+
+    def search_embeddings_batch(
+            self,
+            queries: list[list[float]],
+            k: int = 100,
+            filters: dict | None = None,
+    ) -> list[list[int]]:
+        assert self.col is not None
+
+        res = self.col.search(
+            data=queries,
+            anns_field=self._vector_field,
+            param=self.case_config.search_param(),
+            limit=k,
+        )
+
+        return [[result.id for result in hits] for hits in res]
@@ -2,11 +2,12 @@
 
 import logging
 import pprint
-from contextlib import contextmanager
-from typing import Any, Generator, Optional, Tuple, Sequence
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, AsyncGenerator, Generator, Optional, Tuple, Sequence
 
+import numpy as np
 import psycopg
-from pgvector.psycopg import register_vector
+from pgvector.psycopg import register_vector, register_vector_async
 from psycopg import Connection, Cursor, sql
 
 from .config import PgVectorConfigDict, PgVectorIndexConfig
@@ -100,14 +101,9 @@ class PgVector(VectorDB):
         self.conn, self.cursor = self._create_connection(**self.db_config)
 
         # index configuration may have commands defined that we should set during each client session
-        session_options: Sequence[dict[str, Any]] = self.case_config.session_param()["session_options"]
-
-        if len(session_options) > 0:
-            for setting in session_options:
-                command = sql.SQL("SET {setting_name} " + "= {val};").format(
-                    setting_name=sql.Identifier(setting['parameter']['setting_name']),
-                    val=sql.Identifier(str(setting['parameter']['val'])),
-                )
+        session_commands = self._session_commands()
+        if len(session_commands) > 0:
+            for command in session_commands:
                 log.debug(command.as_string(self.cursor))
                 self.cursor.execute(command)
             self.conn.commit()
@@ -120,6 +116,33 @@ class PgVector(VectorDB):
             self.cursor = None
             self.conn = None
 
+    @asynccontextmanager
+    async def init_async(self) -> AsyncGenerator[None, None]:
+        self.async_conn = await psycopg.AsyncConnection.connect(**self.db_config)
+        await register_vector_async(self.async_conn)
+
+        session_commands = self._session_commands()
+        if len(session_commands) > 0:
+            for command in session_commands:
+                await self.async_conn.execute(command)
+            await self.async_conn.commit()
+
+        try:
+            yield
+        finally:
+            await self.async_conn.close()
+            self.async_conn = None
+
+    def _session_commands(self) -> list[sql.Composed]:
+        session_options: Sequence[dict[str, Any]] = self.case_config.session_param()["session_options"]
+        return [
+            sql.SQL("SET {setting_name} " + "= {val};").format(
+                setting_name=sql.Identifier(setting['parameter']['setting_name']),
+                val=sql.Identifier(str(setting['parameter']['val'])),
+            )
+            for setting in session_options
+        ]
+
     def _drop_table(self):
         assert self.conn is not None, "Connection is not initialized"
         assert self.cursor is not None, "Cursor is not initialized"
@@ -138,6 +161,28 @@ class PgVector(VectorDB):
     def optimize(self):
         self._post_insert()
 
+    def optimize_progress(self) -> float | None:
+        assert self.conn is not None, "Connection is not initialized"
+        assert self.cursor is not None, "Cursor is not initialized"
+
+        self.cursor.execute(
+            "SELECT blocks_done, blocks_total, tuples_done, tuples_total "
+            "FROM pg_stat_progress_create_index WHERE relid = to_regclass(%s)",
+            (f"public.{self.table_name}",),
+        )
+        row = self.cursor.fetchone()
+        # the statistics are a snapshot until the end of the transaction
+        self.conn.commit()
+        if row is None:
+            return None
+
+        blocks_done, blocks_total, tuples_done, tuples_total = row
+        if tuples_total:
+            return tuples_done / tuples_total
+        if blocks_total:
+            return blocks_done / blocks_total
+        return 0.0
+
     def _post_insert(self):
         log.info(f"{self.name} post insert before optimize")
         if self.case_config.create_index_after_load:
@@ -290,9 +335,13 @@ class PgVector(VectorDB):
             )
             raise e from None
 
+    def support_ndarray_insert(self) -> bool:
+        # the binary COPY dumper of pgvector writes the float32 rows as they are
+        return True
+
     def insert_embeddings(
             self,
-            embeddings: list[list[float]],
+            embeddings: list[list[float]] | np.ndarray,
             metadata: list[int],
             **kwargs: Any,
     ) -> Tuple[int, Optional[Exception]]:
@@ -317,6 +366,57 @@ class PgVector(VectorDB):
             )
             return 0, e
 
+    def delete_embeddings(
+            self,
+            metadata: list[int],
+            **kwargs: Any,
+    ) -> Tuple[int, Optional[Exception]]:
+        assert self.conn is not None, "Connection is not initialized"
+        assert self.cursor is not None, "Cursor is not initialized"
+
+        try:
+            self.cursor.execute(
+                sql.SQL("DELETE FROM public.{table_name} WHERE id = ANY(%s)").format(
+                    table_name=sql.Identifier(self.table_name)
+                ),
+                (list(metadata),),
+            )
+            deleted = self.cursor.rowcount
+            self.conn.commit()
+            return deleted, None
+        except Exception as e:
+            self.conn.rollback()
+            log.warning(
+                f"Failed to delete data from pgvector table ({self.table_name}), error: {e}"
+            )
+            return 0, e
+
+    def upsert_embeddings(
+            self,
+            embeddings: list[list[float]] | np.ndarray,
+            metadata: list[int],
+            **kwargs: Any,
+    ) -> Tuple[int, Optional[Exception]]:
+        assert self.conn is not None, "Connection is not initialized"
+        assert self.cursor is not None, "Cursor is not initialized"
+
+        try:
+            self.cursor.executemany(
+                sql.SQL(
+                    "INSERT INTO public.{table_name} (id, embedding) VALUES (%s, %s) "
+                    "ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding"
+                ).format(table_name=sql.Identifier(self.table_name)),
+                [(row, np.asarray(embeddings[i], dtype=np.float32)) for i, row in enumerate(metadata)],
+            )
+            self.conn.commit()
+            return len(metadata), None
+        except Exception as e:
+            self.conn.rollback()
+            log.warning(
+                f"Failed to upsert data into pgvector table ({self.table_name}), error: {e}"
+            )
+            return 0, e
+
     def search_embedding(
             self,
             query: list[float],
@@ -332,3 +432,17 @@ class PgVector(VectorDB):
         result = self.cursor.execute(search_query, (query, k), prepare=True, binary=True)
 
         return [int(i[0]) for i in result.fetchall()]
+
+    async def search_embedding_async(
+            self,
+            query: list[float],
+            k: int = 100,
+            filters: dict | None = None,
+    ) -> list[int]:
+        assert self.async_conn is not None, "Async connection is not initialized"
+
+        search_query = self._generate_search_query()
+
+        result = await self.async_conn.execute(search_query, (query, k), prepare=True, binary=True)
+
+        return [int(i[0]) for i in await result.fetchall()]
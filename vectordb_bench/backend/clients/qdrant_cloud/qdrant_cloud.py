@@ -2,20 +2,22 @@
 
 import logging
 import time
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
 from ..api import VectorDB, DBCaseConfig
 from qdrant_client.http.models import (
     CollectionStatus,
+    SearchRequest,
     VectorParams,
     PayloadSchemaType,
     Batch,
     Filter,
     FieldCondition,
     Range,
+    PointIdsList,
 )
 
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 
 
 log = logging.getLogger(__name__)
@@ -59,6 +61,15 @@ class QdrantCloud(VectorDB):
         self.qdrant_client = None
         del(self.qdrant_client)
 
+    @asynccontextmanager
+    async def init_async(self) -> None:
+        self.async_qdrant_client = AsyncQdrantClient(**self.db_config)
+        try:
+            yield
+        finally:
+            await self.async_qdrant_client.close()
+            self.async_qdrant_client = None
+
     def ready_to_load(self):
         pass
 
@@ -127,6 +138,34 @@ class QdrantCloud(VectorDB):
         else:
             return len(metadata), None
 
+    def delete_embeddings(
+        self,
+        metadata: list[int],
+        **kwargs,
+    ) -> (int, Exception):
+        """Delete the points of the ids. should call self.init() first"""
+        assert self.qdrant_client is not None
+        try:
+            _ = self.qdrant_client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(metadata)),
+                wait=True,
+            )
+        except Exception as e:
+            log.info(f"Failed to delete data, {e}")
+            return 0, e
+        else:
+            return len(metadata), None
+
+    def upsert_embeddings(
+        self,
+        embeddings: list[list[float]],
+        metadata: list[int],
+        **kwargs,
+    ) -> (int, Exception):
+        """insert_embeddings already upserts the points by id"""
+        return self.insert_embeddings(embeddings, metadata, **kwargs)
+
     def search_embedding(
         self,
         query: list[float],
@@ -139,24 +178,56 @@ class QdrantCloud(VectorDB):
         """
         assert self.qdrant_client is not None
 
-        f = None
-        if filters:
-            f = Filter(
-                must=[FieldCondition(
-                    key = self._primary_field,
-                    range = Range(
-                        gt=filters.get('id'),
-                    ),
-                )]
-            )
-
         res = self.qdrant_client.search(
             collection_name=self.collection_name,
             query_vector=query,
             limit=k,
-            query_filter=f,
+            query_filter=self._search_filter(filters),
             #  with_payload=True,
         ),
 
         ret = [result.id for result in res[0]]
         return ret
+
+    def search_embeddings_batch(
+        self,
+        queries: list[list[float]],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[list[int]]:
+        assert self.qdrant_client is not None
+
+        f = self._search_filter(filters)
+        res = self.qdrant_client.search_batch(
+            collection_name=self.collection_name,
+            requests=[SearchRequest(vector=query, limit=k, filter=f) for query in queries],
+        )
+        return [[result.id for result in hits] for hits in res]
+
+    async def search_embedding_async(
+        self,
+        query: list[float],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[int]:
+        assert self.async_qdrant_client is not None
+
+        res = await self.async_qdrant_client.search(
+            collection_name=self.collection_name,
+            query_vector=query,
+            limit=k,
+            query_filter=self._search_filter(filters),
+        )
+        return [result.id for result in res]
+
+    def _search_filter(self, filters: dict | None) -> Filter | None:
+        if not filters:
+            return None
+        return Filter(
+            must=[FieldCondition(
+                key = self._primary_field,
+                range = Range(
+                    gt=filters.get('id'),
+                ),
+            )]
+        )
@@ -1,9 +1,10 @@
 import logging
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 from typing import Any, Type
 from ..api import VectorDB, DBConfig, DBCaseConfig, EmptyDBCaseConfig, IndexType
 from .config import RedisConfig
 import redis
+import redis.asyncio
 from redis.commands.search.field import TagField, VectorField, NumericField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
@@ -80,6 +81,15 @@ class Redis(VectorDB):
         self.conn.close()
         self.conn = None
 
+    @asynccontextmanager
+    async def init_async(self) -> None:
+        self.async_conn = redis.asyncio.Redis(host=self.db_config["host"], port=self.db_config["port"], password=self.db_config["password"], db=0)
+        try:
+            yield
+        finally:
+            await self.async_conn.aclose()
+            self.async_conn = None
+
 
     def ready_to_search(self) -> bool:
         """Check if the database is ready to search."""
@@ -92,10 +102,20 @@ class Redis(VectorDB):
     def optimize(self) -> None:
         pass
 
+    def memory_usage(self) -> float | None:
+        """used_memory of the server over its maxmemory, over the memory of the host without maxmemory"""
+        info = self.conn.info("memory")
+        limit = info.get("maxmemory") or info.get("total_system_memory")
+        if not limit:
+            return None
+        return info["used_memory"] / limit
+
+    def support_ndarray_insert(self) -> bool:
+        return True
 
     def insert_embeddings(
         self,
-        embeddings: list[list[float]],
+        embeddings: list[list[float]] | np.ndarray,
         metadata: list[int],
         **kwargs: Any,
     ) -> (int, Exception):
@@ -107,7 +127,8 @@ class Redis(VectorDB):
         try:
             with self.conn.pipeline(transaction=False) as pipe:
                 for i, embedding in enumerate(embeddings):
-                    embedding = np.array(embedding).astype(np.float32)
+                    # no copy of the float32 rows of an ndarray
+                    embedding = np.asarray(embedding, dtype=np.float32)
                     pipe.hset(metadata[i], mapping = {
                         "id": str(metadata[i]),
                         "metadata": metadata[i], 
@@ -123,6 +144,32 @@ class Redis(VectorDB):
             return 0, e
         
         return result_len, None
+
+    def delete_embeddings(
+        self,
+        metadata: list[int],
+        **kwargs: Any,
+    ) -> (int, Exception):
+        """Delete the hashes of the ids, they are dropped from the index along with them.
+        Should call self.init() first.
+        """
+        batch_size = 1000
+        deleted = 0
+        try:
+            for offset in range(0, len(metadata), batch_size):
+                deleted += self.conn.delete(*metadata[offset : offset + batch_size])
+        except Exception as e:
+            return deleted, e
+        return deleted, None
+
+    def upsert_embeddings(
+        self,
+        embeddings: list[list[float]] | np.ndarray,
+        metadata: list[int],
+        **kwargs: Any,
+    ) -> (int, Exception):
+        """insert_embeddings already overwrites the hashes of the same ids"""
+        return self.insert_embeddings(embeddings, metadata, **kwargs)
     
     def search_embedding(
         self,
@@ -133,7 +180,44 @@ class Redis(VectorDB):
         **kwargs: Any,
     ) -> (list[int]):
         assert self.conn is not None
-        
+
+        query_obj, query_params = self._build_query(query, k, filters)
+        res = self.conn.ft(INDEX_NAME).search(query_obj, query_params)
+        # doc in res of format {'id': '9831', 'payload': None, 'score': '1.19209289551e-07'}
+        return [int(doc["id"]) for doc in res.docs]
+
+    async def search_embedding_async(
+        self,
+        query: list[float],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[int]:
+        assert self.async_conn is not None
+
+        query_obj, query_params = self._build_query(query, k, filters)
+        res = await self.async_conn.ft(INDEX_NAME).search(query_obj, query_params)
+        return [int(doc["id"]) for doc in res.docs]
+
+    def search_embeddings_batch(
+        self,
+        queries: list[list[float]],
+        k: int = 100,
+        filters: dict | None = None,
+    ) -> list[list[int]]:
+        """Send all the FT.SEARCH commands in one pipeline"""
+        assert self.conn is not None
+
+        with self.conn.pipeline(transaction=False) as pipe:
+            for query in queries:
+                query_obj, query_params = self._build_query(query, k, filters)
+                params = [item for name, value in query_params.items() for item in (name, value)]
+                pipe.execute_command("FT.SEARCH", INDEX_NAME, *query_obj.get_args(), "PARAMS", len(params), *params)
+            raws = pipe.execute()
+
+        # raw FT.SEARCH reply: the total, then the key and the returned fields of every doc, the keys are the ids
+        return [[int(key) for key in raw[1::2]] for raw in raws]
+
+    def _build_query(self, query: list[float], k: int, filters: dict | None) -> tuple[Query, dict]:
         query_vector = np.array(query).astype(np.float32).tobytes()
         query_obj = Query(f"*=>[KNN {k} @vector $vec as score]").sort_by("score").return_fields("id", "score").paging(0, k).dialect(2)
         query_params = {"vec": query_vector}
@@ -150,9 +234,7 @@ class Redis(VectorDB):
                 query_obj = Query(f"@id:{ {id_value} }=>[KNN {k} @vector $vec as score]").sort_by("score").return_fields("id", "score").paging(0, k).dialect(2)
             else: #metadata only case, greater than or equal to metadata value
                 query_obj = Query(f"@metadata:[{metadata_value} +inf]=>[KNN {k} @vector $vec as score]").sort_by("score").return_fields("id", "score").paging(0, k).dialect(2) 
-        res = self.conn.ft(INDEX_NAME).search(query_obj, query_params)
-        # doc in res of format {'id': '9831', 'payload': None, 'score': '1.19209289551e-07'}
-        return [int(doc["id"]) for doc in res.docs]
+        return query_obj, query_params
 
     
         
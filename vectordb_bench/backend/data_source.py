@@ -1,6 +1,13 @@
 import logging
 import pathlib
 import typing
+import re
+import hashlib
+import json
+import math
+import threading
+import concurrent.futures
+from dataclasses import dataclass
 from enum import Enum
 from tqdm import tqdm
 import os
@@ -17,6 +24,8 @@ DatasetReader = typing.TypeVar("DatasetReader")
 class DatasetSource(Enum):
     S3 = "S3"
     AliyunOSS = "AliyunOSS"
+    LocalFS = "LocalFS"
+    HTTP = "HTTP"
 
     def reader(self) -> DatasetReader:
         if self == DatasetSource.S3:
@@ -25,40 +34,138 @@ class DatasetSource(Enum):
         if self == DatasetSource.AliyunOSS:
             return AliyunOSSReader()
 
+        if self == DatasetSource.LocalFS:
+            return LocalFSReader()
+
+        if self == DatasetSource.HTTP:
+            return HTTPReader()
+
+
+@dataclass
+class RemoteFile:
+    """A file of a dataset in the remote root, etag is the checksum of the object store, None if unknown"""
+    name: str
+    size: int
+    etag: str | None = None
+
+
+def _md5_etag(local: pathlib.Path, part_size: int) -> str:
+    """etag of the file uploaded in parts of part_size, md5 of the md5 of every part followed by the count of the parts"""
+    digests = []
+    with open(local, "rb") as f:
+        while chunk := f.read(part_size):
+            digests.append(hashlib.md5(chunk).digest())
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+def verify_etag(local: pathlib.Path, etag: str | None) -> bool | None:
+    """Whether the file matches the etag, None if it can't be verified
+
+    A single part etag is the md5 of the file. The part size of a multipart one is unknown,
+    the usual sizes of whole MiBs giving that count of parts are tried.
+    """
+    etag = (etag or "").strip('"').lower()
+    if not re.fullmatch(r"[0-9a-f]{32}(-[0-9]+)?", etag):
+        # no etag, or not a md5 one like the ones of http servers
+        return None
+    if "-" not in etag:
+        md5 = hashlib.md5()
+        with open(local, "rb") as f:
+            while chunk := f.read(16 * 1024 * 1024):
+                md5.update(chunk)
+        return md5.hexdigest() == etag
+
+    size, num_parts = os.path.getsize(local), int(etag.rsplit("-", 1)[1])
+    mib = 1024 * 1024
+    candidates = [math.ceil(size / num_parts / mib) * mib] + [n * mib for n in (8, 16, 64, 5, 100)]
+    for part_size in dict.fromkeys(candidates):
+        if math.ceil(size / part_size) == num_parts and _md5_etag(local, part_size) == etag:
+            return True
+    return None
+
+
+class _PartialFile:
+    """{file}.part being downloaded, the parts written in it are saved in {file}.part.json to resume the download"""
+
+    def __init__(self, remote: RemoteFile, local: pathlib.Path, part_size: int):
+        self.remote = remote
+        self.local = local
+        self.part_size = part_size
+        self.tmp = local.with_name(f"{local.name}.part")
+        self.state = local.with_name(f"{local.name}.part.json")
+        self.num_parts = math.ceil(remote.size / part_size)
+        self.done = self._resume()
+        self._lock = threading.Lock()
+
+    def _resume(self) -> set[int]:
+        if self.tmp.exists() and self.state.exists():
+            with open(self.state) as f:
+                state = json.load(f)
+            if (state.get("size"), state.get("etag"), state.get("part_size")) == (self.remote.size, self.remote.etag, self.part_size) \
+                    and os.path.getsize(self.tmp) == self.remote.size:
+                log.info(f"Resume the download of {self.local.name}, {len(state['done'])}/{self.num_parts} parts done")
+                return set(state["done"])
+
+        with open(self.tmp, "wb") as f:
+            f.truncate(self.remote.size)
+        return set()
+
+    def pending(self) -> list[tuple[int, int, int]]:
+        """index, start, end of the parts to download"""
+        return [
+            (i, i * self.part_size, min(self.remote.size, (i + 1) * self.part_size))
+            for i in range(self.num_parts) if i not in self.done
+        ]
+
+    def write(self, index: int, start: int, data: bytes) -> bool:
+        """write a downloaded part, returns whether it's the last one"""
+        with open(self.tmp, "r+b") as f:
+            f.seek(start)
+            f.write(data)
+        with self._lock:
+            self.done.add(index)
+            tmp = self.state.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump({"size": self.remote.size, "etag": self.remote.etag, "part_size": self.part_size, "done": sorted(self.done)}, f)
+            tmp.replace(self.state)
+            return len(self.done) == self.num_parts
+
+    def finish(self):
+        """verify the checksum and move the file in place, a corrupted download is removed to start over"""
+        verified = verify_etag(self.tmp, self.remote.etag)
+        if verified is False:
+            self.tmp.unlink()
+            self.state.unlink(missing_ok=True)
+            raise ValueError(f"Checksum of the downloaded {self.local.name} doesn't match etag {self.remote.etag}")
+        if verified is None and self.remote.etag:
+            log.warning(f"Unable to verify the checksum of {self.local.name}, etag={self.remote.etag}")
+        self.tmp.replace(self.local)
+        self.state.unlink(missing_ok=True)
+
 
 class DatasetReader(ABC):
+    """Downloads the dataset files from remote_root
+
+    The readers only list the files of a dataset and read ranges of them, read() downloads the parts of
+    config.DATASET_DOWNLOAD_PART_SIZE bytes of all the files with config.DATASET_DOWNLOAD_WORKERS threads.
+    """
     source: DatasetSource
     remote_root: str
 
     @abstractmethod
-    def read(self, dataset: str, files: list[str], local_ds_root: pathlib.Path):
-        """read dataset files from remote_root to local_ds_root,
-
-        Args:
-            dataset(str): for instance "sift_small_500k"
-            files(list[str]):  all filenames of the dataset
-            local_ds_root(pathlib.Path): whether to write the remote data.
-        """
+    def ls(self, dataset: str, files: list[str]) -> dict[str, RemoteFile]:
+        """the files of the dataset by file name, all of them in one listing call if the source lists,
+        only the ones in files otherwise"""
         pass
 
     @abstractmethod
-    def validate_file(self, remote: pathlib.Path, local: pathlib.Path) -> bool:
+    def read_range(self, dataset: str, file: str, start: int, end: int) -> bytes:
+        """bytes [start, end) of a file of the dataset"""
         pass
 
-
-class AliyunOSSReader(DatasetReader):
-    source: DatasetSource = DatasetSource.AliyunOSS
-    remote_root: str = config.ALIYUN_OSS_URL
-
-    def __init__(self):
-        import oss2
-        self.bucket = oss2.Bucket(oss2.AnonymousAuth(), self.remote_root, "benchmark", True)
-
-    def validate_file(self, remote: pathlib.Path, local: pathlib.Path) -> bool:
-        info = self.bucket.get_object_meta(remote.as_posix())
-
+    def validate_file(self, remote: RemoteFile, local: pathlib.Path) -> bool:
         # check size equal
-        remote_size, local_size = info.content_length, os.path.getsize(local)
+        remote_size, local_size = remote.size, os.path.getsize(local)
         if remote_size != local_size:
             log.info(f"local file: {local} size[{local_size}] not match with remote size[{remote_size}]")
             return False
@@ -66,31 +173,81 @@ class AliyunOSSReader(DatasetReader):
         return True
 
     def read(self, dataset: str, files: list[str], local_ds_root: pathlib.Path):
-        downloads = []
+        """read dataset files from remote_root to local_ds_root,
+
+        Args:
+            dataset(str): for instance "sift_small_500k"
+            files(list[str]):  all filenames of the dataset
+            local_ds_root(pathlib.Path): whether to write the remote data.
+        """
         if not local_ds_root.exists():
             log.info(f"local dataset root path not exist, creating it: {local_ds_root}")
             local_ds_root.mkdir(parents=True)
-            downloads = [(pathlib.PurePosixPath("benchmark", dataset, f), local_ds_root.joinpath(f)) for f in files]
 
-        else:
-            for file in files:
-                remote_file = pathlib.PurePosixPath("benchmark", dataset, file)
-                local_file = local_ds_root.joinpath(file)
+        remote_files = self.ls(dataset, files)
+        missing = [f for f in files if f not in remote_files]
+        if missing:
+            raise FileNotFoundError(f"{missing} not found in {self.remote_root}{dataset}")
 
-                if (not local_file.exists()) or (not self.validate_file(remote_file, local_file)):
-                    log.info(f"local file: {local_file} not match with remote: {remote_file}; add to downloading list")
-                    downloads.append((remote_file, local_file))
+        downloads = []
+        for file in files:
+            local_file = local_ds_root.joinpath(file)
+            if (not local_file.exists()) or (not self.validate_file(remote_files[file], local_file)):
+                log.info(f"local file: {local_file} not match with remote: {file}; add to downloading list")
+                downloads.append(_PartialFile(remote_files[file], local_file, config.DATASET_DOWNLOAD_PART_SIZE))
 
         if len(downloads) == 0:
             return
 
         log.info(f"Start to downloading files, total count: {len(downloads)}")
-        for remote_file, local_file in tqdm(downloads):
-            log.debug(f"downloading file {remote_file} to {local_file}")
-            self.bucket.get_object_to_file(remote_file.as_posix(), local_file.absolute())
-
+        self._download(dataset, downloads)
         log.info(f"Succeed to download all files, downloaded file count = {len(downloads)}")
 
+    def _download_part(self, dataset: str, partial: _PartialFile, index: int, start: int, end: int, progress: tqdm):
+        data = self.read_range(dataset, partial.remote.name, start, end)
+        if len(data) != end - start:
+            raise IOError(f"Read {len(data)} bytes of {partial.remote.name} at {start}, expected {end - start}")
+        if partial.write(index, start, data):
+            partial.finish()
+        progress.update(len(data))
+
+    def _download(self, dataset: str, downloads: list[_PartialFile]):
+        for partial in downloads:
+            if not partial.pending():
+                partial.finish()
+        parts = [(partial, *part) for partial in downloads for part in partial.pending()]
+        total = sum(end - start for _, _, start, end in parts)
+        with tqdm(total=total, unit="B", unit_scale=True) as progress, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=config.DATASET_DOWNLOAD_WORKERS) as executor:
+            futures = [executor.submit(self._download_part, dataset, *part, progress) for part in parts]
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_EXCEPTION)
+            failed = [f for f in done if f.exception() is not None]
+            if failed:
+                for f in futures:
+                    f.cancel()
+                raise failed[0].exception()
+
+
+class AliyunOSSReader(DatasetReader):
+    source: DatasetSource = DatasetSource.AliyunOSS
+    remote_root: str = config.ALIYUN_OSS_URL
+
+    def __init__(self):
+        import oss2
+        self.bucket = oss2.Bucket(oss2.AnonymousAuth(), self.remote_root, "benchmark", True)
+
+    def ls(self, dataset: str, files: list[str]) -> dict[str, RemoteFile]:
+        import oss2
+        prefix = f"benchmark/{dataset}/"
+        return {
+            obj.key[len(prefix):]: RemoteFile(obj.key[len(prefix):], obj.size, obj.etag)
+            for obj in oss2.ObjectIterator(self.bucket, prefix=prefix, delimiter="/")
+            if not obj.is_prefix()
+        }
+
+    def read_range(self, dataset: str, file: str, start: int, end: int) -> bytes:
+        # inclusive range
+        return self.bucket.get_object(f"benchmark/{dataset}/{file}", byte_range=(start, end - 1)).read()
 
 
 class AwsS3Reader(DatasetReader):
@@ -99,9 +256,12 @@ class AwsS3Reader(DatasetReader):
 
     def __init__(self):
         import s3fs
+        client_kwargs = {'region_name': 'us-west-2'}
+        if config.DATASET_S3_ENDPOINT:
+            client_kwargs['endpoint_url'] = config.DATASET_S3_ENDPOINT
         self.fs = s3fs.S3FileSystem(
-            anon=True,
-            client_kwargs={'region_name': 'us-west-2'}
+            anon=config.DATASET_S3_ANON,
+            client_kwargs=client_kwargs,
         )
 
     def ls_all(self, dataset: str):
@@ -112,42 +272,153 @@ class AwsS3Reader(DatasetReader):
             log.info(n)
         return names
 
+    def ls(self, dataset: str, files: list[str]) -> dict[str, RemoteFile]:
+        entries = self.fs.ls(pathlib.PurePosixPath(self.remote_root, dataset).as_posix(), detail=True, refresh=True)
+        files = {}
+        for entry in entries:
+            if entry.get("type") != "file":
+                continue
+            name = entry["name"].rsplit("/", 1)[-1]
+            files[name] = RemoteFile(name, entry["size"], entry.get("ETag"))
+        return files
+
+    def read_range(self, dataset: str, file: str, start: int, end: int) -> bytes:
+        return self.fs.cat_file(pathlib.PurePosixPath(self.remote_root, dataset, file).as_posix(), start=start, end=end)
+
+
+class LocalFSReader(DatasetReader):
+    """Datasets pre-staged in config.DATASET_LOCAL_SOURCE_DIR, like a NFS mount, in the layout of the object stores
+
+    The files are symlinked into the local dataset dir by default, hardlinked, or copied with the parallel
+    ranged reads of the downloads, according to config.DATASET_LOCAL_SOURCE_MODE.
+    """
+    source: DatasetSource = DatasetSource.LocalFS
+
+    def __init__(self, root: pathlib.Path | str | None = None, mode: str | None = None):
+        root = root or config.DATASET_LOCAL_SOURCE_DIR
+        if not root:
+            raise ValueError("Please set DATASET_LOCAL_SOURCE_DIR to the dir of the pre-staged datasets")
+        self.remote_root = f"{pathlib.Path(root).as_posix()}/"
+        self.root = pathlib.Path(root)
+        self.mode = mode or config.DATASET_LOCAL_SOURCE_MODE
+        if self.mode not in ("symlink", "hardlink", "copy"):
+            raise ValueError(f"DATASET_LOCAL_SOURCE_MODE should be symlink, hardlink or copy, got {self.mode}")
+
+    def ls(self, dataset: str, files: list[str]) -> dict[str, RemoteFile]:
+        dataset_dir = self.root.joinpath(dataset)
+        if not dataset_dir.is_dir():
+            return {}
+        return {f.name: RemoteFile(f.name, f.stat().st_size) for f in dataset_dir.iterdir() if f.is_file()}
+
+    def read_range(self, dataset: str, file: str, start: int, end: int) -> bytes:
+        with open(self.root.joinpath(dataset, file), "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def _link(self, remote: pathlib.Path, local: pathlib.Path):
+        if self.mode == "hardlink":
+            try:
+                os.link(remote, local)
+                return
+            except OSError as e:
+                log.warning(f"Unable to hardlink {remote}, symlink it instead: {e}")
+        local.symlink_to(remote.absolute())
 
     def read(self, dataset: str, files: list[str], local_ds_root: pathlib.Path):
-        downloads = []
-        if not local_ds_root.exists():
-            log.info(f"local dataset root path not exist, creating it: {local_ds_root}")
-            local_ds_root.mkdir(parents=True)
-            downloads = [pathlib.PurePosixPath(self.remote_root, dataset, f) for f in files]
-
-        else:
-            for file in files:
-                remote_file = pathlib.PurePosixPath(self.remote_root, dataset, file)
-                local_file = local_ds_root.joinpath(file)
-
-                if (not local_file.exists()) or (not self.validate_file(remote_file, local_file)):
-                    log.info(f"local file: {local_file} not match with remote: {remote_file}; add to downloading list")
-                    downloads.append(remote_file)
-
-        if len(downloads) == 0:
-            return
-
-        log.info(f"Start to downloading files, total count: {len(downloads)}")
-        for s3_file in tqdm(downloads):
-            log.debug(f"downloading file {s3_file} to {local_ds_root}")
-            self.fs.download(s3_file, local_ds_root.as_posix())
-
-        log.info(f"Succeed to download all files, downloaded file count = {len(downloads)}")
-
-
-    def validate_file(self, remote: pathlib.Path, local: pathlib.Path) -> bool:
-        # info() uses ls() inside, maybe we only need to ls once
-        info = self.fs.info(remote)
-
-        # check size equal
-        remote_size, local_size = info.get("size"), os.path.getsize(local)
-        if remote_size != local_size:
-            log.info(f"local file: {local} size[{local_size}] not match with remote size[{remote_size}]")
-            return False
-
-        return True
+        if self.mode == "copy":
+            return super().read(dataset, files, local_ds_root)
+
+        local_ds_root.mkdir(parents=True, exist_ok=True)
+        remote_files = self.ls(dataset, files)
+        missing = [f for f in files if f not in remote_files]
+        if missing:
+            raise FileNotFoundError(f"{missing} not found in {self.remote_root}{dataset}")
+
+        count = 0
+        for file in files:
+            remote_file, local_file = self.root.joinpath(dataset, file), local_ds_root.joinpath(file)
+            if local_file.exists() and (local_file.samefile(remote_file) or self.validate_file(remote_files[file], local_file)):
+                continue
+            if local_file.is_symlink() or local_file.exists():
+                local_file.unlink()
+            self._link(remote_file, local_file)
+            count += 1
+        log.info(f"Linked {count} files of {self.remote_root}{dataset} into {local_ds_root} by {self.mode}")
+
+
+class HTTPReader(DatasetReader):
+    """Datasets served by a http(s) mirror at config.DATASET_HTTP_MIRROR_URL, in the layout of the object stores
+
+    The server has to support HEAD requests, the etag is verified if it's a md5 one. The files are downloaded
+    in parts by Range requests, or in one request each if HEAD reports no `Accept-Ranges: bytes` for them.
+    """
+    source: DatasetSource = DatasetSource.HTTP
+
+    def __init__(self, url: str | None = None):
+        import requests
+        self._requests = requests
+        url = url or config.DATASET_HTTP_MIRROR_URL
+        if not url:
+            raise ValueError("Please set DATASET_HTTP_MIRROR_URL to the url of the dataset mirror")
+        self.remote_root = url.rstrip("/") + "/"
+        self._local = threading.local()
+        # whether HEAD reports `Accept-Ranges: bytes` for the url of a file
+        self._ranged: dict[str, bool] = {}
+
+    @property
+    def session(self):
+        """one session per download thread"""
+        if not hasattr(self._local, "session"):
+            self._local.session = self._requests.Session()
+        return self._local.session
+
+    def _url(self, dataset: str, file: str) -> str:
+        return f"{self.remote_root}{dataset}/{file}"
+
+    def _head(self, dataset: str, file: str) -> RemoteFile | None:
+        resp = self.session.head(self._url(dataset, file), allow_redirects=True, timeout=60)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        self._ranged[self._url(dataset, file)] = resp.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return RemoteFile(file, int(resp.headers["Content-Length"]), resp.headers.get("ETag"))
+
+    def ls(self, dataset: str, files: list[str]) -> dict[str, RemoteFile]:
+        """no listing over http, a HEAD of every file instead"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=config.DATASET_DOWNLOAD_WORKERS) as executor:
+            remote_files = executor.map(lambda file: self._head(dataset, file), files)
+            return {f.name: f for f in remote_files if f is not None}
+
+    def read_range(self, dataset: str, file: str, start: int, end: int) -> bytes:
+        """the body is only read once the response is the requested range"""
+        with self.session.get(self._url(dataset, file), headers={"Range": f"bytes={start}-{end - 1}"}, stream=True, timeout=600) as resp:
+            resp.raise_for_status()
+            content_range = resp.headers.get("Content-Range", "")
+            if resp.status_code != 206 or not content_range.startswith(f"bytes {start}-{end - 1}/"):
+                raise IOError(
+                    f"Expected bytes {start}-{end - 1} of {file} from {self.remote_root}, "
+                    f"got status {resp.status_code}, Content-Range: {content_range!r}"
+                )
+            return resp.content
+
+    def _read_whole(self, dataset: str, partial: _PartialFile, progress: tqdm):
+        """download a file in one non-ranged request"""
+        with self.session.get(self._url(dataset, partial.remote.name), stream=True, timeout=600) as resp:
+            resp.raise_for_status()
+            with open(partial.tmp, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+                    progress.update(len(chunk))
+        size = os.path.getsize(partial.tmp)
+        if size != partial.remote.size:
+            raise IOError(f"Read {size} bytes of {partial.remote.name}, expected {partial.remote.size}")
+        partial.finish()
+
+    def _download(self, dataset: str, downloads: list[_PartialFile]):
+        whole = [p for p in downloads if p.remote.size > 0 and not self._ranged.get(self._url(dataset, p.remote.name), True)]
+        if whole:
+            log.warning(f"{self.remote_root} doesn't accept range requests of {[p.remote.name for p in whole]}, download them in one request each")
+            with tqdm(total=sum(p.remote.size for p in whole), unit="B", unit_scale=True) as progress:
+                for partial in whole:
+                    self._read_whole(dataset, partial, progress)
+        super()._download(dataset, [p for p in downloads if p not in whole])
@@ -5,10 +5,15 @@ Usage:
 """
 
 from collections import namedtuple
+import hashlib
+import json
 import logging
 import pathlib
 from enum import Enum
+from typing import Iterator
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from pydantic import validator, PrivateAttr
 import polars as pl
 from pyarrow.parquet import ParquetFile
@@ -18,6 +23,8 @@ from .. import config
 from ..backend.clients import MetricType
 from . import utils
 from .data_source import DatasetSource, DatasetReader
+from .ground_truth import build_ground_truth
+from . import synthetic
 
 log = logging.getLogger(__name__)
 
@@ -142,6 +149,150 @@ class OpenAI(BaseDataset):
     }
 
 
+class Synthetic(BaseDataset):
+    """Generated from seed by synthetic.generate instead of downloaded, of any size, see config.SYNTHETIC_*"""
+    name: str = "Synthetic"
+    dim: int = config.SYNTHETIC_DIM
+    metric_type: MetricType = MetricType(config.SYNTHETIC_METRIC_TYPE)
+    use_shuffled: bool = False
+    with_gt: bool = True
+    num_clusters: int = config.SYNTHETIC_NUM_CLUSTERS
+    intrinsic_dim: int = config.SYNTHETIC_INTRINSIC_DIM
+    norm_sigma: float = config.SYNTHETIC_NORM_SIGMA
+    seed: int = config.SYNTHETIC_SEED
+    test_size: int = config.SYNTHETIC_TEST_SIZE
+    rows_per_file: int = config.SYNTHETIC_ROWS_PER_FILE
+
+    @validator("size")
+    def verify_size(cls, v):
+        if v <= 0:
+            raise ValueError(f"Size of the synthetic dataset should be positive, got {v}")
+        return v
+
+    @property
+    def label(self) -> str:
+        return f"{utils.numerize(self.size)}_{self.dim}D"
+
+    @property
+    def dir_name(self) -> str:
+        """every generator param, the files of other params don't mix up"""
+        return (
+            f"{self.name}_{self.size}_{self.dim}d_{self.metric_type.value}_c{self.num_clusters}_i{self.intrinsic_dim}"
+            f"_n{self.norm_sigma:g}_s{self.seed}_q{self.test_size}_f{self.file_count}"
+        ).lower()
+
+    @property
+    def file_count(self) -> int:
+        return -(-self.size // self.rows_per_file)
+
+
+class DatasetCache:
+    """Arrays of the parquet files of a dataset converted once into .npy files, memory-mapped by the later runs
+
+    Every file gets the int64 ids of its "id" column in {file}.id.npy, and the float32 matrix of
+    its "emb" column in {file}.emb.npy, or the neighbors matrix of its "neighbors_id" column in
+    {file}.neighbors.npy, int32 unless an id is beyond it. manifest.json keeps the size and mtime of
+    every converted file along with the rows of its row groups, a file changed since is converted again.
+
+    Examples:
+        >>> cache = DatasetCache(config.DATASET_CACHE_DIR.joinpath("cohere", "cohere_medium_1m"))
+        >>> cache.update(cohere.data_dir.joinpath("shuffle_train.parquet"))
+        >>> cache.arrays("shuffle_train.parquet")["emb"].shape
+        (1000000, 768)
+    """
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.manifest: dict[str, dict] = {}
+        manifest = self.path.joinpath("manifest.json")
+        if manifest.exists():
+            with open(manifest) as f:
+                self.manifest = json.load(f)
+
+    @staticmethod
+    def _stamp(source: pathlib.Path) -> dict:
+        stat = source.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _save_manifest(self):
+        tmp = self.path.joinpath("manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        tmp.replace(self.path.joinpath("manifest.json"))
+
+    def __contains__(self, file_name: str) -> bool:
+        return file_name in self.manifest
+
+    def row_group_sizes(self, file_name: str) -> list[int]:
+        return self.manifest[file_name]["row_groups"]
+
+    def arrays(self, file_name: str) -> dict[str, np.ndarray]:
+        """the read-only memory-mapped arrays of a converted file by column, id and emb or neighbors"""
+        return {
+            column: np.load(self.path.joinpath(f"{file_name}.{column}.npy"), mmap_mode="r")
+            for column in self.manifest[file_name]["columns"]
+        }
+
+    def update(self, source: pathlib.Path) -> bool:
+        """Convert the file if it's not in the cache or changed since, returns whether it's in the cache"""
+        stamp = self._stamp(source)
+        entry = self.manifest.get(source.name)
+        if entry is not None and {k: entry[k] for k in stamp} == stamp:
+            return True
+
+        self.manifest.pop(source.name, None)
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            columns, row_groups = self._convert(source)
+        except (ValueError, KeyError) as e:
+            log.warning(f"Unable to cache {source.name}, read it from parquet: {e}")
+            for tmp in self.path.glob(f"{source.name}.*.npy.tmp"):
+                tmp.unlink()
+            self._save_manifest()
+            return False
+        self.manifest[source.name] = {**stamp, "columns": columns, "row_groups": row_groups}
+        self._save_manifest()
+        return True
+
+    def _convert(self, source: pathlib.Path) -> tuple[list[str], list[int]]:
+        parquet_file = ParquetFile(source)
+        num_rows = parquet_file.metadata.num_rows
+        row_groups = [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)]
+        names = parquet_file.schema_arrow.names
+        if "emb" in names:
+            column, dtype = "emb", np.float32
+        elif "neighbors_id" in names:
+            column, dtype = "neighbors", np.int32
+        else:
+            raise ValueError(f"Neither emb nor neighbors_id in the columns {names}")
+
+        log.info(f"Convert {source.name} of {num_rows} rows into the dataset cache {self.path}")
+        files = {c: self.path.joinpath(f"{source.name}.{c}.npy.tmp") for c in ("id", column)}
+        ids, matrix, offset = None, None, 0
+        for batch in parquet_file.iter_batches(config.NUM_PER_BATCH, columns=["id", "emb" if column == "emb" else "neighbors_id"]):
+            values = to_matrix(batch.column(1), np.int64 if column == "neighbors" else dtype)
+            if matrix is None:
+                if column == "neighbors" and num_rows > 0 and batch.num_rows > 0:
+                    dtype = np.int32 if values.max(initial=0) < np.iinfo(np.int32).max else np.int64
+                ids = np.lib.format.open_memmap(files["id"], mode="w+", dtype=np.int64, shape=(num_rows,))
+                matrix = np.lib.format.open_memmap(files[column], mode="w+", dtype=dtype, shape=(num_rows, values.shape[1]))
+            elif values.shape[1] != matrix.shape[1]:
+                raise ValueError(f"Rows of {values.shape[1]} and {matrix.shape[1]} values in {source.name}")
+            if dtype == np.int32 and values.max(initial=0) >= np.iinfo(np.int32).max:
+                raise ValueError(f"Neighbors ids beyond int32 after the first batch of {source.name}")
+            ids[offset : offset + batch.num_rows] = batch.column(0).to_numpy()
+            matrix[offset : offset + batch.num_rows] = values
+            offset += batch.num_rows
+
+        if matrix is None:
+            raise ValueError(f"No rows in {source.name}")
+        ids.flush()
+        matrix.flush()
+        del ids, matrix
+        for c, tmp in files.items():
+            tmp.replace(self.path.joinpath(f"{source.name}.{c}.npy"))
+        return ["id", column], row_groups
+
+
 class DatasetManager(BaseModel):
     """Download dataset if not in the local directory. Provide data for cases.
 
@@ -157,6 +308,7 @@ class DatasetManager(BaseModel):
     gt_data: pd.DataFrame | None = None
     train_files : list[str] = []
     reader: DatasetReader | None = None
+    cache: DatasetCache | None = None
 
     def __eq__(self, obj):
         if isinstance(obj, DatasetManager):
@@ -177,6 +329,15 @@ class DatasetManager(BaseModel):
         """
         return pathlib.Path(config.DATASET_LOCAL_DIR, self.data.name.lower(), self.data.dir_name.lower())
 
+    @property
+    def cache_dir(self) -> pathlib.Path:
+        """ arrays cache directory: config.DATASET_CACHE_DIR/{dataset_name}/{dataset_dirname},
+        the md5 of the data dir instead of the dirname for the custom datasets"""
+        dir_name = self.data.dir_name.lower()
+        if self.data.isCustom:
+            dir_name = hashlib.md5(str(self.data_dir.resolve()).encode()).hexdigest()[:8]
+        return pathlib.Path(config.DATASET_CACHE_DIR, self.data.name.lower(), dir_name)
+
     def __iter__(self):
         return DataSetIterator(self)
 
@@ -191,7 +352,10 @@ class DatasetManager(BaseModel):
         Args:
             source(DatasetSource): S3 or AliyunOSS, default as S3
             filters(Optional[int | float | str]): combined with dataset's with_gt to
-              compose the correct ground_truth file
+              compose the correct ground_truth file, built from the train data if it's
+              not a published one or missing for a custom dataset
+
+        The files of a Synthetic dataset are generated instead, source unused.
 
         Returns:
             bool: whether the dataset is successfully prepared
@@ -202,37 +366,177 @@ class DatasetManager(BaseModel):
         train_files = utils.compose_train_files(file_count, use_shuffled)
         all_files = train_files
 
+        is_synthetic = isinstance(self.data, Synthetic)
         gt_file, test_file = None, None
         if self.data.with_gt:
             gt_file, test_file = utils.compose_gt_file(filters), "test.parquet"
-            all_files.extend([gt_file, test_file])
+            if not is_synthetic and (gt_file in utils.PUBLISHED_GT_FILES or not config.GROUND_TRUTH_BUILD):
+                all_files.append(gt_file)
+            all_files.append(test_file)
 
-        if not self.data.isCustom:
+        if is_synthetic:
+            synthetic.generate(self.data, self.data_dir, all_files)
+        elif not self.data.isCustom:
             source.reader().read(
                 dataset=self.data.dir_name.lower(),
                 files=all_files,
                 local_ds_root=self.data_dir,
             )
 
-        if gt_file is not None and test_file is not None:
-            self.test_data = self._read_file(test_file)
-            self.gt_data = self._read_file(gt_file)
-
         prefix = "shuffle_train" if use_shuffled else "train"
         self.train_files = sorted([f.name for f in self.data_dir.glob(f'{prefix}*.parquet')])
         log.debug(f"{self.data.name}: available train files {self.train_files}")
 
+        if config.DATASET_CACHE:
+            self.cache = DatasetCache(self.cache_dir)
+            for file_name in self.train_files + [f for f in (test_file, gt_file) if f is not None]:
+                if self.data_dir.joinpath(file_name).exists():
+                    self.cache.update(self.data_dir.joinpath(file_name))
+
+        if gt_file is not None and test_file is not None:
+            self.test_data = self._read_file(test_file)
+            gt_path = self.data_dir.joinpath(gt_file)
+            if (config.GROUND_TRUTH_BUILD or is_synthetic) and not gt_path.exists():
+                if not is_synthetic:
+                    log.info(f"GROUND_TRUTH_BUILD is enabled, compute the missing {gt_file} of {self.data.name} by brute force")
+                min_id = None if filters is None else round(filters * self.data.size)
+                build_ground_truth(self, gt_file, min_id=min_id)
+                if self.cache is not None:
+                    self.cache.update(gt_path)
+            self.gt_data = self._read_file(gt_file)
+
         return True
 
+    def row_groups(self) -> list[tuple[str, int]]:
+        """(file name, row group index) of all the row groups in the train files"""
+        return [
+            (file_name, i)
+            for file_name in self.train_files
+            for i in range(ParquetFile(pathlib.Path(self.data_dir, file_name)).num_row_groups)
+        ]
+
+    def row_group_sizes(self, shard: int = 0, num_shards: int = 1) -> list[tuple[str, int, int]]:
+        """(file name, row group index, number of rows) of the row groups of one shard, in the order of iter_shard"""
+        sizes = []
+        for file_name, i in self.row_groups()[shard::num_shards]:
+            parquet_file = ParquetFile(pathlib.Path(self.data_dir, file_name))
+            sizes.append((file_name, i, parquet_file.metadata.row_group(i).num_rows))
+        return sizes
+
+    def iter_shard(self, shard: int, num_shards: int, skip: int = 0) -> Iterator[pd.DataFrame]:
+        """Iterate over the batches of one shard of the train data, the row groups are
+        assigned to num_shards disjoint shards round-robin.
+
+        The first skip rows of the shard are left out, the row groups before them aren't read.
+
+        Examples:
+            >>> for data in cohere.iter_shard(0, 4):
+            >>>    print(data.columns)
+        """
+        if self._cached():
+            for ids, embeddings in self._iter_cached(shard, num_shards, skip):
+                yield pd.DataFrame({"id": ids, "emb": list(embeddings)})
+            return
+        for batch in self._iter_record_batches(shard, num_shards, skip):
+            yield batch.to_pandas()
+
+    def iter_numpy(self, shard: int = 0, num_shards: int = 1, skip: int = 0) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Like iter_shard, but yields the ids and a contiguous float32 matrix of the embeddings
+        of every batch, read from the Arrow buffers without pandas.
+
+        Examples:
+            >>> for ids, embeddings in cohere.iter_numpy():
+            >>>    print(embeddings.shape)
+        """
+        if self._cached():
+            yield from self._iter_cached(shard, num_shards, skip)
+            return
+        for batch in self._iter_record_batches(shard, num_shards, skip):
+            yield batch.column("id").to_numpy(), to_float32_matrix(batch.column("emb"))
+
+    def _cached(self) -> bool:
+        return self.cache is not None and all(f in self.cache for f in self.train_files)
+
+    def _iter_cached(self, shard: int, num_shards: int, skip: int = 0) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """the batches of iter_numpy as views of the memory-mapped arrays of the cache"""
+        row_groups = self.row_groups()[shard::num_shards]
+        for file_name in dict.fromkeys(f for f, _ in row_groups):
+            arrays = self.cache.arrays(file_name)
+            sizes = self.cache.row_group_sizes(file_name)
+            starts = np.cumsum([0] + sizes)
+            for _, i in (g for g in row_groups if g[0] == file_name):
+                start, end = starts[i] + skip, starts[i + 1]
+                skip = max(0, start - end)
+                for offset in range(start, end, config.NUM_PER_BATCH):
+                    batch_end = min(end, offset + config.NUM_PER_BATCH)
+                    yield np.asarray(arrays["id"][offset:batch_end]), np.asarray(arrays["emb"][offset:batch_end])
+
+    def _iter_record_batches(self, shard: int, num_shards: int, skip: int = 0) -> Iterator[pa.RecordBatch]:
+        row_groups = self.row_groups()[shard::num_shards]
+        for file_name in dict.fromkeys(f for f, _ in row_groups):
+            groups = [i for f, i in row_groups if f == file_name]
+            parquet_file = ParquetFile(pathlib.Path(self.data_dir, file_name))
+            while groups and skip >= (num_rows := parquet_file.metadata.row_group(groups[0]).num_rows):
+                skip -= num_rows
+                groups = groups[1:]
+            if not groups:
+                continue
+
+            log.info(f"Get iterator for {file_name}, row groups {groups}")
+            if skip > 0:
+                log.info(f"Skip the first {skip} rows of row group {groups[0]} of {file_name}")
+            for batch in parquet_file.iter_batches(config.NUM_PER_BATCH, row_groups=groups):
+                if skip > 0:
+                    num_skipped = min(skip, batch.num_rows)
+                    batch, skip = batch.slice(num_skipped), skip - num_skipped
+                    if batch.num_rows == 0:
+                        continue
+                yield batch
+
     def _read_file(self, file_name: str) -> pd.DataFrame:
-        """read one file from disk into memory"""
+        """read one file from disk into a pandas DataFrame, the arrays of the cache are memory-mapped instead"""
+        if self.cache is not None and file_name in self.cache:
+            log.info(f"Map the cached arrays of {file_name}")
+            arrays = self.cache.arrays(file_name)
+            column = "emb" if "emb" in arrays else "neighbors"
+            return pd.DataFrame({"id": np.asarray(arrays["id"]), "emb" if column == "emb" else "neighbors_id": list(np.asarray(arrays[column]))})
+
         log.info(f"Read the entire file into memory: {file_name}")
         p = pathlib.Path(self.data_dir, file_name)
         if not p.exists():
             log.warning(f"No such file: {p}")
             return pd.DataFrame()
 
-        return pl.read_parquet(p)
+        return pl.read_parquet(p).to_pandas()
+
+
+def to_float32_matrix(column: pa.Array | pa.ChunkedArray) -> np.ndarray:
+    """Contiguous float32 matrix of a list or fixed size list column of vectors,
+    zero-copy from the Arrow values buffer if they are float32 already."""
+    return to_matrix(column, np.float32)
+
+
+def to_matrix(column: pa.Array | pa.ChunkedArray, dtype: np.dtype) -> np.ndarray:
+    """Contiguous matrix of dtype of a list or fixed size list column of equal lengths, like the neighbors ids"""
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if column.null_count > 0:
+        raise ValueError("Null vectors in the embedding column")
+    if len(column) == 0:
+        return np.empty((0, 0), dtype=dtype)
+
+    if pa.types.is_fixed_size_list(column.type):
+        dim = column.type.list_size
+    elif pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+        lengths = np.diff(column.offsets.to_numpy())
+        dim = int(lengths[0])
+        if (lengths != dim).any():
+            raise ValueError("Vectors of different dimensions in the embedding column")
+    else:
+        raise ValueError(f"Not an embedding column: {column.type}")
+
+    values = column.flatten().to_numpy(zero_copy_only=False)
+    return np.ascontiguousarray(values, dtype=dtype).reshape(len(column), dim)
 
 
 class DataSetIterator:
@@ -284,6 +588,7 @@ class Dataset(Enum):
     GLOVE = Glove
     SIFT = SIFT
     OPENAI = OpenAI
+    SYNTHETIC = Synthetic
 
     def get(self, size: int) -> BaseDataset:
         return self.value(size=size)
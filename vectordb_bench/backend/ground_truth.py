@@ -0,0 +1,186 @@
+"""Exact k nearest neighbors of the test queries by blocked brute force, for the cases changing the train data
+and for the datasets without the ground truth file of a filter
+
+Usage:
+    >>> ids = prefix_knn(dataset.iter_numpy(), queries, query_idx, prefix, k=100, metric_type=MetricType.L2)
+    >>> build_ground_truth(dataset, "neighbors_filter_0.05.parquet", min_id=50_000)
+"""
+
+import logging
+import pathlib
+import concurrent.futures
+import multiprocessing as mp
+from typing import Iterable, Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .clients.api import MetricType
+from .. import config
+
+log = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def prefix_knn(
+    batches: Iterable[tuple[np.ndarray, np.ndarray]],
+    queries: np.ndarray,
+    query_idx: np.ndarray,
+    prefix: np.ndarray,
+    k: int,
+    metric_type: MetricType,
+) -> np.ndarray:
+    """Exact kNN of the query queries[query_idx[i]] among the first prefix[i] rows of the train data,
+    for every i, in one pass over the train data.
+
+    Args:
+        batches(Iterable[tuple[np.ndarray, np.ndarray]]): (ids, float32 embeddings) of the train data
+            in the order of insertion, like DatasetManager.iter_numpy()
+        queries(np.ndarray): (nq x dim) test queries
+        query_idx(np.ndarray): (m,) query of every kNN search
+        prefix(np.ndarray): (m,) number of train rows visible to every kNN search
+        k(int): top k
+        metric_type(MetricType): L2, IP or COSINE
+
+    The batches are sliced into blocks of config.GROUND_TRUTH_BLOCK_SIZE // m rows at most, bounding
+    the distances of all the searches in memory.
+
+    Returns:
+        np.ndarray: (m x k) ids, nearest first, padded with -1 if a prefix has fewer than k rows
+    """
+    rows = max(1, config.GROUND_TRUTH_BLOCK_SIZE // max(1, len(query_idx)))
+    return _knn(_blocks(batches, rows), queries, query_idx, prefix, k, metric_type)[1]
+
+
+def _knn(
+    batches: Iterable[tuple[np.ndarray, np.ndarray]],
+    queries: np.ndarray,
+    query_idx: np.ndarray,
+    prefix: np.ndarray,
+    k: int,
+    metric_type: MetricType,
+) -> tuple[np.ndarray, np.ndarray]:
+    """prefix_knn along with the distances of the ids, comparable between the batches of the same queries"""
+    queries = np.asarray(queries, dtype=np.float32)
+    if metric_type == MetricType.COSINE:
+        queries = _normalize(queries)
+    query_idx, prefix = np.asarray(query_idx), np.asarray(prefix)
+
+    best_dist = np.full((len(query_idx), k), np.inf, dtype=np.float32)
+    best_ids = np.full((len(query_idx), k), -1, dtype=np.int64)
+    start = 0
+    for ids, embeddings in batches:
+        active = np.flatnonzero(prefix > start)
+        if len(active) == 0:
+            break
+
+        if metric_type == MetricType.COSINE:
+            embeddings = _normalize(embeddings)
+        if metric_type == MetricType.L2:
+            # |q|^2 is the same for all the rows of a query, not needed for the order
+            dist = (embeddings * embeddings).sum(axis=1)[np.newaxis, :] - 2 * (queries @ embeddings.T)
+        else:
+            dist = -(queries @ embeddings.T)
+
+        # rows after the prefix of a search are not visible to it
+        rows = start + np.arange(len(ids))
+        dist = np.where(rows[np.newaxis, :] < prefix[active, np.newaxis], dist[query_idx[active]], np.inf)
+        dist = np.concatenate([best_dist[active], dist], axis=1)
+        cand_ids = np.concatenate([best_ids[active], np.broadcast_to(ids, (len(active), len(ids)))], axis=1)
+        top = np.argpartition(dist, k - 1, axis=1)[:, :k] if dist.shape[1] > k else np.arange(k)[np.newaxis, :]
+        best_dist[active] = np.take_along_axis(dist, top, axis=1)
+        best_ids[active] = np.take_along_axis(cand_ids, top, axis=1)
+        start += len(ids)
+
+    order = np.argsort(best_dist, axis=1, kind="stable")
+    best_dist = np.take_along_axis(best_dist, order, axis=1)
+    best_ids = np.take_along_axis(best_ids, order, axis=1)
+    best_ids[np.isinf(best_dist)] = -1
+    log.info(f"Computed the exact {k}-NN of {len(query_idx)} searches over the first {start} train rows")
+    return best_dist, best_ids
+
+
+def exact_knn(
+    batches: Iterable[tuple[np.ndarray, np.ndarray]],
+    queries: np.ndarray,
+    k: int,
+    metric_type: MetricType,
+) -> np.ndarray:
+    """Exact kNN of every query among all the rows of batches, see prefix_knn"""
+    nq = len(queries)
+    return prefix_knn(batches, queries, np.arange(nq), np.full(nq, np.iinfo(np.int64).max), k, metric_type)
+
+
+def _blocks(
+    batches: Iterable[tuple[np.ndarray, np.ndarray]],
+    rows: int,
+    min_id: int | None = None,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """the batches sliced into blocks of at most rows, only with the ids >= min_id"""
+    for ids, embeddings in batches:
+        if min_id is not None:
+            keep = ids >= min_id
+            ids, embeddings = ids[keep], embeddings[keep]
+        for i in range(0, len(ids), rows):
+            yield ids[i : i + rows], embeddings[i : i + rows]
+
+
+def _shard_knn(dataset, shard: int, num_shards: int, queries: np.ndarray, k: int, min_id: int | None) -> tuple[np.ndarray, np.ndarray]:
+    """the distances and ids of the exact kNN of the queries among one shard of the train data"""
+    rows = max(1, config.GROUND_TRUTH_BLOCK_SIZE // len(queries))
+    batches = _blocks(dataset.iter_numpy(shard, num_shards), rows, min_id)
+    nq = len(queries)
+    return _knn(batches, queries, np.arange(nq), np.full(nq, np.iinfo(np.int64).max), k, dataset.data.metric_type)
+
+
+def build_ground_truth(
+    dataset,
+    file_name: str,
+    k: int = config.GROUND_TRUTH_K,
+    min_id: int | None = None,
+    num_workers: int = config.GROUND_TRUTH_WORKERS,
+) -> pathlib.Path:
+    """Compute the exact kNN of the test queries among the train data of a prepared DatasetManager, and write
+    it into {data_dir}/{file_name} in the format of the ground truth files, columns id and neighbors_id.
+
+    The row groups of the train data are split between num_workers processes, each one computes the
+    distances of all the queries to config.GROUND_TRUTH_BLOCK_SIZE // nq train rows at a time.
+
+    Args:
+        file_name(str): for instance utils.compose_gt_file(filters)
+        min_id(int | None): only the train rows of ids >= min_id, like the filters of the cases
+    """
+    test_data = dataset.test_data
+    queries = np.stack(test_data["emb"]).astype(np.float32)
+    num = max(1, min(num_workers, len(dataset.row_groups())))
+    log.info(f"Build the ground truth {file_name} of {len(queries)} queries, k={k}, min_id={min_id}, with {num} processes")
+
+    if num == 1:
+        results = [_shard_knn(dataset, 0, 1, queries, k, min_id)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(mp_context=mp.get_context("spawn"), max_workers=num) as executor:
+            futures = [executor.submit(_shard_knn, dataset, shard, num, queries, k, min_id) for shard in range(num)]
+            results = [f.result() for f in futures]
+
+    dist = np.concatenate([d for d, _ in results], axis=1)
+    ids = np.concatenate([i for _, i in results], axis=1)
+    order = np.argsort(dist, axis=1, kind="stable")[:, :k]
+    dist, ids = np.take_along_axis(dist, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+    # fewer neighbors than k for a filter leaving fewer rows
+    neighbors = [row[~np.isinf(d)] for row, d in zip(ids, dist, strict=True)]
+    table = pa.table({
+        "id": pa.array(np.asarray(test_data["id"]), type=pa.int64()),
+        "neighbors_id": pa.array(neighbors, type=pa.list_(pa.int64())),
+    })
+    path = pathlib.Path(dataset.data_dir, file_name)
+    tmp = path.with_name(f"{path.name}.tmp")
+    pq.write_table(table, tmp)
+    tmp.replace(path)
+    log.info(f"Wrote the ground truth of {len(queries)} queries into {path}")
+    return path
@@ -1,12 +1,22 @@
 from .mp_runner import (
     MultiProcessingSearchRunner,
 )
+from .async_runner import AsyncSearchRunner
+from .batch_runner import BatchSearchRunner
 
 from .serial_runner import SerialSearchRunner, SerialInsertRunner
+from .streaming_runner import StreamingRunner
+from .churn_runner import ChurnRunner
+from .capacity_runner import CapacityRunner
 
 
 __all__ = [
     'MultiProcessingSearchRunner',
+    'AsyncSearchRunner',
+    'BatchSearchRunner',
     'SerialSearchRunner',
     'SerialInsertRunner',
+    'StreamingRunner',
+    'ChurnRunner',
+    'CapacityRunner',
 ]
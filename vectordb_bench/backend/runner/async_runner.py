@@ -0,0 +1,271 @@
+import asyncio
+import concurrent
+import copy
+import logging
+import multiprocessing as mp
+import random
+import time
+import traceback
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Iterable
+
+import numpy as np
+
+from ..clients import api
+from ... import config
+from ...metric import LatencyHistogram, SearchTimeline
+from .mp_runner import MultiProcessingSearchRunner, SearchWorkerPool
+from .query_set import SharedQuerySet
+
+log = logging.getLogger(__name__)
+
+SearchFunc = Callable[[list[float], int, dict | None], Awaitable[list[int]]]
+
+
+class AsyncSearchRunner(MultiProcessingSearchRunner):
+    """asyncio search runner, drives a high concurrency with a few search processes
+
+    Every search process runs one event loop. A concurrency is the total number of in-flight
+    requests, split over min(num_event_loops, concurrency) processes. Every in-flight request
+    uses its own shallow copy of the db, connected with init_async() if db.support_async_search(),
+    otherwise with init() and searched by search_embedding in a thread.
+
+    The connections are made once in every process before the first concurrency, for the
+    largest share of max(concurrencies), and reused by all the concurrencies and rates.
+
+    Args:
+        num_event_loops(int): max number of search processes, default to config.ASYNC_SEARCH_EVENT_LOOPS
+        others are the same as MultiProcessingSearchRunner, the worker pool is always reused
+    """
+    def __init__(
+        self,
+        db: api.VectorDB,
+        test_data: list[list[float]] | np.ndarray,
+        k: int = 100,
+        filters: dict | None = None,
+        concurrencies: Iterable[int] = config.NUM_CONCURRENCY,
+        duration: int = 30,
+        rates: Iterable[float] = config.SEARCH_RATE_LIST,
+        arrival: str = config.SEARCH_RATE_ARRIVAL,
+        num_event_loops: int = config.ASYNC_SEARCH_EVENT_LOOPS,
+        use_shared_memory: bool = config.SEARCH_SHARED_MEMORY,
+        warmup: int = config.SEARCH_WARMUP_DURATION,
+        steady_state: bool = config.SEARCH_STEADY_STATE,
+        timeline_interval: float = config.SEARCH_TIMELINE_INTERVAL,
+        max_errors: int = config.SEARCH_MAX_ERRORS,
+    ):
+        super().__init__(
+            db, test_data, k, filters, concurrencies, duration, rates, arrival,
+            reuse_pool=True, use_shared_memory=use_shared_memory, warmup=warmup, steady_state=steady_state,
+            timeline_interval=timeline_interval, max_errors=max_errors,
+        )
+        if num_event_loops < 1:
+            raise ValueError(f"num_event_loops should be positive, got {num_event_loops}")
+        self.num_event_loops = num_event_loops
+
+        # only set in the search processes
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._clients: list[SearchFunc] = []
+        self._errors = 0
+
+    def _split(self, conc: int) -> list[int]:
+        """in-flight requests of each process for concurrency conc"""
+        procs = min(self.num_event_loops, conc)
+        return [conc // procs + (1 if i < conc % procs else 0) for i in range(procs)]
+
+    def _pool_size(self) -> int:
+        return len(self._split(max(self.concurrencies)))
+
+    def _run_level(self, conc: int, func_name: str, *args, detect_steady_state: bool = False) -> tuple[list[tuple], float]:
+        if self.pool is None:
+            self.pool = SearchWorkerPool(self, self._get_test_data(), self._pool_size(), self.get_mp_context())
+        detector = self._steady_state_detector() if detect_steady_state else None
+        return self.pool.run_each(func_name, [(num, *args) for num in self._split(conc)], detector)
+
+    @contextmanager
+    def _worker_init(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            num = self._split(max(self.concurrencies))[0]
+            connect = self._connect(num)
+            self._clients = self._loop.run_until_complete(connect.__aenter__())
+            log.info(f"{mp.current_process().name:16} connected {num} clients, async={self.db.support_async_search()}")
+            try:
+                yield
+            finally:
+                self._clients = []
+                self._loop.run_until_complete(connect.__aexit__(None, None, None))
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    @asynccontextmanager
+    async def _connect(self, num: int):
+        """Yields num search functions, each with its own copy of db and connection"""
+        dbs = [copy.copy(self.db) for _ in range(num)]
+        async with AsyncExitStack() as stack:
+            if self.db.support_async_search():
+                for db in dbs:
+                    await stack.enter_async_context(db.init_async())
+                yield [db.search_embedding_async for db in dbs]
+                return
+
+            loop = asyncio.get_running_loop()
+            executor = stack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers=num))
+
+            async def init(db: api.VectorDB):
+                ctx = db.init()
+                await loop.run_in_executor(executor, ctx.__enter__)
+                stack.push(ctx.__exit__)
+
+            def offload(db: api.VectorDB) -> SearchFunc:
+                return lambda query, k, filters: loop.run_in_executor(executor, db.search_embedding, query, k, filters)
+
+            await asyncio.gather(*[init(db) for db in dbs])
+            yield [offload(db) for db in dbs]
+
+    async def _search_loop(
+        self,
+        search: SearchFunc,
+        test_data: list[list[float]] | SharedQuerySet,
+        done: Callable[[], bool],
+        start_time: float | None = None,
+        latencies: LatencyHistogram | None = None,
+        timeline: SearchTimeline | None = None,
+    ) -> int:
+        """Search until done(), measured since start_time into latencies and timeline, if given"""
+        num, idx = len(test_data), random.randint(0, len(test_data) - 1)
+        count = 0
+        while not done():
+            # loop through the test data, the query is read before the timer
+            query, idx = test_data[idx], idx + 1 if idx < num - 1 else 0
+            s = time.perf_counter()
+            try:
+                await search(query, self.k, self.filters)
+            except Exception as e:
+                if start_time is None:
+                    log.warning(f"VectorDB search_embedding error in warm-up: {e}")
+                    traceback.print_exc(chain=True)
+                    raise e from None
+                self._errors += 1
+                timeline.record_error(time.perf_counter() - start_time)
+                self._on_search_error(e, self._errors)
+                continue
+
+            if start_time is not None:
+                now = time.perf_counter()
+                latencies.record(now - s)
+                timeline.record(now - start_time, now - s)
+                count += 1
+                self._report_progress()
+        return count
+
+    async def _search(self, test_data: list[list[float]] | SharedQuerySet, num: int) -> tuple[int, float, LatencyHistogram, SearchTimeline]:
+        clients = self._clients[:num]
+        warmup_end = time.perf_counter() + self.warmup
+        await asyncio.gather(*[
+            self._search_loop(search, test_data, lambda: time.perf_counter() >= warmup_end)
+            for search in clients
+        ])
+
+        latencies = LatencyHistogram()
+        timeline = SearchTimeline(self.timeline_interval)
+        self._errors = 0
+        start_time = time.perf_counter()
+        counts = await asyncio.gather(*[
+            self._search_loop(search, test_data, lambda: self._level_done(start_time), start_time, latencies, timeline)
+            for search in clients
+        ])
+        count = sum(counts)
+
+        total_dur = round(time.perf_counter() - start_time, 4)
+        log.info(
+            f"{mp.current_process().name:16} search {self.duration}s with {num} coroutines: "
+            f"actual_dur={total_dur}s, count={count}, errors={self._errors}, qps in this process: {round(count / total_dur, 4):3}"
+        )
+        return (count, total_dur, latencies, timeline)
+
+    async def _search_by_rate(self, test_data: list[list[float]] | SharedQuerySet, num: int, rate: float) -> tuple[int, float, LatencyHistogram, int]:
+        num_data, idx = len(test_data), random.randint(0, len(test_data) - 1)
+        rng = np.random.default_rng()
+        interval = 1 / rate
+
+        free = asyncio.Queue()
+        for search in self._clients[:num]:
+            free.put_nowait(search)
+
+        start_time = time.perf_counter()
+        end_time = start_time + self.duration
+        latencies = LatencyHistogram()
+        errors = []
+        count, dropped = 0, 0
+
+        async def send(query: list[float], intended: float):
+            nonlocal count, dropped
+            search = await free.get()
+            try:
+                # the ones still waiting for a connection at the end are not sent
+                if time.perf_counter() >= end_time:
+                    dropped += 1
+                    return
+                await search(query, self.k, self.filters)
+                latencies.record(time.perf_counter() - intended)
+                count += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                free.put_nowait(search)
+
+        tasks = set()
+        # random phase, so the processes don't send in lockstep
+        intended = start_time + random.random() * interval
+        while intended < end_time and not errors:
+            # read before waiting for the intended send time
+            query = test_data[idx]
+            now = time.perf_counter()
+            if now >= end_time:
+                break
+            if now < intended:
+                await asyncio.sleep(intended - now)
+
+            task = asyncio.create_task(send(query, intended))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            # loop through the test data
+            idx = idx + 1 if idx < num_data - 1 else 0
+
+            if self.arrival == "poisson":
+                intended += rng.exponential(interval)
+            else:
+                intended += interval
+
+        await asyncio.gather(*tasks)
+        if errors:
+            log.warning(f"VectorDB search_embedding error: {errors[0]}")
+            raise errors[0]
+
+        while intended < end_time:
+            dropped += 1
+            if self.arrival == "poisson":
+                intended += rng.exponential(interval)
+            else:
+                intended += interval
+
+        total_dur = round(time.perf_counter() - start_time, 4)
+        log.info(
+            f"{mp.current_process().name:16} search {self.duration}s at rate {rate} with {num} connections: "
+            f"actual_dur={total_dur}s, count={count}, dropped={dropped}, qps in this process: {round(count / total_dur, 4):3}"
+        )
+        return (count, total_dur, latencies, dropped)
+
+    def search(self, test_data: list[list[float]] | SharedQuerySet, num: int) -> tuple[int, float, LatencyHistogram, SearchTimeline]:
+        """Closed-loop search with num coroutines in this process"""
+        return self._loop.run_until_complete(self._search(test_data, num))
+
+    def search_by_rate(self, test_data: list[list[float]] | SharedQuerySet, num: int, rate: float) -> tuple[int, float, LatencyHistogram, int]:
+        """Open-loop search in this process at num * rate qps, with at most num requests in flight.
+        The queries not sent before the end are counted as dropped.
+
+        rate is the target qps of one connection, like the one of a process in MultiProcessingSearchRunner.
+        """
+        return self._loop.run_until_complete(self._search_by_rate(test_data, num, rate * num))
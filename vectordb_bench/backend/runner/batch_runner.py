@@ -0,0 +1,103 @@
+import time
+import logging
+import traceback
+import concurrent
+import multiprocessing as mp
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from ..clients import api
+from ...metric import calc_search_metrics, LatencyHistogram
+from ... import config
+
+log = logging.getLogger(__name__)
+
+
+class BatchSearchRunner:
+    """Batched search runner, one client sends batch_size queries per request
+    through VectorDB.search_embeddings_batch, for `duration` seconds per batch size.
+
+    Args:
+        batch_sizes(Iterable): queries per request, default to config.BATCH_SEARCH_SIZES
+        duration(int): duration for each batch size, default to config.BATCH_SEARCH_DURATION
+    """
+    def __init__(
+        self,
+        db: api.VectorDB,
+        test_data: list[list[float]] | np.ndarray,
+        ground_truth: pd.DataFrame,
+        k: int = 100,
+        filters: dict | None = None,
+        batch_sizes: Iterable[int] = config.BATCH_SEARCH_SIZES,
+        duration: int = config.BATCH_SEARCH_DURATION,
+    ):
+        self.db = db
+        self.k = k
+        self.filters = filters
+        self.batch_sizes = batch_sizes
+        self.duration = duration
+
+        if isinstance(test_data, np.ndarray):
+            self.test_data = test_data.tolist()
+        else:
+            self.test_data = test_data
+        self.ground_truth = ground_truth
+
+    def _search_batch_size(self, batch_size: int) -> tuple[float, float, float, float]:
+        num = len(self.test_data)
+        gt = self.ground_truth["neighbors_id"]
+        idx = 0
+
+        start_time = time.perf_counter()
+        latencies, recalls = LatencyHistogram(), []
+        while time.perf_counter() < start_time + self.duration:
+            # loop through the test data
+            idxs = [(idx + i) % num for i in range(batch_size)]
+            idx = (idx + batch_size) % num
+            queries = [self.test_data[i] for i in idxs]
+
+            s = time.perf_counter()
+            try:
+                results = self.db.search_embeddings_batch(queries, self.k, self.filters)
+            except Exception as e:
+                log.warning(f"VectorDB search_embeddings_batch error: {e}")
+                traceback.print_exc(chain=True)
+                raise e from None
+            latencies.record(time.perf_counter() - s)
+
+            if len(results) != batch_size:
+                raise RuntimeError(f"search_embeddings_batch returns {len(results)} results for {batch_size} queries")
+            recalls.append(calc_search_metrics(results, [gt[i] for i in idxs], self.k)[0])
+
+        # qps of the time spent in requests only, excluding recall calculation
+        qps = round(latencies.count * batch_size / latencies.total, 4)
+        p50, p99 = latencies.percentiles([50, 99])
+        recall = round(float(np.mean(np.concatenate(recalls))), 4)
+        log.info(
+            f"{mp.current_process().name:14} search in batch {batch_size}: "
+            f"requests={latencies.count}, qps={qps}, p50={p50:.4f}s, p99={p99:.4f}s, avg_recall={recall}"
+        )
+        return qps, p50, p99, recall
+
+    def search(self) -> tuple[list[int], list[float], list[float], list[float], list[float]]:
+        batch_size_list, qps_list, p50_list, p99_list, recall_list = [], [], [], [], []
+        with self.db.init():
+            for batch_size in self.batch_sizes:
+                log.info(f"Start search {self.duration}s in batch {batch_size}, filters: {self.filters}")
+                qps, p50, p99, recall = self._search_batch_size(batch_size)
+                batch_size_list.append(batch_size)
+                qps_list.append(qps)
+                p50_list.append(p50)
+                p99_list.append(p99)
+                recall_list.append(recall)
+        return batch_size_list, qps_list, p50_list, p99_list, recall_list
+
+    def run(self) -> tuple[list[int], list[float], list[float], list[float], list[float]]:
+        """
+        Returns:
+            tuple: batch sizes, qps, latency p50 and p99 of one request, and avg recall of each batch size
+        """
+        with concurrent.futures.ProcessPoolExecutor(mp_context=mp.get_context("spawn"), max_workers=1) as executor:
+            return executor.submit(self.search).result()
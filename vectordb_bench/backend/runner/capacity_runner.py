@@ -0,0 +1,250 @@
+import time
+import queue
+import logging
+import traceback
+import collections
+import itertools
+import multiprocessing as mp
+from typing import Iterator
+
+import numpy as np
+
+from ..clients import api
+from ..dataset import DatasetManager
+from ...metric import LatencyHistogram, SearchTimeline
+from ...models import LoadTimeoutError
+from .. import utils
+from ... import config
+
+log = logging.getLogger(__name__)
+
+
+class CapacityRunner:
+    """Load the train data of a capacity case again and again with parallel writers until the db is full
+
+    Every writer inserts the in-memory train data over and over, with the ids of each pass moved to
+    a range of their own, until one of the stop conditions:
+        memory: the db's memory_usage() reaches memory_threshold, polled by the main process every monitor_interval
+        latency: the mean latency of the last config.CAPACITY_LATENCY_WINDOW batches of a writer exceeds latency_threshold
+        error: an insert still fails after max_retry retries, the failing batch is inserted in halves down to single
+            rows to find the row rejected, and the rest of it from that row is retried every retry_interval seconds
+
+    The count is the sum of the rows committed by all the writers, exact to the row at an error, instead
+    of the count of the whole passes of SerialInsertRunner.run_endlessness.
+
+    Args:
+        num_writers(int): writer processes, default to config.CAPACITY_NUM_WRITERS
+        memory_threshold(float): ratio of the memory of the db, 0 or a db without memory_usage to disable
+        latency_threshold(float): seconds of an insert batch, 0 to disable
+        max_retry(int): retries of a failed insert before it stops the load, counted into retry_count
+    """
+    def __init__(
+        self,
+        db: api.VectorDB,
+        dataset: DatasetManager,
+        normalize: bool,
+        timeout: float | None = None,
+        num_writers: int = config.CAPACITY_NUM_WRITERS,
+        memory_threshold: float = config.CAPACITY_MEMORY_THRESHOLD,
+        latency_threshold: float = config.CAPACITY_LATENCY_THRESHOLD,
+        batch_size: int = config.NUM_PER_BATCH,
+        monitor_interval: float = config.CAPACITY_MONITOR_INTERVAL,
+        max_retry: int = config.CAPACITY_MAX_RETRY,
+        retry_interval: float = config.CAPACITY_RETRY_INTERVAL,
+    ):
+        if num_writers < 1 or batch_size < 1:
+            raise ValueError(f"num_writers and batch_size should be positive, got {num_writers}, {batch_size}")
+        self.db = db
+        self.dataset = dataset
+        self.normalize = normalize
+        self.timeout = timeout if isinstance(timeout, (int, float)) else None
+        self.num_writers = num_writers
+        self.memory_threshold = memory_threshold
+        self.latency_threshold = latency_threshold
+        self.batch_size = batch_size
+        self.monitor_interval = monitor_interval
+        self.max_retry = max_retry
+        self.retry_interval = retry_interval
+
+        # same as SerialInsertRunner, for the insert metrics of the case
+        self.latencies = LatencyHistogram()
+        self.timeline = SearchTimeline(config.LOAD_TIMELINE_INTERVAL)
+        self.retry_count = 0
+        self.duration = 0.0
+
+        # why the load stopped, "memory", "latency" or "error", and the rows and memory polled over time
+        self.stop_reason = ""
+        self.memory_timeline: dict[str, list[float]] = {"time": [], "rows": [], "memory": []}
+
+    def _load_data(self) -> tuple[list[list[float]] | np.ndarray, np.ndarray]:
+        """datasets of the capacity cases are small, only 1 file that fits into memory"""
+        data_df = [data_df for data_df in self.dataset][0]
+        embeddings = np.stack(data_df["emb"]).astype(np.float32)
+        if self.normalize:
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1)[:, np.newaxis]
+        ids = data_df["id"].to_numpy()
+        return (embeddings if self.db.support_ndarray_insert() else embeddings.tolist()), ids
+
+    def _batches(self, writer: int, embeddings, ids: np.ndarray) -> Iterator[tuple[list[list[float]] | np.ndarray, list[int]]]:
+        """the train data repeated forever, pass p of a writer takes the ids of range (p * num_writers + writer) * size"""
+        size = len(ids)
+        for p in itertools.count():
+            offset = (p * self.num_writers + writer) * size
+            for i in range(0, size, self.batch_size):
+                yield embeddings[i : i + self.batch_size], (ids[i : i + self.batch_size] + offset).tolist()
+
+    def _insert_until_full(self, embeddings, metadata: list[int]) -> tuple[int, Exception | None]:
+        """Insert a batch, on an error insert the rest of it in halves, down to the single row the db rejects"""
+        count, error = self.db.insert_embeddings(embeddings=embeddings, metadata=metadata)
+        if error is None or len(metadata) - count <= 1:
+            return count, error
+
+        log.info(f"({mp.current_process().name:16}) Failed to insert {len(metadata) - count} rows, insert them in halves: {error}")
+        embeddings, metadata = embeddings[count:], metadata[count:]
+        half = len(metadata) // 2
+        first, error = self._insert_until_full(embeddings[:half], metadata[:half])
+        if error is not None:
+            return count + first, error
+        second, error = self._insert_until_full(embeddings[half:], metadata[half:])
+        return count + first + second, error
+
+    def _insert_with_retry(self, embeddings, metadata: list[int], start: float) -> tuple[int, Exception | None, float]:
+        """Insert a batch until full, retry the rest of it on errors, returns the error after max_retry retries
+
+        Returns:
+            tuple: count of the rows committed, the last error, and the duration of the last try
+        """
+        count, retry = 0, 0
+        while True:
+            s = time.perf_counter()
+            inserted, error = self._insert_until_full(embeddings[count:], metadata[count:])
+            count += inserted
+            if error is None:
+                return count, None, time.perf_counter() - s
+
+            self.timeline.record_error(time.perf_counter() - start)
+            if retry >= self.max_retry:
+                return count, error, time.perf_counter() - s
+            retry += 1
+            self.retry_count += 1
+            log.warning(f"({mp.current_process().name:16}) Failed to insert data, try {retry} time in {self.retry_interval}s: {error}")
+            time.sleep(self.retry_interval)
+
+    def _write(self, writer: int, start: float, committed, stop, outbox):
+        """writer process, committed[writer] is the count of its rows committed"""
+        try:
+            embeddings, ids = self._load_data()
+            recent = collections.deque(maxlen=config.CAPACITY_LATENCY_WINDOW)
+            reason = None
+            with self.db.init():
+                for batch in self._batches(writer, embeddings, ids):
+                    if stop.is_set():
+                        break
+                    # the latency of the last try, without the waits between the retries
+                    count, error, dur = self._insert_with_retry(*batch, start)
+                    now = time.perf_counter()
+                    committed[writer] += count
+                    if error is not None:
+                        reason = ("error", f"{type(error).__name__}: {error}")
+                        break
+
+                    self.latencies.record(dur)
+                    self.timeline.record(now - start, dur, count)
+                    recent.append(dur)
+                    if self.latency_threshold > 0 and len(recent) == recent.maxlen and np.mean(recent) > self.latency_threshold:
+                        reason = ("latency", f"mean latency {round(float(np.mean(recent)), 4)}s of the last {len(recent)} batches")
+                        break
+
+            if reason is not None:
+                log.info(f"({mp.current_process().name:16}) Stop the capacity load at {committed[writer]} rows, {reason[0]}: {reason[1]}")
+                stop.set()
+                outbox.put(("stop", *reason))
+            outbox.put(("done", self.latencies, self.timeline, self.retry_count))
+        except Exception as e:
+            traceback.print_exc()
+            stop.set()
+            outbox.put(("failed", f"{type(e).__name__}: {e}"))
+
+    def _poll_memory(self, elapsed: float, rows: int) -> bool:
+        """record the memory of the db, returns whether it reached the threshold"""
+        memory = self.db.memory_usage()
+        self.memory_timeline["time"].append(round(elapsed, 4))
+        self.memory_timeline["rows"].append(rows)
+        self.memory_timeline["memory"].append(None if memory is None else round(memory, 4))
+        return memory is not None and memory >= self.memory_threshold
+
+    def _monitor(self, writers: list, committed, stop, outbox, start: float) -> list[tuple]:
+        """wait for all the writers to stop, stop them at the memory threshold, returns their messages"""
+        monitor_memory = self.memory_threshold > 0 and self.db.support_memory_usage()
+        if not monitor_memory:
+            log.info("Capacity load without the memory threshold, disabled or no memory_usage for the db")
+
+        messages = []
+        with self.db.init():
+            next_poll = start
+            while len([m for m in messages if m[0] in ("done", "failed")]) < len(writers):
+                now = time.perf_counter()
+                if now >= next_poll:
+                    next_poll = now + self.monitor_interval
+                    if monitor_memory and not stop.is_set() and self._poll_memory(now - start, sum(committed)):
+                        log.info(f"Stop the capacity load at {sum(committed)} rows, memory reached {self.memory_threshold}")
+                        self.stop_reason = self.stop_reason or "memory"
+                        stop.set()
+                if self.timeout is not None and now - start > self.timeout and not stop.is_set():
+                    stop.set()
+                    self.stop_reason = "timeout"
+
+                try:
+                    messages.append(outbox.get(timeout=max(0.01, min(1.0, next_poll - time.perf_counter()))))
+                except queue.Empty:
+                    if not any(w.is_alive() for w in writers):
+                        raise RuntimeError(f"Capacity writers exited with codes {[w.exitcode for w in writers]}") from None
+                    continue
+                if messages[-1][0] == "stop":
+                    self.stop_reason = self.stop_reason or messages[-1][1]
+        return messages
+
+    def run(self) -> int:
+        """Insert until a stop condition, returns the count of rows committed"""
+        with self.db.init():
+            self.db.ready_to_load()
+
+        ctx = mp.get_context("spawn")
+        committed, stop, outbox = ctx.Array("q", self.num_writers, lock=False), ctx.Event(), ctx.Queue()
+        start = time.perf_counter()
+        writers = [
+            ctx.Process(target=self._write, args=(w, start, committed, stop, outbox), name=f"CapacityWriter-{w}", daemon=True)
+            for w in range(self.num_writers)
+        ]
+        for w in writers:
+            w.start()
+        try:
+            messages = self._monitor(writers, committed, stop, outbox, start)
+        finally:
+            stop.set()
+            for w in writers:
+                w.join(timeout=60)
+                if w.is_alive():
+                    w.kill()
+
+        self.duration = time.perf_counter() - start
+        count = sum(committed)
+        failed = [m[1] for m in messages if m[0] == "failed"]
+        if failed:
+            log.warning(f"Capacity writer failed: {failed[0]}")
+            raise RuntimeError(f"Capacity writer failed: {failed[0]}")
+        for _, latencies, timeline, retry_count in (m for m in messages if m[0] == "done"):
+            self.latencies.merge(latencies)
+            self.timeline.merge(timeline)
+            self.retry_count += retry_count
+        if self.stop_reason == "timeout":
+            msg = f"capacity case load timeout in {self.timeout}s, {count} rows inserted"
+            log.info(msg)
+            raise LoadTimeoutError(msg)
+
+        details = [m[2] for m in messages if m[0] == "stop"]
+        log.info(
+            f"Capacity case load reach limit, insertion counts={utils.numerize(count)}, {count}, "
+            f"reason={self.stop_reason}, {details}, dur={round(self.duration, 4)}"
+        )
+        return count
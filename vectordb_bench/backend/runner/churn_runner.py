@@ -0,0 +1,126 @@
+import time
+import logging
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from ..clients import api
+from ..dataset import DatasetManager
+from ..ground_truth import exact_knn
+from ... import config
+from .serial_runner import _Rechunker
+
+log = logging.getLogger(__name__)
+
+
+class ChurnRunner:
+    """Delete a random part of the loaded train data, then upsert a random part of the deleted rows back
+
+    Every row is picked by a draw of a generator seeded with seed, in the order of dataset.iter_numpy(),
+    so the deletes, the upserts and the ground truth pick the same rows without keeping them in memory.
+
+    Args:
+        delete_ratio(float): ratio of the train data deleted, default to config.CHURN_DELETE_RATIO
+        reinsert_ratio(float): ratio of the deleted rows upserted back with their own vectors,
+            default to config.CHURN_REINSERT_RATIO
+        batch_size(int): ids of every delete_embeddings and upsert_embeddings call
+    """
+    def __init__(
+        self,
+        db: api.VectorDB,
+        dataset: DatasetManager,
+        normalize: bool,
+        delete_ratio: float = config.CHURN_DELETE_RATIO,
+        reinsert_ratio: float = config.CHURN_REINSERT_RATIO,
+        batch_size: int = config.NUM_PER_BATCH,
+        seed: int = config.CHURN_SEED,
+    ):
+        if not 0 <= delete_ratio <= 1 or not 0 <= reinsert_ratio <= 1:
+            raise ValueError(f"Churn ratios should be in [0, 1], got {delete_ratio}, {reinsert_ratio}")
+        self.db = db
+        self.dataset = dataset
+        self.normalize = normalize
+        self.delete_ratio = delete_ratio
+        self.reinsert_ratio = reinsert_ratio
+        self.batch_size = batch_size
+        self.seed = seed
+
+    def _iter_churn(self) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """ids, embeddings, and the masks of the deleted and of the upserted rows of every batch of the train data"""
+        rng = np.random.default_rng(self.seed)
+        for ids, embeddings in self.dataset.iter_numpy():
+            deleted = rng.random(len(ids)) < self.delete_ratio
+            upserted = deleted & (rng.random(len(ids)) < self.reinsert_ratio)
+            yield ids, embeddings, deleted, upserted
+
+    def _prepare(self, embeddings: np.ndarray) -> list[list[float]] | np.ndarray:
+        if self.normalize:
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1)[:, np.newaxis]
+        return embeddings if self.db.support_ndarray_insert() else embeddings.tolist()
+
+    @staticmethod
+    def _call(func: Callable[..., tuple[int, Exception | None]], *args) -> tuple[int, float]:
+        """the count of the call and its duration, only the db call is timed"""
+        s = time.perf_counter()
+        count, error = func(*args)
+        dur = time.perf_counter() - s
+        if error is not None:
+            raise error
+        return count, dur
+
+    def _delete(self) -> tuple[int, float]:
+        count, dur, pending = 0, 0.0, []
+        with self.db.init():
+            for ids, _, deleted, _ in self._iter_churn():
+                pending.extend(ids[deleted].tolist())
+                while len(pending) >= self.batch_size:
+                    c, d = self._call(self.db.delete_embeddings, pending[: self.batch_size])
+                    count, dur = count + c, dur + d
+                    pending = pending[self.batch_size :]
+            if pending:
+                c, d = self._call(self.db.delete_embeddings, pending)
+                count, dur = count + c, dur + d
+        return count, dur
+
+    def _upsert(self) -> tuple[int, float]:
+        count, dur = 0, 0.0
+        with self.db.init():
+            batches = _Rechunker(
+                (self._prepare(embeddings[upserted]), ids[upserted].tolist())
+                for ids, embeddings, _, upserted in self._iter_churn()
+                if upserted.any()
+            )
+            while (batch := batches.take(self.batch_size)) is not None:
+                c, d = self._call(self.db.upsert_embeddings, *batch)
+                count, dur = count + c, dur + d
+        return count, dur
+
+    def run(self) -> tuple[int, float, int, float]:
+        """
+        The durations are the sum of the delete_embeddings and upsert_embeddings calls, reading
+        and preparing the rows between them are not counted.
+
+        Returns:
+            tuple[int, float, int, float]: deleted count and duration, upserted count and duration
+        """
+        if not self.db.support_delete():
+            raise ValueError(f"{type(self.db).__name__} doesn't support delete_embeddings and upsert_embeddings")
+
+        deleted, delete_dur = self._delete()
+        delete_dur = round(delete_dur, 4)
+        log.info(f"Deleted {deleted} embeddings, dur={delete_dur}")
+
+        upserted, upsert_dur = self._upsert()
+        upsert_dur = round(upsert_dur, 4)
+        log.info(f"Upserted {upserted} of the deleted embeddings back, dur={upsert_dur}")
+        return deleted, delete_dur, upserted, upsert_dur
+
+    def ground_truth(self, test_data: np.ndarray, k: int) -> pd.DataFrame:
+        """Exact kNN of the test queries among the rows left after run(), like dataset.gt_data"""
+        batches = (
+            (ids[~deleted | upserted], embeddings[~deleted | upserted])
+            for ids, embeddings, deleted, upserted in self._iter_churn()
+        )
+        neighbors = exact_knn(batches, test_data, k, self.dataset.data.metric_type)
+        return pd.DataFrame({"id": range(len(test_data)), "neighbors_id": list(neighbors)})
@@ -0,0 +1,84 @@
+import json
+import logging
+import pathlib
+
+log = logging.getLogger(__name__)
+
+
+class LoadCheckpoint:
+    """Rows committed by every writer of a load, persisted after every insert batch to resume the load
+
+    One json file per shard of the train data in path:
+        count(int): rows of the shard committed so far, the resumed load skips them
+        file(str), row_group(int), offset(int): position of the next row of the shard in the train files
+        last_id(int | None): id of the last committed row
+        pending(int): max rows of the next batch, in flight after them till the next save, committed or not
+
+    Examples:
+        >>> checkpoint = LoadCheckpoint(config.LOAD_CHECKPOINT_DIR.joinpath("pgvector-Performance768D1M"))
+        >>> checkpoint.save(0, 4, 5000, dataset.row_group_sizes(0, 4), 19999, pending=5000)
+        >>> checkpoint.count(0, 4)
+        5000
+    """
+    def __init__(self, path: pathlib.Path | str):
+        self.path = pathlib.Path(path)
+
+    def _file(self, shard: int, num_shards: int) -> pathlib.Path:
+        return self.path.joinpath(f"shard-{shard}-of-{num_shards}.json")
+
+    def exists(self) -> bool:
+        return any(self.path.glob("shard-*.json"))
+
+    def check(self, num_shards: int):
+        """raise if the checkpoint is of a load with another number of writers, the shards differ"""
+        others = [f.name for f in self.path.glob("shard-*.json") if not f.name.endswith(f"-of-{num_shards}.json")]
+        if others:
+            raise ValueError(f"Load checkpoint {self.path} is of another number of writers than {num_shards}: {others}")
+
+    def read(self, shard: int, num_shards: int) -> dict:
+        f = self._file(shard, num_shards)
+        if not f.exists():
+            return {}
+        with open(f) as fd:
+            return json.load(fd)
+
+    def count(self, shard: int, num_shards: int) -> int:
+        return self.read(shard, num_shards).get("count", 0)
+
+    def save(
+        self,
+        shard: int,
+        num_shards: int,
+        count: int,
+        row_group_sizes: list[tuple[str, int, int]],
+        last_id: int | None,
+        pending: int = 0,
+    ):
+        """Atomically replace the checkpoint of the shard, row_group_sizes are the ones of DatasetManager.row_group_sizes"""
+        file_name, row_group, offset = None, None, count
+        for name, group, num_rows in row_group_sizes:
+            file_name, row_group = name, group
+            if offset < num_rows:
+                break
+            offset -= num_rows
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        f = self._file(shard, num_shards)
+        tmp = f.with_suffix(".tmp")
+        with open(tmp, "w") as fd:
+            json.dump({
+                "count": count,
+                "file": file_name,
+                "row_group": row_group,
+                "offset": offset,
+                "last_id": None if last_id is None else int(last_id),
+                "pending": pending,
+            }, fd)
+        tmp.replace(f)
+
+    def clear(self):
+        if not self.path.exists():
+            return
+        for f in self.path.glob("shard-*"):
+            f.unlink()
+        log.info(f"Cleared the load checkpoint {self.path}")
@@ -2,15 +2,19 @@ import time
 import traceback
 import concurrent
 import multiprocessing as mp
+import queue
 import random
 import logging
 from typing import Iterable
 import numpy as np
 from ..clients import api
 from ... import config
+from ...metric import LatencyHistogram, SearchTimeline
+from .query_set import SharedQuerySet
 
 
 NUM_PER_BATCH = config.NUM_PER_BATCH
+ARRIVALS = ("constant", "poisson")
 log = logging.getLogger(__name__)
 
 
@@ -21,65 +25,304 @@ class MultiProcessingSearchRunner:
         k(int): search topk, default to 100
         concurrency(Iterable): concurrencies, default [1, 5, 10, 15, 20, 25, 30, 35]
         duration(int): duration for each concurency, default to 30s
+        rates(Iterable): target qps of the open-loop search, default to config.SEARCH_RATE_LIST
+        arrival(str): arrivals of the open-loop search, "constant" or "poisson"
+        reuse_pool(bool): spawn the search processes once for all concurrencies, default to True
+        use_shared_memory(bool): share one float32 copy of test_data between the search processes, default to True
+        warmup(int): seconds of search before each concurrency, excluded from qps and latency, default to 0
+        steady_state(bool): end each concurrency as soon as the windowed qps is steady instead of after `duration`,
+            or extend it up to config.SEARCH_MAX_DURATION, needs reuse_pool. Default to False
+        timeline_interval(float): seconds of each bucket of the qps and latency timeline, default to 1
+        max_errors(int): failed queries tolerated in each process before the concurrency fails, default to 0
     """
     def __init__(
         self,
         db: api.VectorDB,
-        test_data: list[list[float]],
+        test_data: list[list[float]] | np.ndarray,
         k: int = 100,
         filters: dict | None = None,
         concurrencies: Iterable[int] = config.NUM_CONCURRENCY,
         duration: int = 30,
+        rates: Iterable[float] = config.SEARCH_RATE_LIST,
+        arrival: str = config.SEARCH_RATE_ARRIVAL,
+        reuse_pool: bool = config.SEARCH_REUSE_WORKER_POOL,
+        use_shared_memory: bool = config.SEARCH_SHARED_MEMORY,
+        warmup: int = config.SEARCH_WARMUP_DURATION,
+        steady_state: bool = config.SEARCH_STEADY_STATE,
+        timeline_interval: float = config.SEARCH_TIMELINE_INTERVAL,
+        max_errors: int = config.SEARCH_MAX_ERRORS,
     ):
         self.db = db
         self.k = k
         self.filters = filters
         self.concurrencies = concurrencies
         self.duration = duration
+        self.rates = rates
+        if arrival not in ARRIVALS:
+            raise ValueError(f"Arrival not supported: {arrival}, expected one of {ARRIVALS}")
+        self.arrival = arrival
+        self.reuse_pool = reuse_pool
+        self.pool: SearchWorkerPool | None = None
+        self.use_shared_memory = use_shared_memory
+        self.shared_test_data: SharedQuerySet | None = None
+        self.warmup = warmup
+        if steady_state and not reuse_pool:
+            raise ValueError("Steady state detection needs the search worker pool, set reuse_pool")
+        self.steady_state = steady_state
+        self.timeline_interval = timeline_interval
+        self.max_errors = max_errors
+
+        # only set in the processes of the search worker pool
+        self._worker_id: int = 0
+        self._progress = None
+        self._stop_flag = None
 
         self.test_data = test_data
         log.debug(f"test dataset columns: {len(test_data)}")
 
-    def search(self, test_data: list[list[float]], q: mp.Queue, cond: mp.Condition) -> tuple[int, float]:
+    def _get_test_data(self) -> list[list[float]] | SharedQuerySet:
+        """test data shipped to the search processes"""
+        if not self.use_shared_memory:
+            if isinstance(self.test_data, np.ndarray):
+                return self.test_data.tolist()
+            return self.test_data
+
+        if self.shared_test_data is None:
+            self.shared_test_data = SharedQuerySet(np.asarray(self.test_data, dtype=np.float32))
+        return self.shared_test_data
+
+    def _level_done(self, start_time: float) -> bool:
+        """Whether the measurement of a concurrency started at start_time should end"""
+        now = time.perf_counter()
+        if self.steady_state and self._stop_flag is not None:
+            # the parent sets the flag, the max duration is only a safeguard
+            return bool(self._stop_flag.value) or now >= start_time + config.SEARCH_MAX_DURATION + 5
+        return now >= start_time + self.duration
+
+    def _report_progress(self, count: int = 1):
+        if self._progress is not None:
+            self._progress[self._worker_id] += count
+
+    def _warm_up(self, test_data: list[list[float]] | SharedQuerySet, idx: int) -> int:
+        """Search for self.warmup seconds without measuring, returns the next idx"""
+        num = len(test_data)
+        end_time = time.perf_counter() + self.warmup
+        while time.perf_counter() < end_time:
+            try:
+                self.db.search_embedding(test_data[idx], self.k, self.filters)
+            except Exception as e:
+                log.warning(f"VectorDB search_embedding error in warm-up: {e}")
+                traceback.print_exc(chain=True)
+                raise e from None
+            idx = idx + 1 if idx < num - 1 else 0
+        return idx
+
+    def _on_search_error(self, e: Exception, errors: int):
+        """Raise e if the process failed more than self.max_errors queries"""
+        if errors > self.max_errors:
+            log.warning(f"VectorDB search_embedding error: {e}")
+            traceback.print_exc(chain=True)
+            raise e from None
+        log.warning(f"VectorDB search_embedding error ({errors}/{self.max_errors} tolerated): {e}")
+
+    def search(self, test_data: list[list[float]] | SharedQuerySet) -> tuple[int, float, LatencyHistogram, SearchTimeline]:
+        """Closed-loop search, send the next query right after the previous one returns. Should call self.db.init() first."""
+        num, idx = len(test_data), random.randint(0, len(test_data) - 1)
+        idx = self._warm_up(test_data, idx)
+
+        start_time = time.perf_counter()
+        count, errors = 0, 0
+        latencies = LatencyHistogram()
+        timeline = SearchTimeline(self.timeline_interval)
+        while not self._level_done(start_time):
+            # loop through the test data, the query is read before the timer
+            query, idx = test_data[idx], idx + 1 if idx < num - 1 else 0
+            s = time.perf_counter()
+            try:
+                self.db.search_embedding(
+                    query,
+                    self.k,
+                    self.filters,
+                )
+            except Exception as e:
+                errors += 1
+                timeline.record_error(time.perf_counter() - start_time)
+                self._on_search_error(e, errors)
+                continue
+
+            now = time.perf_counter()
+            latencies.record(now - s)
+            timeline.record(now - start_time, now - s)
+            count += 1
+            self._report_progress()
+
+            if count % 500 == 0:
+                log.debug(f"({mp.current_process().name:16}) search_count: {count}, latest_latency={time.perf_counter()-s}")
+
+        total_dur = round(time.perf_counter() - start_time, 4)
+        log.info(
+            f"{mp.current_process().name:16} search {self.duration}s after {self.warmup}s warm-up: "
+            f"actual_dur={total_dur}s, count={count}, errors={errors}, qps in this process: {round(count / total_dur, 4):3}"
+         )
+
+        return (count, total_dur, latencies, timeline)
+
+    def search_by_rate(self, test_data: list[list[float]] | SharedQuerySet, rate: float) -> tuple[int, float, LatencyHistogram, int]:
+        """Open-loop search, send queries on a schedule of `rate` qps no matter how fast the DB responds.
+        Should call self.db.init() first.
+
+        The latency is measured from the intended send time, so the queueing delay
+        caused by a slow response is counted into the following queries. The queries
+        scheduled before the end but still not sent when it's reached are counted as dropped.
+
+        Returns:
+            tuple: count, duration, latencies and the number of dropped queries
+        """
+        num, idx = len(test_data), random.randint(0, len(test_data) - 1)
+        rng = np.random.default_rng()
+        interval = 1 / rate
+
+        start_time = time.perf_counter()
+        end_time = start_time + self.duration
+        # random phase, so the processes don't send in lockstep
+        intended = start_time + random.random() * interval
+        count = 0
+        latencies = LatencyHistogram()
+        while intended < end_time:
+            # read before waiting for the intended send time
+            query = test_data[idx]
+            now = time.perf_counter()
+            if now >= end_time:
+                break
+            if now < intended:
+                time.sleep(intended - now)
+
+            try:
+                self.db.search_embedding(
+                    query,
+                    self.k,
+                    self.filters,
+                )
+            except Exception as e:
+                log.warning(f"VectorDB search_embedding error: {e}")
+                traceback.print_exc(chain=True)
+                raise e from None
+
+            latencies.record(time.perf_counter() - intended)
+            count += 1
+            # loop through the test data
+            idx = idx + 1 if idx < num - 1 else 0
+
+            if self.arrival == "poisson":
+                intended += rng.exponential(interval)
+            else:
+                intended += interval
+
+        dropped = 0
+        while intended < end_time:
+            dropped += 1
+            if self.arrival == "poisson":
+                intended += rng.exponential(interval)
+            else:
+                intended += interval
+
+        total_dur = round(time.perf_counter() - start_time, 4)
+        log.info(
+            f"{mp.current_process().name:16} search {self.duration}s at rate {rate}: "
+            f"actual_dur={total_dur}s, count={count}, dropped={dropped}, qps in this process: {round(count / total_dur, 4):3}"
+         )
+
+        return (count, total_dur, latencies, dropped)
+
+    def _search_in_new_process(self, func_name: str, test_data: list[list[float]] | SharedQuerySet, q: mp.Queue, cond: mp.Condition, *args):
         # sync all process
         q.put(1)
         with cond:
             cond.wait()
 
-        with self.db.init():
-            num, idx = len(test_data), random.randint(0, len(test_data) - 1)
-
-            start_time = time.perf_counter()
-            count = 0
-            latencies = []
-            while time.perf_counter() < start_time + self.duration:
-                s = time.perf_counter()
-                try:
-                    self.db.search_embedding(
-                        test_data[idx],
-                        self.k,
-                        self.filters,
-                    )
-                except Exception as e:
-                    log.warning(f"VectorDB search_embedding error: {e}")
-                    traceback.print_exc(chain=True)
-                    raise e from None
-                
-                latencies.append(time.perf_counter() - s)
-                count += 1
-                # loop through the test data
-                idx = idx + 1 if idx < num - 1 else 0
-
-                if count % 500 == 0:
-                    log.debug(f"({mp.current_process().name:16}) search_count: {count}, latest_latency={time.perf_counter()-s}")
+        try:
+            with self._worker_init():
+                return getattr(self, func_name)(test_data, *args)
+        finally:
+            if isinstance(test_data, SharedQuerySet):
+                test_data.close()
 
-        total_dur = round(time.perf_counter() - start_time, 4)
-        log.info(
-            f"{mp.current_process().name:16} search {self.duration}s: "
-            f"actual_dur={total_dur}s, count={count}, qps in this process: {round(count / total_dur, 4):3}"
-         )
+    def _worker_init(self):
+        """Context entered once in every search process before running any search task"""
+        return self.db.init()
+
+    def _pool_size(self) -> int:
+        return max(self.concurrencies)
+
+    def _pool_worker(
+        self,
+        worker_id: int,
+        test_data: list[list[float]] | SharedQuerySet,
+        inbox: mp.Queue,
+        outbox: mp.Queue,
+        start_event: mp.Event,
+        progress: mp.Array,
+        stop_flag: mp.Value,
+    ):
+        """Worker of the SearchWorkerPool, keeps the connection open for all the search tasks.
+
+        Task is (func_name, args) or None to exit, the worker reports "ready" and waits for
+        start_event, then runs self.func_name(test_data, *args) and reports "done" or "error".
+        progress[worker_id] counts the measured queries, and stop_flag ends a steady-state search.
+        """
+        self._worker_id, self._progress, self._stop_flag = worker_id, progress, stop_flag
+        try:
+            with self._worker_init():
+                while True:
+                    task = inbox.get()
+                    if task is None:
+                        break
+
+                    func_name, args = task
+                    outbox.put(("ready", worker_id, None))
+                    start_event.wait()
+                    outbox.put(("done", worker_id, getattr(self, func_name)(test_data, *args)))
+        except Exception as e:
+            outbox.put(("error", worker_id, f"{type(e).__name__}: {e}"))
+        finally:
+            # drop the view of the queries before the parent unlinks them
+            if isinstance(test_data, SharedQuerySet):
+                test_data.close()
+
+    def _steady_state_detector(self) -> "SteadyStateDetector | None":
+        if not self.steady_state:
+            return None
+        return SteadyStateDetector(self.warmup, config.SEARCH_STEADY_WINDOW, config.SEARCH_STEADY_CV, config.SEARCH_MAX_DURATION)
+
+    def _run_level(self, conc: int, func_name: str, *args, detect_steady_state: bool = False) -> tuple[list[tuple], float]:
+        """Run self.func_name(test_data, *args) in conc processes at the same time
+
+        Returns:
+            tuple[list[tuple], float]: results of all processes, and the duration from start till all finished
+        """
+        if self.reuse_pool:
+            if self.pool is None:
+                self.pool = SearchWorkerPool(self, self._get_test_data(), self._pool_size(), self.get_mp_context())
+            detector = self._steady_state_detector() if detect_steady_state else None
+            return self.pool.run_each(func_name, [args] * conc, detector)
+
+        with mp.Manager() as m:
+            q, cond = m.Queue(), m.Condition()
+            with concurrent.futures.ProcessPoolExecutor(mp_context=self.get_mp_context(), max_workers=conc) as executor:
+                test_data = self._get_test_data()
+                future_iter = [executor.submit(self._search_in_new_process, func_name, test_data, q, cond, *args) for i in range(conc)]
+                # Sync all processes
+                while q.qsize() < conc:
+                    sleep_t = conc if conc < 10 else 10
+                    time.sleep(sleep_t)
 
-        return (count, total_dur, latencies)
+                with cond:
+                    cond.notify_all()
+                    log.info(f"Syncing all process and start {func_name}, concurrency={conc}")
+
+                start = time.perf_counter()
+                results = [r.result() for r in future_iter]
+                return results, time.perf_counter() - start
 
     @staticmethod
     def get_mp_context():
@@ -93,35 +336,39 @@ class MultiProcessingSearchRunner:
         conc_qps_list = []
         conc_latency_p99_list = []
         conc_latency_mean_list = []
+        conc_latency_p50_list = []
+        conc_latency_p90_list = []
+        conc_latency_p999_list = []
+        conc_latency_max_list = []
+        conc_timeline_list = []
         try:
             for conc in self.concurrencies:
-                with mp.Manager() as m:
-                    q, cond = m.Queue(), m.Condition()
-                    with concurrent.futures.ProcessPoolExecutor(mp_context=self.get_mp_context(), max_workers=conc) as executor:
-                        log.info(f"Start search {self.duration}s in concurrency {conc}, filters: {self.filters}")
-                        future_iter = [executor.submit(self.search, self.test_data, q, cond) for i in range(conc)]
-                        # Sync all processes
-                        while q.qsize() < conc:
-                            sleep_t = conc if conc < 10 else 10
-                            time.sleep(sleep_t)
-
-                        with cond:
-                            cond.notify_all()
-                            log.info(f"Syncing all process and start concurrency search, concurrency={conc}")
-
-                        start = time.perf_counter()
-                        all_count = sum([r.result()[0] for r in future_iter])
-                        latencies = sum([r.result()[2] for r in future_iter], start=[])
-                        latency_p99 = np.percentile(latencies, 99)
-                        latency_mean = np.mean(latencies)
-                        cost = time.perf_counter() - start
-
-                        qps = round(all_count / cost, 4)
-                        conc_num_list.append(conc)
-                        conc_qps_list.append(qps)
-                        conc_latency_p99_list.append(latency_p99)
-                        conc_latency_mean_list.append(latency_mean)
-                        log.info(f"End search in concurrency {conc}: dur={cost}s, total_count={all_count}, qps={qps}")
+                log.info(f"Start search {self.duration}s in concurrency {conc}, filters: {self.filters}")
+                results, cost = self._run_level(conc, "search", detect_steady_state=True)
+                # the measured part of each process starts after the warm-up
+                cost -= self.warmup
+
+                all_count = sum([r[0] for r in results])
+                latencies = LatencyHistogram()
+                for r in results:
+                    latencies.merge(r[2])
+                timeline = SearchTimeline(self.timeline_interval)
+                for r in results:
+                    timeline.merge(r[3])
+                latency_p50, latency_p90, latency_p99, latency_p999 = latencies.percentiles([50, 90, 99, 99.9])
+                latency_mean = latencies.mean
+
+                qps = round(all_count / cost, 4)
+                conc_num_list.append(conc)
+                conc_qps_list.append(qps)
+                conc_latency_p99_list.append(latency_p99)
+                conc_latency_mean_list.append(latency_mean)
+                conc_latency_p50_list.append(latency_p50)
+                conc_latency_p90_list.append(latency_p90)
+                conc_latency_p999_list.append(latency_p999)
+                conc_latency_max_list.append(latencies.max)
+                conc_timeline_list.append(timeline.to_dict(cost))
+                log.info(f"End search in concurrency {conc}: dur={cost}s, total_count={all_count}, qps={qps}")
 
                 if qps > max_qps:
                     max_qps = qps
@@ -137,7 +384,62 @@ class MultiProcessingSearchRunner:
         finally:
             self.stop()
 
-        return max_qps, conc_num_list, conc_qps_list, conc_latency_p99_list, conc_latency_mean_list
+        return (
+            max_qps,
+            conc_num_list,
+            conc_qps_list,
+            conc_latency_p99_list,
+            conc_latency_mean_list,
+            conc_latency_p50_list,
+            conc_latency_p90_list,
+            conc_latency_p999_list,
+            conc_latency_max_list,
+            conc_timeline_list,
+        )
+
+    def _run_all_rates(self) -> tuple[list[float], ...]:
+        """Open-loop search for every target rate, each with max(concurrencies) processes."""
+        conc = max(self.concurrencies)
+        offered_list, achieved_list, dropped_list = [], [], []
+        p50_list, p95_list, p99_list, p999_list = [], [], [], []
+        try:
+            for rate in self.rates:
+                log.info(f"Start search {self.duration}s at rate {rate} ({self.arrival}) with {conc} clients, filters: {self.filters}")
+                results, _ = self._run_level(conc, "search_by_rate", rate / conc)
+
+                all_count = sum([r[0] for r in results])
+                cost = max([r[1] for r in results])
+                dropped = sum([r[3] for r in results])
+                latencies = LatencyHistogram()
+                for r in results:
+                    latencies.merge(r[2])
+
+                achieved = round(all_count / cost, 4)
+                p50, p95, p99, p999 = latencies.percentiles([50, 95, 99, 99.9])
+                offered_list.append(rate)
+                achieved_list.append(achieved)
+                dropped_list.append(dropped)
+                p50_list.append(p50)
+                p95_list.append(p95)
+                p99_list.append(p99)
+                p999_list.append(p999)
+                log.info(
+                    f"End search at rate {rate}: dur={cost}s, total_count={all_count}, dropped={dropped}, "
+                    f"offered qps={rate}, achieved qps={achieved}, "
+                    f"p50={p50:.4f}s, p95={p95:.4f}s, p99={p99:.4f}s, p999={p999:.4f}s"
+                )
+        except Exception as e:
+            log.warning(f"Fail to search all rates: {self.rates}, finished rates={offered_list}, reason={e}")
+            traceback.print_exc()
+
+            # No results available, raise exception
+            if len(offered_list) == 0:
+                raise e from None
+
+        finally:
+            self.stop()
+
+        return offered_list, achieved_list, dropped_list, p50_list, p95_list, p99_list, p999_list
 
     def run(self) -> float:
         """
@@ -146,5 +448,168 @@ class MultiProcessingSearchRunner:
         """
         return self._run_all_concurrencies_mem_efficient()
 
+    def run_by_rate(self) -> tuple[list[float], ...]:
+        """
+        Returns:
+            tuple: offered qps, achieved qps, dropped queries, latency p50, p95, p99 and p999 of each target rate
+        """
+        return self._run_all_rates()
+
     def stop(self) -> None:
-        pass
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.shared_test_data is not None:
+            self.shared_test_data.close()
+            self.shared_test_data = None
+
+    def __getstate__(self):
+        # the pool stays in the parent process, and test data is passed to
+        # the search processes as an argument, don't pickle it twice
+        state = self.__dict__.copy()
+        state["pool"] = None
+        state["shared_test_data"] = None
+        state["test_data"] = None
+        return state
+
+
+class SearchWorkerPool:
+    """Search processes spawned once with the max concurrency and reused by all the concurrencies.
+
+    Each process runs MultiProcessingSearchRunner._pool_worker, which calls db.init() once
+    and keeps the connection open. For one concurrency, the first `conc` processes get the
+    task and the others stay parked on their inbox.
+    """
+
+    def __init__(self, runner: MultiProcessingSearchRunner, test_data: list[list[float]] | SharedQuerySet, num_workers: int, mp_context):
+        self.inboxes = [mp_context.Queue() for _ in range(num_workers)]
+        self.outbox = mp_context.Queue()
+        self.start_event = mp_context.Event()
+        # single writer for every slot, the parent only reads
+        self.progress = mp_context.Array("q", num_workers, lock=False)
+        self.stop_flag = mp_context.Value("b", 0, lock=False)
+
+        log.info(f"Start search worker pool with {num_workers} processes")
+        self.procs = [
+            mp_context.Process(
+                target=runner._pool_worker,
+                args=(i, test_data, self.inboxes[i], self.outbox, self.start_event, self.progress, self.stop_flag),
+                daemon=True,
+            )
+            for i in range(num_workers)
+        ]
+        for p in self.procs:
+            p.start()
+
+    def _wait_for(self, status: str, num: int) -> list:
+        results = [None] * num
+        got = 0
+        while got < num:
+            try:
+                s, worker_id, res = self.outbox.get(timeout=1)
+            except queue.Empty:
+                dead = [p.name for p in self.procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Search processes exited unexpectedly: {dead}") from None
+                continue
+
+            if s == "error":
+                raise RuntimeError(f"Search process {worker_id} failed: {res}")
+            assert s == status, f"unexpected status from search process {worker_id}: {s}"
+            results[worker_id] = res
+            got += 1
+        return results
+
+    def run(self, conc: int, func_name: str, *args) -> tuple[list[tuple], float]:
+        return self.run_each(func_name, [args] * conc)
+
+    def run_each(self, func_name: str, args_list: list[tuple], detector: "SteadyStateDetector | None" = None) -> tuple[list[tuple], float]:
+        """Run func_name in the first len(args_list) processes, process i with args_list[i].
+
+        With a detector, the parent samples the progress of the processes every second
+        and sets stop_flag once the detector finds the qps steady.
+        """
+        conc = len(args_list)
+        if conc > len(self.procs):
+            raise ValueError(f"Concurrency {conc} exceeds the pool size {len(self.procs)}")
+
+        self.start_event.clear()
+        self.stop_flag.value = 0
+        for i in range(len(self.procs)):
+            self.progress[i] = 0
+        for i, args in enumerate(args_list):
+            self.inboxes[i].put((func_name, args))
+
+        # Sync all processes
+        self._wait_for("ready", conc)
+        self.start_event.set()
+        log.info(f"Syncing all process and start {func_name}, concurrency={conc}")
+
+        start = time.perf_counter()
+        if detector is not None:
+            self._wait_steady_state(detector, start)
+        results = self._wait_for("done", conc)
+        cost = time.perf_counter() - start
+        self.start_event.clear()
+        return results, cost
+
+    def _wait_steady_state(self, detector: "SteadyStateDetector", start: float):
+        time.sleep(detector.warmup)
+        while self.outbox.empty():
+            time.sleep(detector.interval)
+            if detector.update(sum(self.progress), time.perf_counter() - start):
+                break
+        self.stop_flag.value = 1
+
+    def close(self):
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for p in self.procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        log.info("Search worker pool closed")
+
+
+class SteadyStateDetector:
+    """Decides when the qps of a concurrency is steady, from the total count of measured
+    queries sampled every `interval` seconds after the warm-up.
+
+    Steady means the coefficient of variation of the qps samples in the last `window` seconds
+    is at most `max_cv`. Gives up at `max_duration` seconds of measurement.
+    """
+
+    interval: float = 1.0
+
+    def __init__(self, warmup: float, window: int, max_cv: float, max_duration: float):
+        self.warmup = warmup
+        self.window = max(2, int(window / self.interval))
+        self.max_cv = max_cv
+        self.max_duration = max_duration
+        self.qps_samples: list[float] = []
+        self._last_count, self._last_time = 0, warmup
+
+    def update(self, count: int, elapsed: float) -> bool:
+        """Add a sample of the total count at `elapsed` seconds since the start, warm-up included.
+
+        Returns:
+            bool: whether to end the measurement
+        """
+        dur = elapsed - self._last_time
+        if dur > 0:
+            self.qps_samples.append((count - self._last_count) / dur)
+            self._last_count, self._last_time = count, elapsed
+
+        measured = elapsed - self.warmup
+        if len(self.qps_samples) >= self.window:
+            window = np.array(self.qps_samples[-self.window:])
+            mean = window.mean()
+            cv = window.std() / mean if mean > 0 else float("inf")
+            if cv <= self.max_cv:
+                log.info(f"Search qps is steady after {measured:.1f}s: qps={mean:.4f}, cv={cv:.4f}")
+                return True
+
+        if measured >= self.max_duration:
+            log.warning(f"Search qps is not steady within max duration {self.max_duration}s, stop searching")
+            return True
+        return False
@@ -0,0 +1,66 @@
+import logging
+from multiprocessing import shared_memory
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class SharedQuerySet:
+    """Query matrix placed once in shared memory as float32, shared by all the search processes.
+
+    Pickling only ships the name and the shape of the shared memory block, every process
+    attaches a zero-copy numpy view. Indexing returns one query in the client's wire format
+    list[float], converted lazily on use.
+
+    Examples:
+        >>> queries = SharedQuerySet(np.random.random((1000, 768)))
+        >>> queries[0]  # list[float]
+        >>> queries.close()  # unlink in the creating process
+    """
+
+    def __init__(self, data: np.ndarray):
+        data = np.asarray(data, dtype=np.float32)
+        self.shape = data.shape
+        self._owner = True
+        self._shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        self._array = np.ndarray(self.shape, dtype=np.float32, buffer=self._shm.buf)
+        self._array[:] = data
+        log.debug(f"Put queries {self.shape} into shared memory {self._shm.name}, size={data.nbytes}")
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, idx: int) -> list[float]:
+        return self._array[idx].tolist()
+
+    @property
+    def array(self) -> np.ndarray:
+        """zero-copy view of the whole query matrix"""
+        return self._array
+
+    def __getstate__(self) -> dict:
+        return {"name": self._shm.name, "shape": self.shape}
+
+    def __setstate__(self, state: dict):
+        self.shape = state["shape"]
+        self._owner = False
+        # child processes share the resource tracker of the creating process,
+        # which is the only one responsible for unlinking
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._array = np.ndarray(self.shape, dtype=np.float32, buffer=self._shm.buf)
+
+    def close(self):
+        """Drop the view of this process and detach, the creating process also unlinks the block.
+
+        A view still alive elsewhere in the process (e.g. kept from `array`) makes the detach
+        fail with BufferError, the block is then unmapped once the view is gone, but unlinked anyway.
+        """
+        self._array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            log.warning(f"Views of shared memory {self._shm.name} still alive, skip detaching it")
+        if self._owner:
+            self._shm.unlink()
+            self._owner = False
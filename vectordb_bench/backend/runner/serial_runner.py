@@ -4,118 +4,305 @@ import traceback
 import concurrent
 import multiprocessing as mp
 import math
+import pathlib
 import psutil
+from typing import Iterable, Iterator
 
 import numpy as np
 import pandas as pd
 
 from ..clients import api
-from ...metric import calc_ndcg, calc_recall, get_ideal_dcg
+from ...metric import calc_search_metrics, to_id_matrix, LatencyHistogram, SearchTimeline
 from ...models import LoadTimeoutError, PerformanceTimeoutError
 from .. import utils
 from ... import config
 from vectordb_bench.backend.dataset import DatasetManager
+from .load_checkpoint import LoadCheckpoint
 
-NUM_PER_BATCH = config.NUM_PER_BATCH
 LOAD_MAX_TRY_COUNT = 10
 WAITTING_TIME = 60
 
 log = logging.getLogger(__name__)
 
+class _Rechunker:
+    """Re-slices the prepared (embeddings, ids) batches of the train data into batches of any number of rows"""
+
+    def __init__(self, batches: Iterator[tuple[list[list[float]] | np.ndarray, list[int]]]):
+        self._batches = batches
+        self._embeddings, self._ids = [], []
+
+    def take(self, num: int) -> tuple[list[list[float]] | np.ndarray, list[int]] | None:
+        """next num rows, fewer at the end of the data, None after the end"""
+        while len(self._ids) < num:
+            try:
+                embeddings, ids = next(self._batches)
+            except StopIteration:
+                break
+            if len(self._ids) == 0:
+                self._embeddings, self._ids = embeddings, ids
+            elif isinstance(embeddings, np.ndarray):
+                self._embeddings, self._ids = np.concatenate([self._embeddings, embeddings]), self._ids + ids
+            else:
+                self._embeddings, self._ids = self._embeddings + embeddings, self._ids + ids
+
+        if len(self._ids) == 0:
+            return None
+        batch = self._embeddings[:num], self._ids[:num]
+        self._embeddings, self._ids = self._embeddings[num:], self._ids[num:]
+        return batch
+
+
 class SerialInsertRunner:
-    def __init__(self, db: api.VectorDB, dataset: DatasetManager, normalize: bool, timeout: float | None = None):
+    """Insert the train data of the dataset
+
+    Args:
+        num_workers(int): writer processes of the performance case, each inserts its own shard
+            of the row groups of the train files, default to config.NUM_INSERT_WORKERS
+        prefetch(int): batches decoded ahead by a background thread of every writer,
+            0 to decode in between the inserts, default to config.LOAD_PREFETCH_BATCHES
+        batch_size(int): rows of every insert_embeddings call, default to config.NUM_PER_BATCH
+        batch_size_candidates(Iterable[int]): if not empty, every writer inserts its first rows
+            in batches of each of these sizes, config.LOAD_BATCH_SIZE_TUNE_ROWS rows each,
+            and the rest in the size of the best rows/s instead of batch_size.
+            Default to config.LOAD_BATCH_SIZE_CANDIDATES
+        checkpoint(LoadCheckpoint | None): the rows committed by every writer are saved in it after
+            every batch of the performance case, cleared once the load is done
+        resume(bool): skip the rows of every shard committed in the checkpoint, instead of clearing it
+    """
+    def __init__(
+        self,
+        db: api.VectorDB,
+        dataset: DatasetManager,
+        normalize: bool,
+        timeout: float | None = None,
+        num_workers: int = config.NUM_INSERT_WORKERS,
+        prefetch: int = config.LOAD_PREFETCH_BATCHES,
+        batch_size: int = config.NUM_PER_BATCH,
+        batch_size_candidates: Iterable[int] = config.LOAD_BATCH_SIZE_CANDIDATES,
+        checkpoint: LoadCheckpoint | None = None,
+        resume: bool = False,
+    ):
         self.timeout = timeout if isinstance(timeout, (int, float)) else None
         self.dataset = dataset
         self.db = db
         self.normalize = normalize
+        if num_workers < 1:
+            raise ValueError(f"num_workers should be positive, got {num_workers}")
+        self.num_workers = num_workers
+        self.prefetch = prefetch
+        if batch_size < 1 or any(size < 1 for size in batch_size_candidates):
+            raise ValueError(f"Insert batch sizes should be positive, got {batch_size}, {batch_size_candidates}")
+        self.batch_size = batch_size
+        self.batch_size_candidates = list(batch_size_candidates)
+        self.writer_throughputs: list[float] = []
+        self.writer_batch_sizes: list[int] = []
+        self.checkpoint = checkpoint
+        self.resume = resume
+        # rows skipped by all the writers of a resumed load
+        self.resumed_count = 0
+
+        # latency of every insert_embeddings batch, and rows/s over time since self._load_start
+        self.latencies = LatencyHistogram()
+        self.timeline = SearchTimeline(config.LOAD_TIMELINE_INTERVAL)
+        self.retry_count = 0
+        self.duration = 0.0
+        self._load_start = time.perf_counter()
+
+        # checkpoint state of the shard of a writer, set by task()
+        self._shard, self._num_shards, self._committed = 0, 1, 0
+        self._last_id: int | None = None
+        self._row_group_sizes: list[tuple[str, int, int]] = []
+
+    def _record_insert(self, s: float, count: int):
+        now = time.perf_counter()
+        self.latencies.record(now - s)
+        self.timeline.record(now - self._load_start, now - s, count)
+
+    def _prepare(self, data_df: pd.DataFrame) -> tuple[list[list[float]], list[int]]:
+        """embeddings and ids of a batch of the train data"""
+        all_metadata = data_df['id'].tolist()
+
+        emb_np = np.stack(data_df['emb'])
+        if self.normalize:
+            log.debug("normalize the 100k train data")
+            all_embeddings = (emb_np / np.linalg.norm(emb_np, axis=1)[:, np.newaxis]).tolist()
+        else:
+            all_embeddings = emb_np.tolist()
+        return all_embeddings, all_metadata
+
+    def _prepare_ndarray(self, batch: tuple[np.ndarray, np.ndarray]) -> tuple[np.ndarray, list[int]]:
+        """float32 embeddings matrix and ids of a batch of the train data"""
+        ids, emb_np = batch
+        if self.normalize:
+            emb_np = emb_np / np.linalg.norm(emb_np, axis=1)[:, np.newaxis]
+        return emb_np, ids.tolist()
+
+    def _insert_batch(self, embeddings: list[list[float]] | np.ndarray, metadata: list[int], upsert: bool = False) -> int:
+        s = time.perf_counter()
+        insert = self.db.upsert_embeddings if upsert else self.db.insert_embeddings
+        insert_count, error = insert(
+            embeddings=embeddings,
+            metadata=metadata,
+        )
+        if error is not None:
+            raise error
+
+        self._record_insert(s, insert_count)
+        assert insert_count == len(metadata)
+        self._committed += insert_count
+        self._last_id = metadata[-1]
+        self._save_checkpoint()
+        return insert_count
+
+    def _save_checkpoint(self):
+        """Saved once after every batch, pending is the max size of the next batch, in flight till the next save,
+        committed or not if the load stops meanwhile"""
+        if self.checkpoint is not None:
+            pending = max([self.batch_size, *self.batch_size_candidates])
+            self.checkpoint.save(self._shard, self._num_shards, self._committed, self._row_group_sizes, self._last_id, pending)
+
+    def _tune_batch_size(self, batches: _Rechunker) -> int:
+        """Insert the first rows in batches of every candidate size, set self.batch_size
+        to the size of the best rows/s, returns the inserted count"""
+        count, best_rate = 0, 0.0
+        for size in self.batch_size_candidates:
+            rows, dur = 0, 0.0
+            while rows < max(size, config.LOAD_BATCH_SIZE_TUNE_ROWS) and (batch := batches.take(size)) is not None:
+                s = time.perf_counter()
+                rows += self._insert_batch(*batch)
+                dur += time.perf_counter() - s
+            if rows == 0:
+                log.warning(f"({mp.current_process().name:16}) Run out of train data to tune the insert batch size at {size}")
+                break
+
+            count += rows
+            rate = rows / dur if dur > 0 else float("inf")
+            log.info(f"({mp.current_process().name:16}) Insert batch size {size}: {rows} rows at {round(rate, 4)} rows/s")
+            if rate > best_rate:
+                self.batch_size, best_rate = size, rate
+        log.info(f"({mp.current_process().name:16}) Insert the rest in batch {self.batch_size}")
+        return count
 
-    def task(self) -> int:
+    def task(self, shard: int = 0, num_shards: int = 1) -> tuple[int, float, LatencyHistogram, SearchTimeline, int]:
+        """Insert one shard of the train data, returns the count, the duration, the latencies, the timeline,
+        and the batch size"""
         count = 0
+        skip, pending = 0, 0
+        if self.checkpoint is not None:
+            self._shard, self._num_shards = shard, num_shards
+            self._row_group_sizes = self.dataset.row_group_sizes(shard, num_shards)
+            saved = self.checkpoint.read(shard, num_shards) if self.resume else {}
+            skip, pending = saved.get("count", 0), saved.get("pending", 0)
+            self._committed, self._last_id = skip, saved.get("last_id")
+            if not saved:
+                # the first batch is in flight before any save
+                self._save_checkpoint()
         with self.db.init():
-            log.info(f"({mp.current_process().name:16}) Start inserting embeddings in batch {config.NUM_PER_BATCH}")
+            log.info(f"({mp.current_process().name:16}) Start inserting embeddings of shard {shard}/{num_shards} in batch {self.batch_size}, skip {skip}")
             start = time.perf_counter()
-            for data_df in self.dataset:
-                all_metadata = data_df['id'].tolist()
-
-                emb_np = np.stack(data_df['emb'])
-                if self.normalize:
-                    log.debug("normalize the 100k train data")
-                    all_embeddings = (emb_np / np.linalg.norm(emb_np, axis=1)[:, np.newaxis]).tolist()
-                else:
-                    all_embeddings = emb_np.tolist()
-                del(emb_np)
-                log.debug(f"batch dataset size: {len(all_embeddings)}, {len(all_metadata)}")
-
-                insert_count, error = self.db.insert_embeddings(
-                    embeddings=all_embeddings,
-                    metadata=all_metadata,
-                )
-                if error is not None:
-                    raise error
-
-                assert insert_count == len(all_metadata)
+            self._load_start = start
+            if self.db.support_ndarray_insert():
+                dataset, prepare = self.dataset.iter_numpy(shard, num_shards, skip), self._prepare_ndarray
+            else:
+                dataset = self.dataset if num_shards == 1 and skip == 0 else self.dataset.iter_shard(shard, num_shards, skip)
+                prepare = self._prepare
+            # decode the next batches while inserting the current one
+            batches = _Rechunker(utils.prefetch(dataset, prepare, self.prefetch))
+            if pending > 0 and (batch := batches.take(pending)) is not None:
+                # the batch in flight when the resumed load stopped, replace the rows of it already committed
+                upsert = self.db.support_delete()
+                if not upsert:
+                    log.warning(f"({mp.current_process().name:16}) {len(batch[1])} rows in flight when the load stopped might be inserted twice")
+                count += self._insert_batch(*batch, upsert=upsert)
+            if self.batch_size_candidates:
+                count += self._tune_batch_size(batches)
+
+            while (batch := batches.take(self.batch_size)) is not None:
+                log.debug(f"batch dataset size: {len(batch[0])}, {len(batch[1])}")
+                insert_count = self._insert_batch(*batch)
                 count += insert_count
-                if count % 100_000 == 0:
+                if count // 100_000 > (count - insert_count) // 100_000:
                     log.info(f"({mp.current_process().name:16}) Loaded {count} embeddings into VectorDB")
 
-            log.info(f"({mp.current_process().name:16}) Finish loading all dataset into VectorDB, dur={time.perf_counter()-start}")
-            return count
+            dur = time.perf_counter() - start
+            log.info(f"({mp.current_process().name:16}) Finish loading shard {shard}/{num_shards} into VectorDB, count={count}, dur={dur}")
+            return count, dur, self.latencies, self.timeline, self.batch_size
+
+    def _insert_with_retry(self, embeddings: list[list[float]] | np.ndarray, metadata: list[int]) -> int:
+        """Insert one batch, retry the rest of it every WAITTING_TIME seconds on errors,
+        raise the error after LOAD_MAX_TRY_COUNT tries"""
+        retry_count = 0
+        already_insert_count = 0
+        while retry_count < LOAD_MAX_TRY_COUNT:
+            s = time.perf_counter()
+            insert_count, error = self.db.insert_embeddings(
+                embeddings=embeddings[already_insert_count :],
+                metadata=metadata[already_insert_count :],
+            )
+            already_insert_count += insert_count
+            if error is not None:
+                retry_count += 1
+                self.retry_count += 1
+                self.timeline.record_error(time.perf_counter() - self._load_start)
+                log.warning(f"Failed to insert data, try {retry_count} time in {WAITTING_TIME}s: {error}")
+                time.sleep(WAITTING_TIME)
+                if retry_count >= LOAD_MAX_TRY_COUNT:
+                    raise error
+            else:
+                self._record_insert(s, insert_count)
+                break
+
+        assert already_insert_count == len(metadata)
+        return already_insert_count
 
     def endless_insert_data(self, all_embeddings, all_metadata, left_id: int = 0) -> int:
         with self.db.init():
             # unique id for endlessness insertion
             all_metadata = [i+left_id for i in all_metadata]
 
-            NUM_BATCHES = math.ceil(len(all_embeddings)/NUM_PER_BATCH)
-            log.info(f"({mp.current_process().name:16}) Start inserting {len(all_embeddings)} embeddings in batch {NUM_PER_BATCH}")
+            batch_size = self.batch_size
+            NUM_BATCHES = math.ceil(len(all_embeddings)/batch_size)
+            log.info(f"({mp.current_process().name:16}) Start inserting {len(all_embeddings)} embeddings in batch {batch_size}")
             count = 0
             for batch_id in range(NUM_BATCHES):
-                retry_count = 0
-                already_insert_count = 0
-                metadata = all_metadata[batch_id*NUM_PER_BATCH : (batch_id+1)*NUM_PER_BATCH]
-                embeddings = all_embeddings[batch_id*NUM_PER_BATCH : (batch_id+1)*NUM_PER_BATCH]
+                metadata = all_metadata[batch_id*batch_size : (batch_id+1)*batch_size]
+                embeddings = all_embeddings[batch_id*batch_size : (batch_id+1)*batch_size]
 
                 log.debug(f"({mp.current_process().name:16}) batch [{batch_id:3}/{NUM_BATCHES}], Start inserting {len(metadata)} embeddings")
-                while retry_count < LOAD_MAX_TRY_COUNT:
-                    insert_count, error = self.db.insert_embeddings(
-                        embeddings=embeddings[already_insert_count :],
-                        metadata=metadata[already_insert_count :],
-                    )
-                    already_insert_count += insert_count
-                    if error is not None:
-                        retry_count += 1
-                        time.sleep(WAITTING_TIME)
-
-                        log.info(f"Failed to insert data, try {retry_count} time")
-                        if retry_count >= LOAD_MAX_TRY_COUNT:
-                            raise error
-                    else:
-                        break
+                count += self._insert_with_retry(embeddings, metadata)
                 log.debug(f"({mp.current_process().name:16}) batch [{batch_id:3}/{NUM_BATCHES}], Finish inserting {len(metadata)} embeddings")
-
-                assert already_insert_count == len(metadata)
-                count += already_insert_count
-            log.info(f"({mp.current_process().name:16}) Finish inserting {len(all_embeddings)} embeddings in batch {NUM_PER_BATCH}")
+            log.info(f"({mp.current_process().name:16}) Finish inserting {len(all_embeddings)} embeddings in batch {batch_size}")
         return count
 
+    def _num_writers(self) -> int:
+        if self.num_workers == 1:
+            return 1
+        num_row_groups = len(self.dataset.row_groups())
+        if num_row_groups < self.num_workers:
+            log.warning(f"Only {num_row_groups} row groups in the train files, insert with {num_row_groups} writers instead of {self.num_workers}")
+        return max(1, min(self.num_workers, num_row_groups))
+
     @utils.time_it
-    def _insert_all_batches(self) -> int:
+    def _insert_all_batches(self) -> list[tuple[int, float, LatencyHistogram, SearchTimeline, int]]:
         """Performance case only"""
-        with concurrent.futures.ProcessPoolExecutor(mp_context=mp.get_context('spawn'), max_workers=1) as executor:
-            future = executor.submit(self.task)
-            try:
-                count = future.result(timeout=self.timeout)
-            except TimeoutError as e:
-                msg = f"VectorDB load dataset timeout in {self.timeout}"
-                log.warning(msg)
+        num = self._num_writers()
+        with concurrent.futures.ProcessPoolExecutor(mp_context=mp.get_context('spawn'), max_workers=num) as executor:
+            futures = [executor.submit(self.task, shard, num) for shard in range(num)]
+            done, not_done = concurrent.futures.wait(futures, timeout=self.timeout, return_when=concurrent.futures.FIRST_EXCEPTION)
+            failed = [f for f in done if f.exception() is not None]
+            if failed or not_done:
                 for pid, _ in executor._processes.items():
                     psutil.Process(pid).kill()
-                raise PerformanceTimeoutError(msg) from e
-            except Exception as e:
+
+            if failed:
+                e = failed[0].exception()
                 log.warning(f"VectorDB load dataset error: {e}")
-                raise e from e
-            else:
-                return count
+                raise e
+            if not_done:
+                msg = f"VectorDB load dataset timeout in {self.timeout}"
+                log.warning(msg)
+                raise PerformanceTimeoutError(msg)
+            return [f.result() for f in futures]
 
     def run_endlessness(self) -> int:
         """run forever util DB raises exception or crash"""
@@ -125,6 +312,7 @@ class SerialInsertRunner:
         all_embeddings, all_metadata = np.stack(data_df["emb"]).tolist(), data_df['id'].tolist()
 
         start_time = time.perf_counter()
+        self._load_start = start_time
         max_load_count, times = 0, 0
         try:
             with self.db.init():
@@ -135,6 +323,7 @@ class SerialInsertRunner:
                 times += 1
                 log.info(f"Loaded {times} entire dataset, current max load counts={utils.numerize(max_load_count)}, {max_load_count}")
         except Exception as e:
+            self.duration = time.perf_counter() - start_time
             log.info(f"Capacity case load reach limit, insertion counts={utils.numerize(max_load_count)}, {max_load_count}, err={e}")
             traceback.print_exc()
             return max_load_count
@@ -144,10 +333,40 @@ class SerialInsertRunner:
             raise LoadTimeoutError(msg)
 
     def run(self) -> int:
-        count, dur = self._insert_all_batches()
+        if self.checkpoint is not None:
+            if self.resume:
+                num = self._num_writers()
+                self.checkpoint.check(num)
+                self.resumed_count = sum(self.checkpoint.count(shard, num) for shard in range(num))
+                log.info(f"Resume the load from {self.resumed_count} rows of checkpoint {self.checkpoint.path}")
+            else:
+                self.checkpoint.clear()
+
+        results, dur = self._insert_all_batches()
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        self.duration = dur
+        count = sum(r[0] for r in results)
+        self.writer_throughputs = [round(r[0] / r[1], 4) if r[1] > 0 else 0.0 for r in results]
+        self.writer_batch_sizes = [r[4] for r in results]
+        for _, _, latencies, timeline, _ in results:
+            self.latencies.merge(latencies)
+            self.timeline.merge(timeline)
+        log.info(
+            f"Inserted {count} embeddings with {len(results)} writers, dur={dur}, "
+            f"throughput={round(count / dur, 4)}, per writer={self.writer_throughputs}, batch sizes={self.writer_batch_sizes}"
+        )
         return count
 
 
+def save_result_ids(file: str, result_ids: np.ndarray, ground_truth: np.ndarray):
+    """Save the raw result ids of a serial search along with the ground truth,
+    to be rescored by metric.rescore_result_ids for other k."""
+    pathlib.Path(file).parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(file, result_ids=result_ids, ground_truth=ground_truth)
+    log.info(f"Saved result ids {result_ids.shape} of the serial search to {file}")
+
+
 class SerialSearchRunner:
     def __init__(
         self,
@@ -156,10 +375,12 @@ class SerialSearchRunner:
         ground_truth: pd.DataFrame,
         k: int = 100,
         filters: dict | None = None,
+        result_ids_file: str | None = None,
     ):
         self.db = db
         self.k = k
         self.filters = filters
+        self.result_ids_file = result_ids_file
 
         if isinstance(test_data[0], np.ndarray):
             self.test_data = [query.tolist() for query in test_data]
@@ -167,62 +388,77 @@ class SerialSearchRunner:
             self.test_data = test_data
         self.ground_truth = ground_truth
 
+    def _timing_pass(self, test_data: list[list[float]]) -> tuple[list[list[int]], LatencyHistogram]:
+        """Search every query once, keeping nothing but the result ids between the timed calls"""
+        latencies, results_list = LatencyHistogram(), []
+        for emb in test_data:
+            s = time.perf_counter()
+            try:
+                results = self.db.search_embedding(
+                    emb,
+                    self.k,
+                    self.filters,
+                )
+
+            except Exception as e:
+                log.warning(f"VectorDB search_embedding error: {e}")
+                traceback.print_exc(chain=True)
+                raise e from None
+
+            latency = time.perf_counter() - s
+            latencies.record(latency)
+            results_list.append(results)
+
+            if latencies.count % 100 == 0:
+                log.debug(f"({mp.current_process().name:14}) search_count={latencies.count:3}, latest_latency={latency}")
+        return results_list, latencies
+
     def search(self, args: tuple[list, pd.DataFrame]):
         log.info(f"{mp.current_process().name:14} start search the entire test_data to get recall and latency")
         with self.db.init():
             test_data, ground_truth = args
-            ideal_dcg = get_ideal_dcg(self.k)
 
             log.debug(f"test dataset size: {len(test_data)}")
             log.debug(f"ground truth size: {ground_truth.columns}, shape: {ground_truth.shape}")
 
-            latencies, recalls, ndcgs = [], [], []
-            for idx, emb in enumerate(test_data):
-                s = time.perf_counter()
-                try:
-                    results = self.db.search_embedding(
-                        emb,
-                        self.k,
-                        self.filters,
-                    )
-
-                except Exception as e:
-                    log.warning(f"VectorDB search_embedding error: {e}")
-                    traceback.print_exc(chain=True)
-                    raise e from None
-
-                latencies.append(time.perf_counter() - s)
-
-                gt = ground_truth['neighbors_id'][idx]
-                recalls.append(calc_recall(self.k, gt[:self.k], results))
-                ndcgs.append(calc_ndcg(gt[:self.k], results, ideal_dcg))
-
-
-                if len(latencies) % 100 == 0:
-                    log.debug(f"({mp.current_process().name:14}) search_count={len(latencies):3}, latest_latency={latencies[-1]}, latest recall={recalls[-1]}")
-
-        avg_latency = round(np.mean(latencies), 4)
-        avg_recall = round(np.mean(recalls), 4)
-        avg_ndcg = round(np.mean(ndcgs), 4)
-        cost = round(np.sum(latencies), 4)
-        p99 = round(np.percentile(latencies, 99), 4)
+            results_list, latencies = self._timing_pass(test_data)
+
+        # score all the queries at once after the timing pass
+        result_ids = to_id_matrix(results_list, self.k)
+        gt = ground_truth['neighbors_id'].to_list()
+        gt_ids = to_id_matrix(gt, max(len(row) for row in gt))
+        if self.result_ids_file:
+            save_result_ids(self.result_ids_file, result_ids, gt_ids)
+
+        recalls, ndcgs, mrrs = calc_search_metrics(result_ids, gt_ids, self.k)
+        avg_latency = round(latencies.mean, 4)
+        avg_recall = round(float(np.mean(recalls)), 4)
+        avg_ndcg = round(float(np.mean(ndcgs)), 4)
+        avg_mrr = round(float(np.mean(mrrs)), 4)
+        cost = round(latencies.total, 4)
+        p99 = round(latencies.percentile(99), 4)
         log.info(
             f"{mp.current_process().name:14} search entire test_data: "
             f"cost={cost}s, "
-            f"queries={len(latencies)}, "
+            f"queries={latencies.count}, "
             f"avg_recall={avg_recall}, "
-            f"avg_ndcg={avg_ndcg},"
+            f"avg_ndcg={avg_ndcg}, "
+            f"avg_mrr={avg_mrr}, "
             f"avg_latency={avg_latency}, "
             f"p99={p99}"
          )
-        return (avg_recall, avg_ndcg, p99)
+        return (avg_recall, avg_ndcg, avg_mrr, p99)
 
 
-    def _run_in_subprocess(self) -> tuple[float, float]:
+    def _run_in_subprocess(self) -> tuple[float, float, float, float]:
         with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
             future = executor.submit(self.search, (self.test_data, self.ground_truth))
             result = future.result()
             return result
 
-    def run(self) -> tuple[float, float]:
+    def run(self) -> tuple[float, float, float, float]:
+        """
+        Returns:
+            tuple[float, float, float, float]: avg recall, avg ndcg, avg mrr and latency p99
+        """
         return self._run_in_subprocess()
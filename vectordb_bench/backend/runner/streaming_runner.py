@@ -0,0 +1,232 @@
+import time
+import math
+import queue
+import logging
+import traceback
+import multiprocessing as mp
+from typing import Iterable
+
+import numpy as np
+
+from ..clients import api
+from ..dataset import DatasetManager
+from ..ground_truth import prefix_knn
+from ...metric import calc_search_metrics, to_id_matrix, LatencyHistogram
+from ...models import PerformanceTimeoutError
+from .. import utils
+from ... import config
+from .mp_runner import MultiProcessingSearchRunner
+from .serial_runner import SerialInsertRunner, _Rechunker
+
+log = logging.getLogger(__name__)
+
+
+class StreamingRunner:
+    """Search the collection while a writer process keeps inserting the train data at a fixed rate
+
+    The writer inserts the first initial_ratio of the train data as fast as it can, then waits for run()
+    and inserts the rest at insert_rate rows/s, with the retries of SerialInsertRunner. Every time
+    a ratio of search_stages of the train data is inserted, a serial pass searches every test query once,
+    then a concurrent search measures the qps and latency, with the writer still inserting.
+
+    The recall of every query of the serial pass is against the exact kNN among the rows inserted before
+    the query was sent, computed by ground_truth.prefix_knn once the writer is stopped.
+
+    Usage:
+        >>> runner.load()
+        >>> # optimize the initial rows
+        >>> rows, qps, p99, recalls = runner.run()
+        >>> runner.stop()
+    """
+    def __init__(
+        self,
+        db: api.VectorDB,
+        dataset: DatasetManager,
+        normalize: bool,
+        test_data: np.ndarray,
+        k: int = 100,
+        insert_rate: float = config.STREAMING_INSERT_RATE,
+        initial_ratio: float = config.STREAMING_INITIAL_RATIO,
+        search_stages: Iterable[float] = config.STREAMING_SEARCH_STAGES,
+        concurrency: int = config.STREAMING_SEARCH_CONCURRENCY,
+        duration: int = config.STREAMING_SEARCH_DURATION,
+        batch_size: int = config.NUM_PER_BATCH,
+        timeout: float | None = None,
+    ):
+        if insert_rate <= 0:
+            raise ValueError(f"insert_rate should be positive, got {insert_rate}")
+        if not 0 <= initial_ratio <= 1 or any(not 0 < ratio <= 1 for ratio in search_stages):
+            raise ValueError(f"Streaming ratios should be in (0, 1], got {initial_ratio}, {search_stages}")
+        self.db = db
+        self.dataset = dataset
+        self.normalize = normalize
+        self.test_data = test_data
+        self.k = k
+        self.insert_rate = insert_rate
+        self.initial_rows = round(initial_ratio * dataset.data.size)
+        self.search_stages = sorted(search_stages)
+        self.concurrency = concurrency
+        self.duration = duration
+        self.batch_size = batch_size
+        self.timeout = timeout if isinstance(timeout, (int, float)) else None
+
+        # insert latency of every batch and retries of the writer, and the rows/s after the initial load
+        self.latencies = LatencyHistogram()
+        self.retry_count = 0
+        self.actual_insert_rate = 0.0
+
+        # only set in the main process after load()
+        self._writer = None
+        self._messages: dict[str, tuple] = {}
+        self._deadline = math.inf
+
+    def _write(self, progress, go, stop, outbox):
+        """writer process, progress is the count of rows inserted, in the order of dataset.iter_numpy()"""
+        try:
+            inserter = SerialInsertRunner(self.db, self.dataset, self.normalize, batch_size=self.batch_size, batch_size_candidates=[])
+            ndarray = self.db.support_ndarray_insert()
+
+            def prepare(batch: tuple[np.ndarray, np.ndarray]) -> tuple[list[list[float]] | np.ndarray, list[int]]:
+                embeddings, ids = inserter._prepare_ndarray(batch)
+                return (embeddings if ndarray else embeddings.tolist()), ids
+
+            with self.db.init():
+                batches = _Rechunker(utils.prefetch(self.dataset.iter_numpy(), prepare, config.LOAD_PREFETCH_BATCHES))
+                count, start = 0, time.perf_counter()
+                while count < self.initial_rows and (batch := batches.take(min(self.batch_size, self.initial_rows - count))) is not None:
+                    count += inserter._insert_with_retry(*batch)
+                    progress.value = count
+                log.info(f"({mp.current_process().name:16}) Loaded the initial {count} embeddings, wait for the searches")
+                outbox.put(("loaded", count, time.perf_counter() - start))
+                go.wait()
+
+                # about one second of rows per insert, each one sent at its scheduled time
+                step = max(1, min(self.batch_size, round(self.insert_rate)))
+                streamed, start = 0, time.perf_counter()
+                while not stop.wait(max(0.0, start + streamed / self.insert_rate - time.perf_counter())):
+                    batch = batches.take(step)
+                    if batch is None:
+                        log.warning(f"({mp.current_process().name:16}) Run out of train data to insert after {count + streamed} rows")
+                        break
+                    streamed += inserter._insert_with_retry(*batch)
+                    progress.value = count + streamed
+                dur = time.perf_counter() - start
+            log.info(f"({mp.current_process().name:16}) Finish streaming {streamed} embeddings in {round(dur, 4)}s")
+            outbox.put(("done", streamed, dur, inserter.latencies, inserter.retry_count))
+        except Exception as e:
+            traceback.print_exc()
+            outbox.put(("error", f"{type(e).__name__}: {e}"))
+
+    def _poll(self, timeout: float = 1.0):
+        """wait for the next message of the writer, raise if the writer failed, exited or timed out"""
+        try:
+            status, *message = self._outbox.get(timeout=timeout)
+        except queue.Empty:
+            if not self._writer.is_alive():
+                raise RuntimeError(f"Streaming writer exited with code {self._writer.exitcode}") from None
+            if time.perf_counter() > self._deadline:
+                msg = f"VectorDB streaming insert timeout in {self.timeout}"
+                log.warning(msg)
+                raise PerformanceTimeoutError(msg) from None
+            return
+
+        if status == "error":
+            log.warning(f"VectorDB streaming insert error: {message[0]}")
+            raise RuntimeError(f"Streaming writer failed: {message[0]}")
+        self._messages[status] = tuple(message)
+
+    def load(self) -> float:
+        """Start the writer, returns the duration of the insert of the initial rows"""
+        ctx = mp.get_context("spawn")
+        progress, go, stop, outbox = ctx.Value("q", 0, lock=False), ctx.Event(), ctx.Event(), ctx.Queue()
+        writer = ctx.Process(target=self._write, args=(progress, go, stop, outbox), name="StreamingWriter", daemon=True)
+        writer.start()
+        self._writer, self._progress, self._go, self._stop, self._outbox = writer, progress, go, stop, outbox
+        if self.timeout is not None:
+            self._deadline = time.perf_counter() + self.timeout
+
+        while "loaded" not in self._messages:
+            self._poll()
+        count, dur = self._messages["loaded"]
+        log.info(f"Loaded the initial {count} embeddings before streaming, dur={round(dur, 4)}")
+        return dur
+
+    def _serial_pass(self, test_data: list[list[float]]) -> tuple[list[list[int]], list[int]]:
+        """Search every query once, returns the result ids, and the rows inserted before each query"""
+        results, prefixes = [], []
+        with self.db.init():
+            for emb in test_data:
+                prefixes.append(self._progress.value)
+                results.append(self.db.search_embedding(emb, self.k))
+        return results, prefixes
+
+    def _search_stage(self, test_data: list[list[float]]) -> tuple[list[list[int]], list[int], float, float]:
+        results, prefixes = self._serial_pass(test_data)
+        search_runner = MultiProcessingSearchRunner(
+            db=self.db,
+            test_data=self.test_data,
+            k=self.k,
+            concurrencies=[self.concurrency],
+            duration=self.duration,
+        )
+        qps, _, _, p99_list, *_ = search_runner.run()
+        return results, prefixes, qps, p99_list[0]
+
+    def run(self) -> tuple[list[int], list[float], list[float], list[float]]:
+        """Start streaming, search at every stage, then stop the writer and compute the recall
+
+        Returns:
+            tuple: rows inserted at the start of every stage, the qps and latency p99 of the concurrent search,
+            and the avg recall of the serial pass of every stage
+        """
+        test_data = [emb.tolist() for emb in self.test_data]
+        size = self.dataset.data.size
+        self._go.set()
+
+        rows_list, qps_list, p99_list, stage_results = [], [], [], []
+        for ratio in self.search_stages:
+            target = min(size, math.ceil(ratio * size))
+            while self._progress.value < target and "done" not in self._messages:
+                self._poll(timeout=0.1)
+            rows = self._progress.value
+            log.info(f"Streaming stage {ratio}: {rows} rows inserted, search with {self.concurrency} concurrency")
+            results, prefixes, qps, p99 = self._search_stage(test_data)
+            rows_list.append(rows)
+            qps_list.append(qps)
+            p99_list.append(p99)
+            stage_results.append((results, prefixes))
+
+        self._stop.set()
+        while "done" not in self._messages:
+            self._poll()
+        streamed, dur, self.latencies, self.retry_count = self._messages["done"]
+        self.actual_insert_rate = round(streamed / dur, 4) if dur > 0 else 0.0
+        log.info(f"Streamed {streamed} embeddings at {self.actual_insert_rate} rows/s, target {self.insert_rate} rows/s")
+
+        recall_list = self._calc_recalls(stage_results)
+        return rows_list, qps_list, p99_list, recall_list
+
+    def _calc_recalls(self, stage_results: list[tuple[list[list[int]], list[int]]]) -> list[float]:
+        """avg recall of every stage, against the kNN among the rows inserted before each query"""
+        nq = len(self.test_data)
+        query_idx = np.tile(np.arange(nq), len(stage_results))
+        prefix = np.concatenate([prefixes for _, prefixes in stage_results])
+        gt = prefix_knn(self.dataset.iter_numpy(), self.test_data, query_idx, prefix, self.k, self.dataset.data.metric_type)
+
+        recall_list = []
+        for i, (results, _) in enumerate(stage_results):
+            recalls, _, _ = calc_search_metrics(to_id_matrix(results, self.k), gt[i * nq : (i + 1) * nq], self.k)
+            recall_list.append(round(float(np.mean(recalls)), 4))
+        log.info(f"Recall of every streaming stage: {recall_list}")
+        return recall_list
+
+    def stop(self):
+        if self._writer is None:
+            return
+        self._stop.set()
+        self._go.set()
+        self._writer.join(timeout=10)
+        if self._writer.is_alive():
+            self._writer.kill()
+            self._writer.join()
+        self._writer = None
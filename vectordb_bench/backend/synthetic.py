@@ -0,0 +1,109 @@
+"""Deterministic synthetic datasets, generated from a seed into the layout of the published ones instead of downloaded
+
+The vectors are a mixture of num_clusters gaussians in a random intrinsic_dim dimensional subspace of the dim
+dimensional space, with a little isotropic noise around it, scaled to lognormal norms of sigma norm_sigma,
+unit norms for 0. Every block of BLOCK_ROWS rows is drawn by a generator seeded with (seed, stream, block),
+so any range of rows is the same whatever the files and row groups it's written into.
+
+Usage:
+    >>> generate(dataset.data, dataset.data_dir, ["train-00-of-10.parquet", "test.parquet"])
+"""
+
+import logging
+import pathlib
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .. import config
+from . import utils
+
+log = logging.getLogger(__name__)
+
+BLOCK_ROWS = 10_000
+# stddev of the clusters around their centers, of standard normal coordinates in the subspace
+CLUSTER_SPREAD = 0.3
+# stddev of the noise off the subspace, in every dimension
+AMBIENT_NOISE = 0.01
+
+TRAIN_STREAM, TEST_STREAM = 0, 1
+
+SCHEMA = pa.schema([("id", pa.int64()), ("emb", pa.list_(pa.float32()))])
+
+
+class SyntheticGenerator:
+    """Rows of a synthetic dataset, see the module doc
+
+    Args:
+        data: the Synthetic dataset, for its dim, seed, num_clusters, intrinsic_dim and norm_sigma
+    """
+    def __init__(self, data):
+        self.dim = data.dim
+        self.seed = data.seed
+        self.norm_sigma = data.norm_sigma
+        intrinsic_dim = min(data.intrinsic_dim, data.dim)
+
+        rng = np.random.default_rng([self.seed, 2])
+        # orthonormal rows spanning the subspace
+        self.basis = np.linalg.qr(rng.standard_normal((data.dim, intrinsic_dim)))[0].T.astype(np.float32)
+        self.centers = rng.standard_normal((data.num_clusters, intrinsic_dim), dtype=np.float32)
+
+    def _block(self, stream: int, block: int) -> np.ndarray:
+        rng = np.random.default_rng([self.seed, stream, block])
+        clusters = rng.integers(len(self.centers), size=BLOCK_ROWS)
+        latent = self.centers[clusters] + CLUSTER_SPREAD * rng.standard_normal((BLOCK_ROWS, self.basis.shape[0]), dtype=np.float32)
+        vectors = latent @ self.basis + AMBIENT_NOISE * rng.standard_normal((BLOCK_ROWS, self.dim), dtype=np.float32)
+
+        norms = np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+        vectors /= np.where(norms == 0, 1, norms)
+        if self.norm_sigma > 0:
+            vectors *= rng.lognormal(0.0, self.norm_sigma, size=(BLOCK_ROWS, 1)).astype(np.float32)
+        return vectors
+
+    def rows(self, stream: int, start: int, end: int) -> np.ndarray:
+        """float32 (end - start) x dim vectors of the rows [start, end) of stream"""
+        first, last = start // BLOCK_ROWS, (end - 1) // BLOCK_ROWS
+        vectors = np.concatenate([self._block(stream, b) for b in range(first, last + 1)])
+        offset = first * BLOCK_ROWS
+        return vectors[start - offset : end - offset]
+
+
+def _write(path: pathlib.Path, generator: SyntheticGenerator, stream: int, start: int, end: int, row_group_size: int):
+    """write the rows [start, end) of stream into path, one row group in memory at a time"""
+    tmp = path.with_name(f"{path.name}.tmp")
+    with pq.ParquetWriter(tmp, SCHEMA) as writer:
+        for s in range(start, end, row_group_size):
+            e = min(s + row_group_size, end)
+            vectors = generator.rows(stream, s, e)
+            offsets = pa.array(np.arange(0, (e - s + 1) * generator.dim, generator.dim), type=pa.int32())
+            emb = pa.ListArray.from_arrays(offsets, pa.array(vectors.reshape(-1)))
+            writer.write_table(pa.Table.from_arrays([pa.array(np.arange(s, e), type=pa.int64()), emb], schema=SCHEMA))
+    tmp.replace(path)
+    log.info(f"Generated {end - start} rows of {path.name} into {path}")
+
+
+def generate(data, data_dir: pathlib.Path, files: list[str], row_group_size: int = config.SYNTHETIC_ROW_GROUP_SIZE):
+    """Generate the train files and test.parquet of the Synthetic dataset data missing in data_dir
+
+    The train ids are 0..size-1, split between the files in the order of utils.compose_train_files, rows_per_file
+    rows per file; the test ids are 0..test_size-1, the queries drawn from the same mixture as the train data.
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    missing = [f for f in files if not data_dir.joinpath(f).exists()]
+    if not missing:
+        return
+    log.info(f"Generate the synthetic dataset {data.dir_name}, {len(missing)} files missing: {missing}")
+
+    generator = SyntheticGenerator(data)
+    train_files = utils.compose_train_files(data.file_count, data.use_shuffled)
+    for file_name in missing:
+        if file_name == "test.parquet":
+            _write(data_dir.joinpath(file_name), generator, TEST_STREAM, 0, data.test_size, row_group_size)
+        elif file_name in train_files:
+            i = train_files.index(file_name)
+            start = i * data.rows_per_file
+            end = min(start + data.rows_per_file, data.size)
+            _write(data_dir.joinpath(file_name), generator, TRAIN_STREAM, start, end, row_group_size)
+        else:
+            raise ValueError(f"{file_name} is not a file of the synthetic dataset {data.dir_name}")
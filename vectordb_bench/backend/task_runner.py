@@ -1,22 +1,28 @@
 import logging
+import time
 import psutil
 import traceback
 import concurrent
+import uuid
+import hashlib
 import numpy as np
+import pandas as pd
 from enum import Enum, auto
 
 from . import utils
 from .cases import Case, CaseLabel
 from ..base import BaseModel
 from ..models import TaskConfig, PerformanceTimeoutError, TaskStage
+from .. import config
 
 from .clients import (
     api,
     MetricType
 )
 from ..metric import Metric
-from .runner import MultiProcessingSearchRunner
-from .runner import SerialSearchRunner, SerialInsertRunner
+from .runner import MultiProcessingSearchRunner, AsyncSearchRunner
+from .runner import SerialSearchRunner, SerialInsertRunner, BatchSearchRunner, StreamingRunner, ChurnRunner, CapacityRunner
+from .runner.load_checkpoint import LoadCheckpoint
 from .data_source  import DatasetSource
 
 
@@ -48,8 +54,9 @@ class CaseRunner(BaseModel):
     dataset_source: DatasetSource
 
     db: api.VectorDB | None = None
-    test_emb: list[list[float]] | None = None
+    test_emb: np.ndarray | None = None
     serial_search_runner: SerialSearchRunner | None = None
+    batch_search_runner: BatchSearchRunner | None = None
     search_runner: MultiProcessingSearchRunner | None = None
     final_search_runner: MultiProcessingSearchRunner | None = None
 
@@ -99,12 +106,19 @@ class CaseRunner(BaseModel):
     def run(self, drop_old: bool = True) -> Metric:
         log.info("Starting run")
 
+        if self.ca.label in (CaseLabel.Streaming, CaseLabel.Churn) and not drop_old:
+            log.warning(f"{self.ca.label.name} case always inserts into a new collection, drop the old one")
+            drop_old = True
         self._pre_run(drop_old)
 
         if self.ca.label == CaseLabel.Load:
             return self._run_capacity_case()
         elif self.ca.label == CaseLabel.Performance:
             return self._run_perf_case(drop_old)
+        elif self.ca.label == CaseLabel.Streaming:
+            return self._run_streaming_case()
+        elif self.ca.label == CaseLabel.Churn:
+            return self._run_churn_case()
         else:
             msg = f"unknown case type: {self.ca.label}"
             log.warning(msg)
@@ -118,11 +132,23 @@ class CaseRunner(BaseModel):
         """
         assert self.db is not None
         log.info("Start capacity case")
+        capacity_config = self.config.case_config.capacity_config
         try:
-            runner = SerialInsertRunner(
-                self.db, self.ca.dataset, self.normalize, self.ca.load_timeout
-            )
-            count = runner.run_endlessness()
+            if capacity_config.adaptive:
+                runner = CapacityRunner(
+                    self.db, self.ca.dataset, self.normalize, self.ca.load_timeout,
+                    num_writers=capacity_config.num_writers,
+                    memory_threshold=capacity_config.memory_threshold,
+                    latency_threshold=capacity_config.latency_threshold,
+                    batch_size=self.config.case_config.load_config.insert_batch_size,
+                )
+                count = runner.run()
+            else:
+                runner = SerialInsertRunner(
+                    self.db, self.ca.dataset, self.normalize, self.ca.load_timeout,
+                    batch_size=self.config.case_config.load_config.insert_batch_size,
+                )
+                count = runner.run_endlessness()
         except Exception as e:
             log.warning(f"Failed to run capacity case, reason = {e}")
             raise e from None
@@ -130,7 +156,17 @@ class CaseRunner(BaseModel):
             log.info(
                 f"Capacity case loading dataset reaches VectorDB's limit: max capacity = {count}"
             )
-            return Metric(max_load_count=count)
+            m = Metric(max_load_count=count)
+            if capacity_config.adaptive:
+                m.capacity_stop_reason, m.capacity_memory_timeline = runner.stop_reason, runner.memory_timeline
+            (
+                m.insert_latency_p50,
+                m.insert_latency_p99,
+                m.insert_latency_max,
+                m.insert_retry_count,
+                m.insert_timeline,
+            ) = self._insert_metrics(runner)
+            return m
 
     def _run_perf_case(self, drop_old: bool = True) -> Metric:
         """run performance cases
@@ -158,11 +194,24 @@ class CaseRunner(BaseModel):
         log.info("Start performance case")
         try:
             m = Metric()
-            if drop_old:
+            resume = self._resume_load(drop_old)
+            if drop_old or resume:
                 if TaskStage.LOAD in self.config.stages:
                     # self._load_train_data()
-                    _, load_dur = self._load_train_data()
-                    build_dur = self._optimize()
+                    insert_results, load_dur = self._load_train_data(resume)
+                    (
+                        m.insert_throughput_list,
+                        m.insert_batch_size_list,
+                        m.insert_resumed_count,
+                        m.insert_latency_p50,
+                        m.insert_latency_p99,
+                        m.insert_latency_max,
+                        m.insert_retry_count,
+                        m.insert_timeline,
+                    ) = insert_results
+                    build_dur, m.optimize_timeline = self._optimize()
+                    m.insert_duration = round(load_dur, 4)
+                    m.optimize_duration = round(build_dur, 4)
                     m.load_duration = round(load_dur + build_dur, 4)
                     log.info(
                         f"Finish loading the entire dataset into VectorDB,"
@@ -174,6 +223,7 @@ class CaseRunner(BaseModel):
             if (
                 TaskStage.SEARCH_SERIAL in self.config.stages
                 or TaskStage.SEARCH_CONCURRENT in self.config.stages
+                or TaskStage.SEARCH_BATCH in self.config.stages
             ):
                 self._init_search_runner()
                 if TaskStage.SEARCH_SERIAL in self.config.stages:
@@ -182,10 +232,40 @@ class CaseRunner(BaseModel):
                     m.recall = search_results.recall
                     m.serial_latencies = search_results.serial_latencies
                     '''
-                    m.recall, m.ndcg, m.serial_latency_p99 = search_results
+                    m.recall, m.ndcg, m.mrr, m.serial_latency_p99 = search_results
+                    m.serial_result_ids_file = self.serial_search_runner.result_ids_file or ""
                 if TaskStage.SEARCH_CONCURRENT in self.config.stages:
                     search_results = self._conc_search()
-                    m.qps, m.conc_num_list, m.conc_qps_list, m.conc_latency_p99_list, m.conc_latency_mean_list = search_results
+                    (
+                        m.qps,
+                        m.conc_num_list,
+                        m.conc_qps_list,
+                        m.conc_latency_p99_list,
+                        m.conc_latency_mean_list,
+                        m.conc_latency_p50_list,
+                        m.conc_latency_p90_list,
+                        m.conc_latency_p999_list,
+                        m.conc_latency_max_list,
+                        m.conc_timeline_list,
+                    ) = search_results
+                    if self.config.case_config.concurrency_search_config.rate_list:
+                        (
+                            m.rate_offered_list,
+                            m.rate_achieved_list,
+                            m.rate_dropped_list,
+                            m.rate_latency_p50_list,
+                            m.rate_latency_p95_list,
+                            m.rate_latency_p99_list,
+                            m.rate_latency_p999_list,
+                        ) = self._rate_search()
+                if TaskStage.SEARCH_BATCH in self.config.stages:
+                    (
+                        m.batch_size_list,
+                        m.batch_qps_list,
+                        m.batch_latency_p50_list,
+                        m.batch_latency_p99_list,
+                        m.batch_recall_list,
+                    ) = self._batch_search()
             
         except Exception as e:
             log.warning(f"Failed to run performance case, reason = {e}")
@@ -195,23 +275,180 @@ class CaseRunner(BaseModel):
             log.info(f"Performance case got result: {m}")
             return m
 
+    def _run_streaming_case(self) -> Metric:
+        """run streaming cases
+
+        Returns:
+            Metric: load_duration of the initial rows, and the rows, qps, latency p99 and recall of every search stage
+        """
+        log.info("Start streaming case")
+        streaming_config = self.config.case_config.streaming_config
+        self._init_test_emb()
+        runner = StreamingRunner(
+            self.db, self.ca.dataset, self.normalize, self.test_emb,
+            k=self.config.case_config.k,
+            insert_rate=streaming_config.insert_rate,
+            initial_ratio=streaming_config.initial_ratio,
+            search_stages=streaming_config.search_stages,
+            concurrency=streaming_config.concurrency,
+            duration=streaming_config.duration,
+            batch_size=self.config.case_config.load_config.insert_batch_size,
+            timeout=self.ca.load_timeout,
+        )
+        try:
+            m = Metric()
+            load_dur = runner.load()
+            build_dur, m.optimize_timeline = self._optimize()
+            m.insert_duration = round(load_dur, 4)
+            m.optimize_duration = round(build_dur, 4)
+            m.load_duration = round(load_dur + build_dur, 4)
+            (
+                m.streaming_rows_list,
+                m.streaming_qps_list,
+                m.streaming_latency_p99_list,
+                m.streaming_recall_list,
+            ) = runner.run()
+            m.streaming_insert_rate = runner.actual_insert_rate
+            m.insert_latency_p50, m.insert_latency_p99 = runner.latencies.percentiles([50, 99])
+            m.insert_latency_max = runner.latencies.max
+            m.insert_retry_count = runner.retry_count
+        except Exception as e:
+            log.warning(f"Failed to run streaming case, reason = {e}")
+            traceback.print_exc()
+            raise e from None
+        else:
+            log.info(f"Streaming case got result: {m}")
+            return m
+        finally:
+            runner.stop()
+
+    def _run_churn_case(self) -> Metric:
+        """run churn cases, load and optimize the dataset, delete and upsert a part of it, then search
+
+        Returns:
+            Metric: load_duration, the delete and upsert counts and durations, and the search metrics after them
+        """
+        log.info("Start churn case")
+        churn_config = self.config.case_config.churn_config
+        try:
+            m = Metric()
+            insert_results, load_dur = self._load_train_data()
+            (
+                m.insert_throughput_list,
+                m.insert_batch_size_list,
+                m.insert_resumed_count,
+                m.insert_latency_p50,
+                m.insert_latency_p99,
+                m.insert_latency_max,
+                m.insert_retry_count,
+                m.insert_timeline,
+            ) = insert_results
+            build_dur, m.optimize_timeline = self._optimize()
+            m.insert_duration = round(load_dur, 4)
+            m.optimize_duration = round(build_dur, 4)
+            m.load_duration = round(load_dur + build_dur, 4)
+
+            runner = ChurnRunner(
+                self.db, self.ca.dataset, self.normalize,
+                delete_ratio=churn_config.delete_ratio,
+                reinsert_ratio=churn_config.reinsert_ratio,
+                batch_size=self.config.case_config.load_config.insert_batch_size,
+            )
+            (
+                m.churn_delete_count,
+                m.churn_delete_duration,
+                m.churn_upsert_count,
+                m.churn_upsert_duration,
+            ) = runner.run()
+
+            self._init_test_emb()
+            self._init_search_runner(ground_truth=runner.ground_truth(self.test_emb, self.config.case_config.k))
+            if TaskStage.SEARCH_SERIAL in self.config.stages:
+                m.recall, m.ndcg, m.mrr, m.serial_latency_p99 = self._serial_search()
+            if TaskStage.SEARCH_CONCURRENT in self.config.stages:
+                (
+                    m.qps,
+                    m.conc_num_list,
+                    m.conc_qps_list,
+                    m.conc_latency_p99_list,
+                    m.conc_latency_mean_list,
+                    m.conc_latency_p50_list,
+                    m.conc_latency_p90_list,
+                    m.conc_latency_p999_list,
+                    m.conc_latency_max_list,
+                    m.conc_timeline_list,
+                ) = self._conc_search()
+        except Exception as e:
+            log.warning(f"Failed to run churn case, reason = {e}")
+            traceback.print_exc()
+            raise e from None
+        else:
+            log.info(f"Churn case got result: {m}")
+            return m
+
+    def _load_checkpoint(self) -> LoadCheckpoint | None:
+        """checkpoint of the load of this db, db config, index config and dataset, None if disabled"""
+        if not config.LOAD_CHECKPOINT:
+            return None
+        key = f"{self.config.db_config.to_dict()}-{self.config.db_case_config}-{self.ca.dataset.data.dir_name}"
+        digest = hashlib.md5(key.encode()).hexdigest()[:8]
+        return LoadCheckpoint(config.LOAD_CHECKPOINT_DIR.joinpath(f"{self.config.db_name}-{self.ca.case_id.name}-{digest}"))
+
+    def _resume_load(self, drop_old: bool) -> bool:
+        """Wheather to resume the failed load of the existing collection"""
+        if drop_old or TaskStage.LOAD not in self.config.stages:
+            return False
+        checkpoint = self._load_checkpoint()
+        if checkpoint is None:
+            log.info("LOAD_CHECKPOINT is disabled, no load checkpoint to resume")
+            return False
+        if not checkpoint.exists():
+            log.info("No load checkpoint of this case to resume")
+            return False
+        return True
+
     @utils.time_it
-    def _load_train_data(self):
-        """Insert train data and get the insert_duration"""
+    def _load_train_data(self, resume: bool = False) -> tuple[list[float], list[int], int, float, float, float, int, dict]:
+        """Insert train data and get the insert_duration, the rest of it after the checkpoint if resume
+
+        Returns:
+            tuple: rows/s and insert batch size of each writer, the rows skipped by the resumed load,
+                and the insert metrics of _insert_metrics
+        """
+        load_config = self.config.case_config.load_config
         try:
-            runner = SerialInsertRunner(self.db, self.ca.dataset, self.normalize, self.ca.load_timeout)
+            runner = SerialInsertRunner(
+                self.db, self.ca.dataset, self.normalize, self.ca.load_timeout,
+                num_workers=load_config.num_insert_workers,
+                batch_size=load_config.insert_batch_size,
+                batch_size_candidates=load_config.insert_batch_size_candidates,
+                checkpoint=self._load_checkpoint(),
+                resume=resume,
+            )
             runner.run()
+            return (
+                runner.writer_throughputs,
+                runner.writer_batch_sizes,
+                runner.resumed_count,
+                *self._insert_metrics(runner),
+            )
         except Exception as e:
             raise e from None
         finally:
             runner = None
 
-    def _serial_search(self) -> tuple[float, float]:
+    @staticmethod
+    def _insert_metrics(runner: SerialInsertRunner | CapacityRunner) -> tuple[float, float, float, int, dict]:
+        """insert latency p50, p99, max of one batch, the retries, and the rows/s timeline"""
+        p50, p99 = runner.latencies.percentiles([50, 99])
+        return p50, p99, runner.latencies.max, runner.retry_count, runner.timeline.to_dict(runner.duration)
+
+    def _serial_search(self) -> tuple[float, float, float, float]:
         """Performance serial tests, search the entire test data once,
-        calculate the recall, serial_latency_p99
+        calculate the recall, ndcg, mrr, serial_latency_p99
 
         Returns:
-            tuple[float, float]: recall, serial_latency_p99
+            tuple[float, float, float, float]: recall, ndcg, mrr, serial_latency_p99
         """
         try:
             return self.serial_search_runner.run()
@@ -235,16 +472,52 @@ class CaseRunner(BaseModel):
         finally:
             self.stop()
 
+    def _rate_search(self):
+        """Performance open-loop tests, search the test data at every target rate
+        for 30s and measure the latency from the intended send time
+
+        Returns:
+            tuple: offered qps, achieved qps, dropped queries, latency p50, p95, p99 and p999 of each target rate
+        """
+        try:
+            return self.search_runner.run_by_rate()
+        except Exception as e:
+            log.warning(f"search error: {str(e)}, {e}")
+            raise e from None
+        finally:
+            self.stop()
+
+    def _batch_search(self):
+        """Performance batched search tests, search the test data in requests of
+        every batch size for 30s in one client
+
+        Returns:
+            tuple: batch sizes, qps, latency p50 and p99 of one request, and avg recall of each batch size
+        """
+        try:
+            return self.batch_search_runner.run()
+        except Exception as e:
+            log.warning(f"search error: {str(e)}, {e}")
+            raise e from None
+
     @utils.time_it
     def _task(self) -> None:
         with self.db.init():
             self.db.optimize()
 
-    def _optimize(self) -> float:
+    def _optimize(self) -> tuple[float, dict]:
+        """Returns the optimize duration, and the progress of the index build over time if the db reports it"""
+        timeline = {"time": [], "progress": []}
+        start = time.perf_counter()
         with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
             future = executor.submit(self._task)
             try:
-                return future.result(timeout=self.ca.optimize_timeout)[1]
+                if self.db.support_optimize_progress():
+                    self._poll_optimize_progress(future, start, timeline)
+                timeout = self.ca.optimize_timeout
+                if timeout is not None:
+                    timeout = max(0, timeout - (time.perf_counter() - start))
+                return future.result(timeout=timeout)[1], timeline
             except TimeoutError as e:
                 log.warning(f"VectorDB optimize timeout in {self.ca.optimize_timeout}")
                 for pid, _ in executor._processes.items():
@@ -254,30 +527,84 @@ class CaseRunner(BaseModel):
                 log.warning(f"VectorDB optimize error: {e}")
                 raise e from None
 
-    def _init_search_runner(self):
+    def _poll_optimize_progress(self, future: concurrent.futures.Future, start: float, timeline: dict):
+        """Record the progress of the index build every OPTIMIZE_PROGRESS_INTERVAL seconds, until the optimize
+        is done or timeout, with another connection than the optimize process."""
+        timeout = self.ca.optimize_timeout
+        try:
+            with self.db.init():
+                while not future.done():
+                    concurrent.futures.wait([future], timeout=config.OPTIMIZE_PROGRESS_INTERVAL)
+                    elapsed = time.perf_counter() - start
+                    if future.done() or (timeout is not None and elapsed >= timeout):
+                        return
+                    progress = self.db.optimize_progress()
+                    if progress is not None:
+                        log.info(f"Optimize progress {progress:.2%} after {elapsed:.1f}s")
+                        timeline["time"].append(round(elapsed, 4))
+                        timeline["progress"].append(round(progress, 4))
+        except Exception as e:
+            log.warning(f"Failed to poll the optimize progress, keep waiting for the optimize: {e}")
+
+    def _init_test_emb(self):
         test_emb = np.stack(self.ca.dataset.test_data["emb"])
         if self.normalize:
             test_emb = test_emb / np.linalg.norm(test_emb, axis=1)[:, np.newaxis]
-        self.test_emb = test_emb.tolist()
+        # kept as ndarray, search runners convert it into the clients' format
+        self.test_emb = test_emb
+
+    def _init_search_runner(self, ground_truth: pd.DataFrame | None = None):
+        """ground_truth of the test data, default to the one of the dataset"""
+        if self.test_emb is None:
+            self._init_test_emb()
 
-        gt_df = self.ca.dataset.gt_data
+        gt_df = ground_truth if ground_truth is not None else self.ca.dataset.gt_data
 
         if TaskStage.SEARCH_SERIAL in self.config.stages:
+            result_ids_file = None
+            if self.config.case_config.save_result_ids:
+                result_ids_file = str(config.SEARCH_RESULT_IDS_DIR.joinpath(
+                    self.run_id,
+                    f"{self.config.db.value}-{self.ca.case_id.name}-{uuid.uuid4().hex[:8]}.npz",
+                ))
             self.serial_search_runner = SerialSearchRunner(
                 db=self.db,
                 test_data=self.test_emb,
                 ground_truth=gt_df,
                 filters=self.ca.filters,
                 k=self.config.case_config.k,
+                result_ids_file=result_ids_file,
+            )
+        if TaskStage.SEARCH_BATCH in self.config.stages:
+            self.batch_search_runner = BatchSearchRunner(
+                db=self.db,
+                test_data=self.test_emb,
+                ground_truth=gt_df,
+                filters=self.ca.filters,
+                k=self.config.case_config.k,
+                batch_sizes=self.config.case_config.batch_search_config.batch_sizes,
+                duration=self.config.case_config.batch_search_config.duration,
             )
         if TaskStage.SEARCH_CONCURRENT in self.config.stages:
-            self.search_runner = MultiProcessingSearchRunner(
+            search_config = self.config.case_config.concurrency_search_config
+            kwargs = {}
+            runner_cls = MultiProcessingSearchRunner
+            if search_config.num_event_loops > 0:
+                runner_cls = AsyncSearchRunner
+                kwargs["num_event_loops"] = search_config.num_event_loops
+
+            self.search_runner = runner_cls(
                 db=self.db,
                 test_data=self.test_emb,
                 filters=self.ca.filters,
-                concurrencies=self.config.case_config.concurrency_search_config.num_concurrency,
-                duration=self.config.case_config.concurrency_search_config.concurrency_duration,
+                concurrencies=search_config.num_concurrency,
+                duration=search_config.concurrency_duration,
+                rates=search_config.rate_list,
+                arrival=search_config.rate_arrival,
+                warmup=search_config.warmup_duration,
+                steady_state=search_config.steady_state,
                 k=self.config.case_config.k,
+                **kwargs,
             )
 
     def stop(self):
@@ -1,5 +1,11 @@
+import queue
+import threading
 import time
 from functools import wraps
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def numerize(n) -> str:
@@ -34,6 +40,59 @@ def numerize(n) -> str:
     return f"{display_n}{sufix}"
 
 
+def prefetch(items: Iterable[T], func: Callable[[T], R], size: int) -> Iterator[R]:
+    """Yields func(item) of every item, prepared by a background thread up to size items ahead.
+
+    Exceptions of the background thread are raised in the consumer. size 0 prepares
+    every item in the consumer instead.
+
+    Examples:
+        >>> for rows in prefetch(dataset, prepare, 2):
+        >>>    insert(rows)
+    """
+    if size <= 0:
+        yield from map(func, items)
+        return
+
+    done = object()
+    buffer = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((func(item), None)):
+                    return
+        except BaseException as e:
+            put((None, e))
+        else:
+            put((done, None))
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            result, error = buffer.get()
+            if error is not None:
+                raise error
+            if result is done:
+                return
+            yield result
+    finally:
+        # unblock the producer when the consumer stops early
+        stopped.set()
+        producer.join()
+
+
 def time_it(func):
     @wraps(func)
     def inner(*args, **kwargs):
@@ -61,6 +120,10 @@ def compose_train_files(train_count: int, use_shuffled: bool) -> list[str]:
     return train_files
 
 
+# ground truth files published along with the datasets, the ones of the other filters are built locally
+PUBLISHED_GT_FILES = ["neighbors.parquet", "neighbors_head_1p.parquet", "neighbors_tail_1p.parquet"]
+
+
 def compose_gt_file(filters: int | float | str | None = None) -> str:
     if filters is None:
         return "neighbors.parquet"
@@ -71,4 +134,7 @@ def compose_gt_file(filters: int | float | str | None = None) -> str:
     if filters == 0.99:
         return "neighbors_tail_1p.parquet"
 
+    if isinstance(filters, float) and 0 < filters < 1:
+        return f"neighbors_filter_{filters:g}.parquet"
+
     raise ValueError(f"Filters not supported: {filters}")
@@ -21,11 +21,18 @@ import click
 from vectordb_bench.backend.clients.api import MetricType
 from .. import config
 from ..backend.clients import DB
+from ..backend.data_source import DatasetSource
 from ..interface import benchMarkRunner, global_result_future
+from ..metric import rescore_result_ids
 from ..models import (
     CaseConfig,
     CaseType,
     ConcurrencySearchConfig,
+    BatchSearchConfig,
+    LoadConfig,
+    StreamingConfig,
+    ChurnConfig,
+    CapacityConfig,
     DBCaseConfig,
     DBConfig,
     TaskConfig,
@@ -132,9 +139,16 @@ def parse_task_stages(
     load: bool,
     search_serial: bool,
     search_concurrent: bool,
+    search_batch: bool = False,
+    resume_load: bool = False,
 ) -> List[TaskStage]:
     stages = []
-    if load and not drop_old:
+    if resume_load and not load:
+        raise RuntimeError("Load cannot be skipped if resuming it")
+    if resume_load:
+        # load the rest of the collection of the checkpoint, without dropping it
+        drop_old = False
+    elif load and not drop_old:
         raise RuntimeError("Dropping old data cannot be skipped if loading data")
     elif drop_old and not load:
         raise RuntimeError("Load cannot be skipped if dropping old data")
@@ -146,6 +160,8 @@ def parse_task_stages(
         stages.append(TaskStage.SEARCH_SERIAL)
     if search_concurrent:
         stages.append(TaskStage.SEARCH_CONCURRENT)
+    if search_batch:
+        stages.append(TaskStage.SEARCH_BATCH)
     return stages
 
 
@@ -213,6 +229,17 @@ class CommonTypedDict(TypedDict):
             show_default=True,
         ),
     ]
+    resume_load: Annotated[
+        bool,
+        click.option(
+            "--resume-load/--no-resume-load",
+            type=bool,
+            default=False,
+            help="Keep the existing collection and resume its failed load from the checkpoint in LOAD_CHECKPOINT_DIR, "
+            "saved by the loads with LOAD_CHECKPOINT enabled",
+            show_default=True,
+        ),
+    ]
     search_serial: Annotated[
         bool,
         click.option(
@@ -233,6 +260,26 @@ class CommonTypedDict(TypedDict):
             show_default=True,
         ),
     ]
+    search_batch: Annotated[
+        bool,
+        click.option(
+            "--search-batch/--skip-search-batch",
+            type=bool,
+            default=False,
+            help="Search in batches of multiple queries or skip",
+            show_default=True,
+        ),
+    ]
+    save_result_ids: Annotated[
+        bool,
+        click.option(
+            "--save-result-ids/--no-save-result-ids",
+            type=bool,
+            default=config.SAVE_SEARCH_RESULT_IDS,
+            help="Save the result ids of the serial search into SEARCH_RESULT_IDS_DIR, for the rescore command",
+            show_default=True,
+        ),
+    ]
     case_type: Annotated[
         str,
         click.option(
@@ -243,6 +290,16 @@ class CommonTypedDict(TypedDict):
             help="Case type",
         ),
     ]
+    dataset_source: Annotated[
+        str,
+        click.option(
+            "--dataset-source",
+            type=click.Choice([source.value for source in DatasetSource]),
+            help="Source of the datasets, LocalFS reads DATASET_LOCAL_SOURCE_DIR and HTTP DATASET_HTTP_MIRROR_URL",
+            show_default=True,
+            default=DatasetSource.S3.value,
+        ),
+    ]
     db_label: Annotated[
         str,
         click.option(
@@ -292,6 +349,204 @@ class CommonTypedDict(TypedDict):
             callback=lambda *args: list(map(int, click_arg_split(*args))),
         ),
     ]
+    search_rate: Annotated[
+        List[str],
+        click.option(
+            "--search-rate",
+            type=str,
+            help="Comma-separated list of target qps to test during open-loop concurrent search, empty to skip",
+            show_default=True,
+            default=",".join(map(str, config.SEARCH_RATE_LIST)),
+            callback=lambda *args: list(map(float, click_arg_split(*args))),
+        ),
+    ]
+    search_rate_arrival: Annotated[
+        str,
+        click.option(
+            "--search-rate-arrival",
+            type=click.Choice(["constant", "poisson"]),
+            help="Arrivals of the open-loop concurrent search",
+            show_default=True,
+            default=config.SEARCH_RATE_ARRIVAL,
+        ),
+    ]
+    warmup_duration: Annotated[
+        int,
+        click.option(
+            "--warmup-duration",
+            type=int,
+            help="Seconds of search before each concurrency, excluded from the results",
+            show_default=True,
+            default=config.SEARCH_WARMUP_DURATION,
+        ),
+    ]
+    steady_state: Annotated[
+        bool,
+        click.option(
+            "--steady-state/--fixed-duration",
+            type=bool,
+            help="End each concurrency once the qps is steady (up to SEARCH_MAX_DURATION), "
+            "instead of after --concurrency-duration",
+            show_default=True,
+            default=config.SEARCH_STEADY_STATE,
+        ),
+    ]
+    num_event_loops: Annotated[
+        int,
+        click.option(
+            "--num-event-loops",
+            type=int,
+            help="Run the concurrent search with asyncio in at most this many processes, 0 to use one process per client",
+            show_default=True,
+            default=config.ASYNC_SEARCH_EVENT_LOOPS,
+        ),
+    ]
+    batch_sizes: Annotated[
+        List[str],
+        click.option(
+            "--batch-sizes",
+            type=str,
+            help="Comma-separated list of queries per request to test during batched search",
+            show_default=True,
+            default=",".join(map(str, config.BATCH_SEARCH_SIZES)),
+            callback=lambda *args: list(map(int, click_arg_split(*args))),
+        ),
+    ]
+    num_insert_workers: Annotated[
+        int,
+        click.option(
+            "--num-insert-workers",
+            type=int,
+            help="Writer processes inserting the train data in parallel, each on its own shard of the row groups",
+            show_default=True,
+            default=config.NUM_INSERT_WORKERS,
+        ),
+    ]
+    load_batch_size: Annotated[
+        int,
+        click.option(
+            "--load-batch-size",
+            type=int,
+            help="Rows of every insert_embeddings call while loading the train data",
+            show_default=True,
+            default=config.NUM_PER_BATCH,
+        ),
+    ]
+    load_batch_size_candidates: Annotated[
+        List[str],
+        click.option(
+            "--tune-load-batch-sizes",
+            "load_batch_size_candidates",
+            type=str,
+            help="Comma-separated list of load batch sizes tried on the first rows, "
+            "the rest is inserted in the fastest one instead of --load-batch-size, empty to skip",
+            show_default=True,
+            default=",".join(map(str, config.LOAD_BATCH_SIZE_CANDIDATES)),
+            callback=lambda *args: list(map(int, click_arg_split(*args))),
+        ),
+    ]
+    streaming_insert_rate: Annotated[
+        float,
+        click.option(
+            "--streaming-insert-rate",
+            type=float,
+            help="Rows/s inserted while searching in the streaming cases",
+            show_default=True,
+            default=config.STREAMING_INSERT_RATE,
+        ),
+    ]
+    streaming_initial_ratio: Annotated[
+        float,
+        click.option(
+            "--streaming-initial-ratio",
+            type=float,
+            help="Ratio of the train data loaded and optimized before streaming in the streaming cases",
+            show_default=True,
+            default=config.STREAMING_INITIAL_RATIO,
+        ),
+    ]
+    streaming_search_stages: Annotated[
+        List[str],
+        click.option(
+            "--streaming-search-stages",
+            type=str,
+            help="Comma-separated list of ratios of the train data inserted at which to search in the streaming cases",
+            show_default=True,
+            default=",".join(map(str, config.STREAMING_SEARCH_STAGES)),
+            callback=lambda *args: list(map(float, click_arg_split(*args))),
+        ),
+    ]
+    streaming_concurrency: Annotated[
+        int,
+        click.option(
+            "--streaming-concurrency",
+            type=int,
+            help="Concurrency of the search at every stage of the streaming cases",
+            show_default=True,
+            default=config.STREAMING_SEARCH_CONCURRENCY,
+        ),
+    ]
+    churn_delete_ratio: Annotated[
+        float,
+        click.option(
+            "--churn-delete-ratio",
+            type=float,
+            help="Ratio of the train data deleted after the load in the churn cases",
+            show_default=True,
+            default=config.CHURN_DELETE_RATIO,
+        ),
+    ]
+    churn_reinsert_ratio: Annotated[
+        float,
+        click.option(
+            "--churn-reinsert-ratio",
+            type=float,
+            help="Ratio of the deleted rows upserted back before the search in the churn cases",
+            show_default=True,
+            default=config.CHURN_REINSERT_RATIO,
+        ),
+    ]
+    capacity_adaptive: Annotated[
+        bool,
+        click.option(
+            "--capacity-adaptive/--capacity-repeat",
+            type=bool,
+            help="Load the capacity cases with parallel writers until the memory, latency or error stop condition, "
+            "instead of one writer repeating the dataset until an error",
+            show_default=True,
+            default=config.CAPACITY_ADAPTIVE,
+        ),
+    ]
+    capacity_writers: Annotated[
+        int,
+        click.option(
+            "--capacity-writers",
+            type=int,
+            help="Writer processes of the adaptive capacity load",
+            show_default=True,
+            default=config.CAPACITY_NUM_WRITERS,
+        ),
+    ]
+    capacity_memory_threshold: Annotated[
+        float,
+        click.option(
+            "--capacity-memory-threshold",
+            type=float,
+            help="Ratio of the memory of the db at which the adaptive capacity load stops, 0 to disable",
+            show_default=True,
+            default=config.CAPACITY_MEMORY_THRESHOLD,
+        ),
+    ]
+    capacity_latency_threshold: Annotated[
+        float,
+        click.option(
+            "--capacity-latency-threshold",
+            type=float,
+            help="Mean seconds of the recent insert batches at which the adaptive capacity load stops, 0 to disable",
+            show_default=True,
+            default=config.CAPACITY_LATENCY_THRESHOLD,
+        ),
+    ]
     custom_case_name: Annotated[
         str,
         click.option(
@@ -458,6 +713,25 @@ def cli():
     ...
 
 
+@cli.command()
+@click.argument("result_ids_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--k",
+    "ks",
+    type=str,
+    help="Comma-separated list of k to rescore",
+    default="10,100",
+    show_default=True,
+    callback=lambda *args: list(map(int, click_arg_split(*args))),
+)
+def rescore(result_ids_file: str, ks: List[int]):
+    """Recompute recall, ndcg and mrr of a finished serial search at other k,
+    from the result ids file recorded in its metrics (serial_result_ids_file)
+    by a run with --save-result-ids."""
+    for k, (recall, ndcg, mrr) in rescore_result_ids(result_ids_file, ks).items():
+        click.echo(f"k={k}: recall={recall}, ndcg={ndcg}, mrr={mrr}")
+
+
 def run(
     db: DB,
     db_config: DBConfig,
@@ -480,9 +754,39 @@ def run(
         case_config=CaseConfig(
             case_id=CaseType[parameters["case_type"]],
             k=parameters["k"],
+            save_result_ids=parameters["save_result_ids"],
             concurrency_search_config=ConcurrencySearchConfig(
                 concurrency_duration=parameters["concurrency_duration"],
                 num_concurrency=[int(s) for s in parameters["num_concurrency"]],
+                rate_list=[float(s) for s in parameters["search_rate"]],
+                rate_arrival=parameters["search_rate_arrival"],
+                num_event_loops=parameters["num_event_loops"],
+                warmup_duration=parameters["warmup_duration"],
+                steady_state=parameters["steady_state"],
+            ),
+            batch_search_config=BatchSearchConfig(
+                batch_sizes=[int(s) for s in parameters["batch_sizes"]],
+            ),
+            load_config=LoadConfig(
+                num_insert_workers=parameters["num_insert_workers"],
+                insert_batch_size=parameters["load_batch_size"],
+                insert_batch_size_candidates=parameters["load_batch_size_candidates"],
+            ),
+            streaming_config=StreamingConfig(
+                insert_rate=parameters["streaming_insert_rate"],
+                initial_ratio=parameters["streaming_initial_ratio"],
+                search_stages=parameters["streaming_search_stages"],
+                concurrency=parameters["streaming_concurrency"],
+            ),
+            churn_config=ChurnConfig(
+                delete_ratio=parameters["churn_delete_ratio"],
+                reinsert_ratio=parameters["churn_reinsert_ratio"],
+            ),
+            capacity_config=CapacityConfig(
+                adaptive=parameters["capacity_adaptive"],
+                num_writers=parameters["capacity_writers"],
+                memory_threshold=parameters["capacity_memory_threshold"],
+                latency_threshold=parameters["capacity_latency_threshold"],
             ),
             custom_case=get_custom_case_config(parameters),
         ),
@@ -493,11 +797,14 @@ def run(
             parameters["load"],
             parameters["search_serial"],
             parameters["search_concurrent"],
+            parameters["search_batch"],
+            parameters["resume_load"],
         ),
     )
 
     log.info(f"Task:\n{pformat(task)}\n")
     if not parameters["dry_run"]:
+        benchMarkRunner.set_download_address(DatasetSource(parameters["dataset_source"]))
         benchMarkRunner.run([task])
         time.sleep(5)
         if global_result_future:
@@ -24,6 +24,21 @@ def drawChartsByCase(allData, showCaseNames: list[str], st):
         ]
         drawChart(data, chartContainer, key=f"{caseName}-qps-p99")
 
+        timelineData = [
+            {
+                "time": timeline["time"][j],
+                "qps": timeline["qps"][j],
+                "latency_p99": timeline["latency_p99"][j] * 1000,
+                "errors": timeline["errors"][j],
+                "conc_num": caseData["conc_num_list"][i],
+                "db_name": caseData["db_name"],
+            }
+            for caseData in caseDataList
+            for i, timeline in enumerate(caseData.get("conc_timeline_list", []))
+            for j in range(len(timeline["time"]))
+        ]
+        drawTimelineChart(timelineData, chartContainer, key=f"{caseName}-timeline")
+
 
 def getRange(metric, data, padding_multipliers):
     minV = min([d.get(metric, 0) for d in data])
@@ -74,3 +89,26 @@ def drawChart(data, st, key: str):
     fig.update_traces(textposition="bottom right", texttemplate="conc-%{text:,.4~r}")
 
     st.plotly_chart(fig, use_container_width=True, key=key)
+
+
+def drawTimelineChart(data, st, key: str):
+    if len(data) == 0:
+        return
+
+    for y, title in [("qps", "QPS"), ("latency_p99", "Latency P99 (ms)")]:
+        fig = px.line(
+            data,
+            x="time",
+            y=y,
+            color="db_name",
+            line_dash="conc_num",
+            hover_data={
+                "conc_num": True,
+                "errors": True,
+            },
+            height=480,
+        )
+        fig.update_xaxes(title_text="Time (s)")
+        fig.update_yaxes(title_text=title)
+
+        st.plotly_chart(fig, use_container_width=True, key=f"{key}-{y}")
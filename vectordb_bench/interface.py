@@ -42,8 +42,11 @@ class BenchMarkRunner:
         self.drop_old = drop_old
 
 
-    def set_download_address(self, use_aliyun: bool):
-        if use_aliyun:
+    def set_download_address(self, use_aliyun: bool | DatasetSource):
+        """Source of the datasets, AliyunOSS or S3 by a bool, or any DatasetSource like LocalFS or HTTP"""
+        if isinstance(use_aliyun, DatasetSource):
+            self.dataset_source = use_aliyun
+        elif use_aliyun:
             self.dataset_source = DatasetSource.AliyunOSS
         else:
             self.dataset_source = DatasetSource.S3
@@ -167,12 +170,16 @@ class BenchMarkRunner:
                     # cache the latest succeeded runner
                     latest_runner = runner
 
-                    # cache the latest drop_old=True load_duration of the latest succeeded runner
-                    cached_load_duration = case_res.metrics.load_duration if drop_old else cached_load_duration
+                    # cache the latest drop_old=True load, insert and optimize durations of the latest succeeded runner
+                    m = case_res.metrics
+                    if drop_old:
+                        cached_load_duration = (m.load_duration, m.insert_duration, m.optimize_duration)
 
-                    # use the cached load duration if this case didn't drop the existing collection
-                    if not drop_old:
-                        case_res.metrics.load_duration = cached_load_duration if cached_load_duration else 0.0
+                    # use the cached load duration if this case didn't drop the existing collection, nor resumed its load
+                    if not drop_old and not m.load_duration:
+                        m.load_duration, m.insert_duration, m.optimize_duration = (
+                            cached_load_duration if cached_load_duration else (0.0, 0.0, 0.0)
+                        )
                 except (LoadTimeoutError, PerformanceTimeoutError) as e:
                     log.warning(f"[{idx+1}/{running_task.num_cases()}] case {runner.display()} failed to run, reason={e}")
                     case_res.label = ResultLabel.OUTOFRANGE
@@ -1,5 +1,8 @@
+import copy
 import logging
+import math
 import numpy as np
+from typing import Iterable
 
 from dataclasses import dataclass, field
 
@@ -13,17 +16,62 @@ class Metric:
 
     # for load cases
     max_load_count: int = 0
+    capacity_stop_reason: str = ""  # stop condition of the adaptive capacity load, "memory", "latency" or "error"
+    capacity_memory_timeline: dict = field(default_factory=dict)  # time, rows and memory ratio polled while loading
 
     # for performance cases
     load_duration: float = 0.0  # duration to load all dataset into DB
+    insert_duration: float = 0.0  # insert part of load_duration, with all the writers
+    insert_resumed_count: int = 0  # rows loaded by a failed load before, skipped by this resumed one
+    insert_throughput_list: list[float] = field(default_factory=list)  # rows/s of each writer
+    insert_batch_size_list: list[int] = field(default_factory=list)  # insert batch size of each writer
+    insert_latency_p50: float = 0.0  # latency of one insert_embeddings batch
+    insert_latency_p99: float = 0.0
+    insert_latency_max: float = 0.0
+    insert_retry_count: int = 0
+    insert_timeline: dict = field(default_factory=dict)  # SearchTimeline.to_dict() of the inserts, qps in rows/s
+    optimize_duration: float = 0.0  # optimize part of load_duration, mostly the index build
+    optimize_timeline: dict = field(default_factory=dict)  # {"time": [...], "progress": [...]} of the index build
     qps: float = 0.0
     serial_latency_p99: float = 0.0
     recall: float = 0.0
     ndcg: float = 0.0
+    mrr: float = 0.0
+    serial_result_ids_file: str = ""  # raw result ids of the serial search, see rescore_result_ids
     conc_num_list: list[int] = field(default_factory=list)
     conc_qps_list: list[float] = field(default_factory=list)
     conc_latency_p99_list: list[float] = field(default_factory=list)
     conc_latency_mean_list: list[float] = field(default_factory=list)
+    conc_latency_p50_list: list[float] = field(default_factory=list)
+    conc_latency_p90_list: list[float] = field(default_factory=list)
+    conc_latency_p999_list: list[float] = field(default_factory=list)
+    conc_latency_max_list: list[float] = field(default_factory=list)
+    conc_timeline_list: list[dict] = field(default_factory=list)  # SearchTimeline.to_dict() of each concurrency
+    rate_offered_list: list[float] = field(default_factory=list)
+    rate_achieved_list: list[float] = field(default_factory=list)
+    rate_dropped_list: list[int] = field(default_factory=list)  # queries scheduled but not sent in the duration
+    rate_latency_p50_list: list[float] = field(default_factory=list)
+    rate_latency_p95_list: list[float] = field(default_factory=list)
+    rate_latency_p99_list: list[float] = field(default_factory=list)
+    rate_latency_p999_list: list[float] = field(default_factory=list)
+    batch_size_list: list[int] = field(default_factory=list)
+    batch_qps_list: list[float] = field(default_factory=list)
+    batch_latency_p50_list: list[float] = field(default_factory=list)  # latency of one batch request
+    batch_latency_p99_list: list[float] = field(default_factory=list)
+    batch_recall_list: list[float] = field(default_factory=list)
+
+    # for streaming cases, one item per search stage, searched while inserting
+    streaming_rows_list: list[int] = field(default_factory=list)  # rows inserted at the start of the stage
+    streaming_qps_list: list[float] = field(default_factory=list)
+    streaming_latency_p99_list: list[float] = field(default_factory=list)
+    streaming_recall_list: list[float] = field(default_factory=list)  # against the rows inserted before each query
+    streaming_insert_rate: float = 0.0  # actual rows/s of the writer after the initial load
+
+    # for churn cases, the search metrics above are measured after the deletes and upserts
+    churn_delete_count: int = 0
+    churn_delete_duration: float = 0.0
+    churn_upsert_count: int = 0
+    churn_upsert_duration: float = 0.0
 
 
 QURIES_PER_DOLLAR_METRIC = "QP$ (Quries per Dollar)"
@@ -58,6 +106,196 @@ def isLowerIsBetterMetric(metric: str) -> bool:
     return metric in lowerIsBetterMetricList
 
 
+class LatencyHistogram:
+    """Fixed-memory latency histogram with log-scaled buckets, HDR-style.
+
+    Values in [lowest, highest] seconds are kept with a relative error of `precision`,
+    memory doesn't grow with the number of records, and histograms with the same
+    parameters are merged by adding the buckets.
+
+    Examples:
+        >>> hist = LatencyHistogram()
+        >>> hist.record(0.003)
+        >>> hist.merge(other_hist)
+        >>> p50, p99 = hist.percentiles([50, 99])
+    """
+
+    def __init__(self, lowest: float = 1e-6, highest: float = 3600.0, precision: float = 0.01):
+        self.lowest = lowest
+        self.highest = highest
+        self.precision = precision
+        self._log_base = math.log1p(precision)
+        self.counts = np.zeros(self._index(highest) + 1, dtype=np.int64)
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        return int(math.log(value / self.lowest) / self._log_base) + 1
+
+    def _value(self, index: int) -> float:
+        """geometric middle of the bucket"""
+        if index == 0:
+            return self.lowest
+        return self.lowest * math.exp((index - 0.5) * self._log_base)
+
+    def record(self, value: float):
+        idx = min(self._index(value), len(self.counts) - 1)
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        if (self.lowest, self.highest, self.precision) != (other.lowest, other.highest, other.precision):
+            raise ValueError("Cannot merge histograms with different parameters")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, p: float) -> float:
+        return self.percentiles([p])[0]
+
+    def percentiles(self, ps: list[float]) -> list[float]:
+        if self.count == 0:
+            return [0.0 for _ in ps]
+
+        cumsum = np.cumsum(self.counts)
+        values = []
+        for p in ps:
+            rank = max(1, math.ceil(p / 100 * self.count))
+            idx = int(np.searchsorted(cumsum, rank))
+            values.append(min(max(self._value(idx), self.min), self.max))
+        return values
+
+    def __getstate__(self) -> dict:
+        # only ship the non-empty buckets between processes
+        state = self.__dict__.copy()
+        nonzero = np.flatnonzero(self.counts)
+        state["counts"] = (len(self.counts), nonzero, self.counts[nonzero])
+        return state
+
+    def __setstate__(self, state: dict):
+        size, nonzero, counts = state["counts"]
+        state["counts"] = np.zeros(size, dtype=np.int64)
+        state["counts"][nonzero] = counts
+        self.__dict__.update(state)
+
+
+class SearchTimeline:
+    """Completed queries, errors and latencies of a search in buckets of `interval` seconds,
+    mergeable across the search processes like LatencyHistogram. Also used for the inserts,
+    counting the rows of every batch.
+
+    The latencies of every bucket are a coarse LatencyHistogram of `precision`, and past
+    max_buckets the buckets are merged in pairs, doubling the interval, so the memory of a
+    timeline is bounded whatever the duration of the search or the load.
+
+    Examples:
+        >>> timeline = SearchTimeline(1.0)
+        >>> timeline.record(elapsed=0.3, latency=0.002)
+        >>> timeline.record_error(elapsed=1.5)
+        >>> timeline.to_dict(duration=2.0)
+    """
+
+    def __init__(self, interval: float = 1.0, precision: float = 0.1, max_buckets: int = 1024):
+        if interval <= 0 or max_buckets < 2:
+            raise ValueError(f"Timeline interval and max_buckets should be positive, got {interval}, {max_buckets}")
+        self.interval = interval
+        self.precision = precision  # of the latency histogram of every bucket
+        self.max_buckets = max_buckets
+        self.counts: list[int] = []
+        self.errors: list[int] = []
+        self.latencies: list[LatencyHistogram] = []
+
+    def _bucket(self, elapsed: float) -> int:
+        idx = max(0, int(elapsed // self.interval))
+        while idx >= self.max_buckets:
+            self._compact()
+            idx = max(0, int(elapsed // self.interval))
+        while len(self.counts) <= idx:
+            self.counts.append(0)
+            self.errors.append(0)
+            self.latencies.append(LatencyHistogram(precision=self.precision))
+        return idx
+
+    def _compact(self):
+        """merge the buckets in pairs, doubling the interval"""
+        self.interval *= 2
+        pairs = range(0, len(self.counts), 2)
+        self.counts = [sum(self.counts[i : i + 2]) for i in pairs]
+        self.errors = [sum(self.errors[i : i + 2]) for i in pairs]
+        latencies = []
+        for i in pairs:
+            hist = self.latencies[i]
+            for other in self.latencies[i + 1 : i + 2]:
+                hist.merge(other)
+            latencies.append(hist)
+        self.latencies = latencies
+
+    def record(self, elapsed: float, latency: float, count: int = 1):
+        """Record a query, or a batch of count rows, completed at `elapsed` seconds since the start of the measurement"""
+        idx = self._bucket(elapsed)
+        self.counts[idx] += count
+        self.latencies[idx].record(latency)
+
+    def record_error(self, elapsed: float):
+        self.errors[self._bucket(elapsed)] += 1
+
+    def merge(self, other: "SearchTimeline") -> "SearchTimeline":
+        """merge other into self, the finer one of two timelines compacted to the interval of the other"""
+        if not math.log2(other.interval / self.interval).is_integer():
+            raise ValueError(f"Cannot merge timelines of intervals not a power of 2 apart: {self.interval} and {other.interval}")
+        while self.interval < other.interval:
+            self._compact()
+        if other.interval < self.interval:
+            other = copy.deepcopy(other)
+            while other.interval < self.interval:
+                other._compact()
+
+        if len(other.counts) > 0:
+            self._bucket((len(other.counts) - 1) * self.interval)
+        for i in range(len(other.counts)):
+            self.counts[i] += other.counts[i]
+            self.errors[i] += other.errors[i]
+            self.latencies[i].merge(other.latencies[i])
+        return self
+
+    def to_dict(self, duration: float | None = None) -> dict[str, list[float]]:
+        """Series of every bucket: end time, qps, errors, latency p50 and p99.
+
+        Args:
+            duration(float, optional): measured seconds, for the qps of the last, partial bucket.
+        """
+        series = {"time": [], "qps": [], "errors": [], "latency_p50": [], "latency_p99": []}
+        for i, count in enumerate(self.counts):
+            end = (i + 1) * self.interval
+            width = self.interval
+            if duration is not None and i * self.interval < duration < end:
+                end, width = duration, duration - i * self.interval
+            p50, p99 = self.latencies[i].percentiles([50, 99])
+            series["time"].append(round(end, 4))
+            series["qps"].append(round(count / width, 4))
+            series["errors"].append(self.errors[i])
+            series["latency_p50"].append(p50)
+            series["latency_p99"].append(p99)
+        return series
+
+
 def calc_recall(count: int, ground_truth: list[int], got: list[int]) -> float:
     recalls = np.zeros(count)
     for i, result in enumerate(got):
@@ -83,3 +321,88 @@ def calc_ndcg(ground_truth: list[int], got: list[int], ideal_dcg: float) -> floa
             idx = ground_truth.index(id)
             dcg += 1 / np.log2(idx+2)
     return dcg / ideal_dcg
+
+
+def to_id_matrix(ids: list[list[int]] | np.ndarray, k: int) -> np.ndarray:
+    """(nq x k) int64 matrix of the first k ids of every row, padded with -1 if a row has fewer"""
+    if isinstance(ids, np.ndarray) and ids.ndim == 2:
+        ids = ids[:, :k].astype(np.int64, copy=False)
+        if ids.shape[1] == k:
+            return ids
+        return np.pad(ids, ((0, 0), (0, k - ids.shape[1])), constant_values=-1)
+
+    matrix = np.full((len(ids), k), -1, dtype=np.int64)
+    for i, row in enumerate(ids):
+        row = np.asarray(row, dtype=np.int64)[:k]
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+def calc_search_metrics(
+    results: list[list[int]] | np.ndarray,
+    ground_truth: list[list[int]] | np.ndarray,
+    k: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """recall@k, NDCG@k and MRR of every query, computed for the whole query set at once.
+
+    Matches calc_recall and calc_ndcg of each row, except that a duplicate id in the results
+    only counts once. MRR is the reciprocal rank of the true nearest neighbor ground_truth[i][0]
+    in the results, 0 if missing.
+
+    Args:
+        results(list[list[int]] | np.ndarray): (nq x k) result ids, rows can be shorter than k.
+        ground_truth(list[list[int]] | np.ndarray): (nq x >=k) ground truth ids, nearest first.
+        k(int): top k.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: recall, ndcg and mrr of every query.
+    """
+    got = to_id_matrix(results, k)
+    gt = to_id_matrix(ground_truth, k)
+    nq = got.shape[0]
+    if gt.shape[0] != nq:
+        raise ValueError(f"Got results of {nq} queries, but ground truth of {gt.shape[0]}")
+    if nq == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+
+    # encode (row, id) into one sorted key array, -1 padding becomes id 0
+    width = int(max(got.max(), gt.max())) + 2
+    rows = np.arange(nq, dtype=np.int64)[:, np.newaxis] * width
+    gt_order = np.argsort(gt, axis=1, kind="stable")
+    gt_keys = (rows + np.take_along_axis(gt, gt_order, axis=1) + 1).ravel()
+    got_keys = (rows + got + 1).ravel()
+
+    # position of every result in the ground truth of its query
+    pos = np.searchsorted(gt_keys, got_keys).clip(max=gt_keys.size - 1)
+    found = (gt_keys[pos] == got_keys) & (got.ravel() >= 0)
+    _, first = np.unique(got_keys, return_index=True)
+    unique = np.zeros(got_keys.size, dtype=bool)
+    unique[first] = True
+    hit = (found & unique).reshape(nq, k)
+
+    gt_rank = gt_order.ravel()[pos].reshape(nq, k)
+    recall = hit.sum(axis=1) / k
+    ndcg = np.where(hit, 1 / np.log2(gt_rank + 2), 0).sum(axis=1) / get_ideal_dcg(k)
+
+    nearest = (got == gt[:, :1]) & (got >= 0)
+    mrr = np.where(nearest.any(axis=1), 1 / (nearest.argmax(axis=1) + 1), 0.0)
+    return recall, ndcg, mrr
+
+
+def rescore_result_ids(file: str, ks: Iterable[int]) -> dict[int, tuple[float, float, float]]:
+    """Recompute the average recall, NDCG and MRR at every k in ks from the result ids
+    saved by a serial search, without searching again.
+
+    Returns:
+        dict[int, tuple[float, float, float]]: avg recall, avg ndcg and avg mrr of each k
+    """
+    with np.load(file) as f:
+        result_ids, ground_truth = f["result_ids"], f["ground_truth"]
+
+    scores = {}
+    for k in ks:
+        if k > result_ids.shape[1]:
+            raise ValueError(f"Can't rescore at k={k}, only {result_ids.shape[1]} results saved for each query")
+        recalls, ndcgs, mrrs = calc_search_metrics(result_ids, ground_truth, k)
+        scores[k] = (round(float(recalls.mean()), 4), round(float(ndcgs.mean()), 4), round(float(mrrs.mean()), 4))
+    return scores
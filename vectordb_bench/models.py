@@ -85,6 +85,42 @@ class CustomizedCase(BaseModel):
 class ConcurrencySearchConfig(BaseModel):
     num_concurrency: List[int] = config.NUM_CONCURRENCY
     concurrency_duration: int = config.CONCURRENCY_DURATION
+    rate_list: List[float] = config.SEARCH_RATE_LIST
+    rate_arrival: str = config.SEARCH_RATE_ARRIVAL
+    num_event_loops: int = config.ASYNC_SEARCH_EVENT_LOOPS
+    warmup_duration: int = config.SEARCH_WARMUP_DURATION
+    steady_state: bool = config.SEARCH_STEADY_STATE
+
+
+class BatchSearchConfig(BaseModel):
+    batch_sizes: List[int] = config.BATCH_SEARCH_SIZES
+    duration: int = config.BATCH_SEARCH_DURATION
+
+
+class LoadConfig(BaseModel):
+    num_insert_workers: int = config.NUM_INSERT_WORKERS
+    insert_batch_size: int = config.NUM_PER_BATCH
+    insert_batch_size_candidates: List[int] = config.LOAD_BATCH_SIZE_CANDIDATES
+
+
+class StreamingConfig(BaseModel):
+    insert_rate: float = config.STREAMING_INSERT_RATE
+    initial_ratio: float = config.STREAMING_INITIAL_RATIO
+    search_stages: List[float] = config.STREAMING_SEARCH_STAGES
+    concurrency: int = config.STREAMING_SEARCH_CONCURRENCY
+    duration: int = config.STREAMING_SEARCH_DURATION
+
+
+class ChurnConfig(BaseModel):
+    delete_ratio: float = config.CHURN_DELETE_RATIO
+    reinsert_ratio: float = config.CHURN_REINSERT_RATIO
+
+
+class CapacityConfig(BaseModel):
+    adaptive: bool = config.CAPACITY_ADAPTIVE
+    num_writers: int = config.CAPACITY_NUM_WRITERS
+    memory_threshold: float = config.CAPACITY_MEMORY_THRESHOLD
+    latency_threshold: float = config.CAPACITY_LATENCY_THRESHOLD
 
 
 class CaseConfig(BaseModel):
@@ -93,7 +129,14 @@ class CaseConfig(BaseModel):
     case_id: CaseType
     custom_case: dict | None = None
     k: int | None = config.K_DEFAULT
+    # save the result ids of the serial search for the rescore command
+    save_result_ids: bool = config.SAVE_SEARCH_RESULT_IDS
     concurrency_search_config: ConcurrencySearchConfig = ConcurrencySearchConfig()
+    batch_search_config: BatchSearchConfig = BatchSearchConfig()
+    load_config: LoadConfig = LoadConfig()
+    streaming_config: StreamingConfig = StreamingConfig()
+    churn_config: ChurnConfig = ChurnConfig()
+    capacity_config: CapacityConfig = CapacityConfig()
 
     '''
     @property
@@ -118,12 +161,14 @@ class TaskStage(StrEnum):
     LOAD = auto()
     SEARCH_SERIAL = auto()
     SEARCH_CONCURRENT = auto()
+    SEARCH_BATCH = auto()
 
     def __repr__(self) -> str:
         return str.__repr__(self.value)
 
 
 # TODO: Add CapacityCase enums and adjust TaskRunner to utilize
+# SEARCH_BATCH is opt-in and not one of the default stages
 ALL_TASK_STAGES = [
     TaskStage.DROP_OLD,
     TaskStage.LOAD,